@@ -4,29 +4,413 @@ Home Assistant Overview - Web Application
 Flask-basierte Web-Anwendung mit Frontend und Backend
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
-from ha_overview import HomeAssistantOverview
+from flask import Flask, render_template, request, jsonify, send_file, Response, g
+from ha_overview import HomeAssistantOverview, FETCH_STEPS, PARTIAL_FORMATS, bundle_formats
+from entity_index import EntityIndex, DEFAULT_PAGE_SIZE
+from entity_filter import parse_filter
+from entity_model import AttributeView, Entity
+from search_index import SearchIndex
+from shared_cache import SharedCache, DEFAULT_MAX_BYTES as DEFAULT_SHARED_CACHE_BYTES
+from snapshot_store import (
+    SnapshotStore, DEFAULT_PATH as DEFAULT_SNAPSHOT_PATH, DEFAULT_MAX_SNAPSHOTS,
+    DEFAULT_MAX_AGE_DAYS as DEFAULT_MAX_SNAPSHOT_AGE_DAYS
+)
+from exporters import (
+    CompressionStats, iter_counted, iter_gzip, iter_json, open_export,
+    generate_claude_format, generate_text_summary, iter_claude_chunks, iter_chunks,
+    join_claude_chunks
+)
+from report_cache import ReportCache, export_key
+from report_writer import iter_report_bundle
+from report_format import (
+    REPORT_SECTIONS, get_report_sections, get_report_states, is_complete, parse_sections, select_sections,
+    to_full_report
+)
+from jobs import JobManager, JobQueueFull
+from metrics import MetricsRegistry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from fetch_policy import (
+    default_policy, DEFAULT_CONNECT_TIMEOUT, DEFAULT_RETRIES, DEFAULT_FAILURE_THRESHOLD,
+    DEFAULT_RESET_TIMEOUT
+)
+from fleet import FleetCollector, DEFAULT_TIMEOUT as DEFAULT_FLEET_TIMEOUT
+from state_mirror import get_mirror, DEFAULT_MAX_MIRRORS, DEFAULT_IDLE_TIMEOUT as DEFAULT_MIRROR_IDLE_TIMEOUT
 import os
 import json
+import queue
+import sqlite3
+import threading
+import time
 from datetime import datetime
 
 app = Flask(__name__)
+# Entitäten liegen als kompakte Records vor (entity_model); jsonify serialisiert sie als Dict
+_flask_json_default = app.json.default
+app.json.default = lambda obj: (obj.to_dict() if isinstance(obj, (Entity, AttributeView))
+                                else _flask_json_default(obj))
 
 # Konfigurationsdatei
 CONFIG_FILE = 'config.json'
 
+# Maximale Anzahl paralleler Home Assistant Abfragen pro Report
+FETCH_WORKERS = int(os.environ.get('HA_FETCH_WORKERS', 5))
+
+# Maximale Anzahl gleichzeitig abgefragter Instanzen im Flotten-Modus
+FLEET_WORKERS = int(os.environ.get('HA_FLEET_WORKERS', 4))
+
+# Obergrenze für das Zeitlimit pro Instanz, das ein Client im Flotten-Modus angeben kann (Sekunden)
+FLEET_MAX_TIMEOUT = float(os.environ.get('HA_FLEET_MAX_TIMEOUT', 120))
+
+# Gemeinsamer Cache aller Worker-Prozesse eines Hosts (z.B. gunicorn -w 4) für
+# Reports, gerenderte Exporte und Konfiguration; HA_SHARED_CACHE=Pfad aktiviert ihn
+shared_cache = None
+if os.environ.get('HA_SHARED_CACHE'):
+    shared_cache = SharedCache(
+        os.environ['HA_SHARED_CACHE'],
+        max_bytes=int(os.environ.get('HA_SHARED_CACHE_MB', DEFAULT_SHARED_CACHE_BYTES // (1024 * 1024)))
+        * 1024 * 1024
+    )
+
+# Zuletzt generierte Reports pro Instanz, damit Downloads nicht neu abfragen
+report_cache = ReportCache(
+    max_entries=int(os.environ.get('HA_REPORT_CACHE_SIZE', 16)),
+    ttl=int(os.environ.get('HA_REPORT_CACHE_TTL', 300)),
+    shared=shared_cache
+)
+
+# Konfiguration im gemeinsamen Cache gilt so viele Sekunden (Änderungen an
+# config.json von Hand werden danach übernommen)
+CONFIG_TTL = 60
+
+# Report-Generierung im Hintergrund: gleichzeitige Jobs und Aufbewahrung fertiger Jobs (Sekunden)
+job_manager = JobManager(
+    max_workers=int(os.environ.get('HA_JOB_WORKERS', 2)),
+    ttl=int(os.environ.get('HA_JOB_TTL', 600))
+)
+
+# Anzeige der späten Phasen eines Report-Jobs (Text, Fortschritt)
+REPORT_JOB_PHASES = {
+    'building': ('Erstelle Bericht...', 0.85),
+    'snapshot': ('Speichere Snapshot...', 0.9),
+    'indexing': ('Baue Suchindex auf...', 0.95),
+}
+
+# Teile eines Reports, die im SSE-Modus vor den Entitäten gesendet werden
+REPORT_SUMMARY_KEYS = ('timestamp', 'system_info', 'statistics', 'components', 'entities_by_domain')
+
+# Laufzeit-Metriken für /metrics (Prometheus-Textformat)
+metrics = MetricsRegistry()
+http_requests = metrics.counter(
+    'ha_overview_http_requests_total', 'HTTP-Anfragen je Route, Methode und Status',
+    ('route', 'method', 'status'))
+http_request_seconds = metrics.histogram(
+    'ha_overview_http_request_seconds', 'Dauer bis zum Antwortkopf je Route', ('route',))
+render_seconds = metrics.histogram(
+    'ha_overview_render_seconds', 'Dauer von Serialisierung und Versand einer Ausgabe', ('output',))
+response_bytes = metrics.counter(
+    'ha_overview_response_bytes_total', 'Ausgelieferte Bytes je Ausgabe (raw oder gzip)',
+    ('output', 'encoding'))
+report_requests = metrics.counter(
+    'ha_overview_reports_total', 'Report-Anfragen nach Ergebnis (generated, cached, failed)',
+    ('result',))
+report_phase_seconds = metrics.histogram(
+    'ha_overview_report_phase_seconds', 'Dauer der Phasen der Report-Generierung', ('phase',))
+fetch_seconds = metrics.histogram(
+    'ha_overview_fetch_seconds', 'Dauer je Endpunkt (seconds, network oder parse)',
+    ('endpoint', 'step'))
+fetch_bytes = metrics.counter(
+    'ha_overview_fetch_bytes_total', 'Von Home Assistant geladene Bytes je Endpunkt', ('endpoint',))
+fetch_events = metrics.counter(
+    'ha_overview_fetch_events_total',
+    'Wiederholungen, geöffnete Circuit Breaker und abgewiesene Abfragen (retry, circuit_open, rejected)',
+    ('event',))
+
+# Abfrage-Regeln für alle Home Assistant Anfragen des Prozesses (siehe fetch_policy):
+# Zeitlimit für den Verbindungsaufbau, Wiederholungen und Circuit Breaker pro Instanz
+default_policy.connect_timeout = float(os.environ.get('HA_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT))
+default_policy.retries = int(os.environ.get('HA_FETCH_RETRIES', DEFAULT_RETRIES))
+default_policy.failure_threshold = int(os.environ.get('HA_BREAKER_THRESHOLD', DEFAULT_FAILURE_THRESHOLD))
+default_policy.reset_timeout = float(os.environ.get('HA_BREAKER_RESET', DEFAULT_RESET_TIMEOUT))
+default_policy.listener = lambda event, url: fetch_events.inc(event=event)
+
+# Antworten ab dieser Größe (Bytes) werden gzip-komprimiert, wenn der Client es unterstützt
+GZIP_MIN_SIZE = 1024
+
+# Entitäten über die WebSocket-API live spiegeln statt /api/states abzufragen
+USE_STATE_MIRROR = os.environ.get('HA_STATE_MIRROR', '0') == '1'
+# Obergrenze gleichzeitig laufender Spiegel und Leerlaufzeit (Sekunden), nach der sich einer beendet
+MIRROR_LIMITS = {
+    'max_mirrors': int(os.environ.get('HA_MIRROR_MAX', DEFAULT_MAX_MIRRORS)),
+    'idle_timeout': int(os.environ.get('HA_MIRROR_IDLE', DEFAULT_MIRROR_IDLE_TIMEOUT)),
+}
+
+# /api/states beim Empfang blockweise parsen (HA_STREAM_STATES=0 lädt die Antwort komplett)
+STREAM_STATES = os.environ.get('HA_STREAM_STATES', '1') == '1'
+
+# Jeder neu generierte Report wird als Snapshot gespeichert (HA_SNAPSHOTS=0 deaktiviert);
+# aufbewahrt werden je Instanz die neuesten HA_SNAPSHOT_MAX aus den letzten HA_SNAPSHOT_DAYS Tagen
+# (0 = unbegrenzt). Die Datenbank entsteht erst mit dem ersten Snapshot.
+snapshot_store = None
+if os.environ.get('HA_SNAPSHOTS', '1') == '1':
+    snapshot_store = SnapshotStore(
+        os.environ.get('HA_SNAPSHOT_DB', DEFAULT_SNAPSHOT_PATH),
+        max_snapshots=int(os.environ.get('HA_SNAPSHOT_MAX', DEFAULT_MAX_SNAPSHOTS)) or None,
+        max_age_days=float(os.environ.get('HA_SNAPSHOT_DAYS', DEFAULT_MAX_SNAPSHOT_AGE_DAYS)) or None
+    )
+
+# Zuletzt gelesene Konfiguration und Änderungszeit der Datei
+_config = {'mtime': None, 'data': {}}
+_config_lock = threading.Lock()
+
+def shared_config(method, *args, **kwargs):
+    """Konfiguration im gemeinsamen Cache lesen/schreiben (ohne Cache oder bei Fehlern None)"""
+    if shared_cache is None:
+        return None
+    try:
+        return getattr(shared_cache, method)(*args, **kwargs)
+    except sqlite3.Error as e:
+        print(f"⚠ Gemeinsamer Cache nicht verfügbar: {e}")
+        return None
+
 def load_config():
-    """Lade gespeicherte Konfiguration"""
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+    """Lade gespeicherte Konfiguration (config.json wird nur nach einer Änderung neu gelesen)"""
+    cached = shared_config('get', 'config', CONFIG_FILE)
+    if cached is not None:
+        return dict(cached[0])
+    try:
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    with _config_lock:
+        if _config['mtime'] != mtime:
+            with open(CONFIG_FILE, 'r') as f:
+                _config['data'] = json.load(f)
+            _config['mtime'] = mtime
+        config = dict(_config['data'])
+    shared_config('put', 'config', CONFIG_FILE, config, ttl=CONFIG_TTL)
+    return config
 
 def save_config(url, token):
-    """Speichere Konfiguration"""
+    """Speichere Konfiguration (für alle Worker sofort gültig)"""
     config = {'url': url, 'token': token}
     with open(CONFIG_FILE, 'w') as f:
         json.dump(config, f)
+    shared_config('put', 'config', CONFIG_FILE, config, ttl=CONFIG_TTL)
+
+def accepts_gzip():
+    """Prüfe, ob der Client gzip-komprimierte Antworten akzeptiert"""
+    return 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+
+def log_transfer(label, stats):
+    """Gib die übertragene Größe einer Antwort auf der Konsole aus und zähle sie in den Metriken"""
+    message = f"⇣ {label}: {stats.raw_bytes:,} Bytes"
+    response_bytes.inc(stats.raw_bytes, output=label, encoding='raw')
+    if stats.compressed_bytes is not None:
+        message += f" → {stats.compressed_bytes:,} Bytes gzip"
+        response_bytes.inc(stats.compressed_bytes, output=label, encoding='gzip')
+    print(message)
+
+def stream_response(chunks, label, mimetype='application/json', filename=None, compress=False,
+                    flush=False, compressible=True):
+    """
+    Streame Byte-Blöcke zum Client
+
+    Args:
+        chunks: Iterator über Byte-Blöcke
+        label: Bezeichnung für die Größen-Ausgabe auf der Konsole
+        filename: Dateiname für den Download (Content-Disposition)
+        compress: Als .gz-Datei ausliefern; sonst wird gzip als Content-Encoding
+                  verwendet, wenn der Client es akzeptiert
+        flush: Jeden Block sofort komprimiert ausgeben (für Server-Sent Events)
+        compressible: False für bereits komprimierte Inhalte (z.B. zip); dann
+                      wird weder compress noch Content-Encoding angewendet
+    """
+    headers = {'Vary': 'Accept-Encoding'}
+    stats = CompressionStats()
+    if not compressible:
+        chunks = iter_counted(chunks, stats)
+    elif compress:
+        chunks = iter_gzip(chunks, stats)
+        mimetype = 'application/gzip'
+        filename = f"{filename}.gz" if filename else None
+    elif accepts_gzip():
+        chunks = iter_gzip(chunks, stats, flush=flush)
+        headers['Content-Encoding'] = 'gzip'
+    else:
+        chunks = iter_counted(chunks, stats)
+    if filename:
+        headers['Content-Disposition'] = f'attachment; filename={filename}'
+
+    def generate():
+        with render_seconds.time(output=label):
+            yield from chunks
+        log_transfer(label, stats)
+
+    return Response(generate(), mimetype=mimetype, headers=headers)
+
+@app.after_request
+def compress_response(response):
+    """Komprimiere gepufferte JSON-Antworten mit gzip, wenn der Client es akzeptiert"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or response.mimetype != 'application/json'
+            or not accepts_gzip()):
+        return response
+    body = response.get_data()
+    if len(body) < GZIP_MIN_SIZE:
+        return response
+    stats = CompressionStats()
+    response.set_data(b''.join(iter_gzip([body], stats)))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    log_transfer(route_label(), stats)
+    return response
+
+def route_label():
+    """Route der aktuellen Anfrage als Metrik-Label (Muster statt konkreter Pfad)"""
+    return request.url_rule.rule if request.url_rule is not None else 'unbekannt'
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Zähle die Anfrage und ihre Dauer bis zum Antwortkopf"""
+    route = route_label()
+    http_requests.inc(route=route, method=request.method, status=response.status_code)
+    if 'request_start' in g:
+        http_request_seconds.observe(time.perf_counter() - g.request_start, route=route)
+    return response
+
+def record_report_metrics(diagnostics):
+    """Übernimm die Zeitmessungen eines neu generierten Reports in die Metriken"""
+    for phase, seconds in diagnostics['phases'].items():
+        report_phase_seconds.observe(seconds, phase=phase)
+    for endpoint, values in diagnostics['endpoints'].items():
+        for step in ('seconds', 'network', 'parse'):
+            if values.get(step) is not None:
+                fetch_seconds.observe(values[step], endpoint=endpoint, step=step)
+        if values.get('bytes'):
+            fetch_bytes.inc(values['bytes'], endpoint=endpoint)
+
+def build_indexes(report):
+    """Baue die Abfrage-Indizes eines Reports (einmal pro Report)"""
+    states = get_report_states(report)
+    return {
+        'entities': EntityIndex(states),
+        'search': SearchIndex(states)
+    }
+
+def get_report(url, token, report_id=None, force_refresh=False, progress=None, sections=None,
+               entity_filter=None):
+    """
+    Hole einen Report aus dem Cache oder generiere ihn neu
+
+    Args:
+        progress: Optionaler Fortschritts-Callback (siehe HomeAssistantOverview);
+                  zusätzlich werden die Phasen 'snapshot' und 'indexing' gemeldet
+                  und in report['diagnostics'] gemessen
+        sections: Nur diese Abschnitte (siehe report_format.parse_sections).
+                  Ein Report aus dem Cache wird darauf gekürzt; sonst werden nur
+                  die nötigen Endpunkte abgefragt. Teil-Reports landen weder im
+                  Cache noch in den Snapshots, ihre report_id ist None.
+        entity_filter: Optionaler EntityFilter (siehe entity_filter.parse_filter);
+                  gefilterte Reports werden immer neu abgefragt und wie
+                  Teil-Reports nicht gespeichert
+
+    Returns:
+        Tupel (report_id, report, cached) oder None bei Fehlschlag
+    """
+    sections = parse_sections(sections)
+    if not force_refresh and entity_filter is None:
+        cached = report_cache.get(url, token, report_id)
+        if cached:
+            report_requests.inc(result='cached')
+            return cached[0], select_sections(cached[1], sections), True
+
+    # Der Spiegel startet beim ersten Aufruf; bis er bereit ist, wird per REST abgefragt
+    mirror = get_mirror(url, token, **MIRROR_LIMITS) if USE_STATE_MIRROR else None
+    ha = HomeAssistantOverview(url, token, max_workers=FETCH_WORKERS, state_mirror=mirror,
+                               progress=progress, stream_states=STREAM_STATES,
+                               entity_filter=entity_filter)
+    # Im Cache liegt immer das kompakte Format; Antworten wandeln bei Bedarf um
+    report = ha.generate_report(concurrent=True, compact=True, sections=sections)
+    if not report:
+        report_requests.inc(result='failed')
+        return None
+    if entity_filter is not None or len(sections) < len(REPORT_SECTIONS):
+        report['diagnostics'] = ha.diagnostics()
+        record_report_metrics(report['diagnostics'])
+        report_requests.inc(result='generated')
+        return None, report, False
+    if snapshot_store is not None:
+        ha._report_progress('snapshot')
+        with ha._timed_phase('snapshot'):
+            snapshot_store.add(url, report)
+    ha._report_progress('indexing')
+    with ha._timed_phase('indexing'):
+        indexes = build_indexes(report)
+    report['diagnostics'] = ha.diagnostics()
+    record_report_metrics(report['diagnostics'])
+    report_requests.inc(result='generated')
+    return report_cache.put(url, token, report, indexes=indexes), report, False
+
+def job_progress(job):
+    """Übersetze die Phasen der Report-Generierung in Fortschritt und Text eines Jobs"""
+    lock = threading.Lock()
+    fetched = []
+    total = [len(FETCH_STEPS)]
+
+    def progress(phase, name=None, **details):
+        if phase == 'connecting':
+            job.update(phase, 'Verbinde mit Home Assistant...', 0.05)
+        elif phase == 'fetching':
+            total[0] = details.get('total', total[0])
+            job.update(phase, 'Lade Daten...', 0.1)
+        elif phase == 'fetched':
+            with lock:
+                fetched.append(name)
+                done = len(fetched)
+            job.update('fetching', f"Geladen: {name} ({done}/{total[0]})", 0.1 + 0.7 * done / total[0])
+        else:
+            step = REPORT_JOB_PHASES.get(phase)
+            if step:
+                job.update(phase, *step)
+
+    return progress
+
+def run_report_job(job, url, token, force_refresh=False, compact=False, save=False, listener=None,
+                   sections=None, entity_filter=None):
+    """
+    Report-Generierung als Hintergrund-Job (Ergebnis wie /api/generate-report)
+
+    Args:
+        listener: Optionaler Callback listener(phase, details, status), der nach
+                  jeder Fortschrittsmeldung mit dem aktuellen Job-Zustand
+                  (job.to_dict()) aufgerufen wird
+        sections: Nur diese Abschnitte (siehe get_report)
+        entity_filter: Optionaler EntityFilter (siehe get_report)
+    """
+    update = job_progress(job)
+
+    def progress(phase, **details):
+        update(phase, **details)
+        if listener is not None:
+            listener(phase, details, job.to_dict())
+
+    result = get_report(url, token, force_refresh=force_refresh, progress=progress, sections=sections,
+                        entity_filter=entity_filter)
+    if not result:
+        raise RuntimeError('Report-Generierung fehlgeschlagen')
+    report_id, report, cached = result
+    if save:
+        save_config(url, token)
+    return {
+        'report_id': report_id,
+        'cached': cached,
+        'report': report if compact else to_full_report(report)
+    }
 
 @app.route('/')
 def index():
@@ -72,23 +456,163 @@ def generate_report():
         return jsonify({'success': False, 'error': 'URL und Token sind erforderlich'})
     
     try:
-        ha = HomeAssistantOverview(url, token)
-        report = ha.generate_report()
+        sections = parse_sections(data.get('sections'))
+        entity_filter = parse_filter(data.get('filter'))
+        if data.get('stream') or 'text/event-stream' in request.headers.get('Accept', ''):
+            events = iter_report_events(url, token,
+                                        force_refresh=bool(data.get('force_refresh')),
+                                        compact=bool(data.get('compact')),
+                                        save=bool(data.get('save_config')),
+                                        sections=sections, entity_filter=entity_filter)
+            response = stream_response(events, 'generate-report events',
+                                       mimetype='text/event-stream', flush=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            # Proxies (z.B. nginx) sollen die Ereignisse nicht puffern
+            response.headers['X-Accel-Buffering'] = 'no'
+            return response
         
-        if report:
+        result = get_report(url, token, force_refresh=bool(data.get('force_refresh')),
+                            sections=sections, entity_filter=entity_filter)
+        
+        if result:
+            report_id, report, cached = result
             # Speichere Konfiguration wenn gewünscht
             if data.get('save_config'):
                 save_config(url, token)
             
-            return jsonify({
+            if not data.get('compact'):
+                report = to_full_report(report)
+            
+            # Antwort wird inkrementell serialisiert (bei Bedarf gzip-komprimiert)
+            payload = {
                 'success': True,
+                'report_id': report_id,
+                'cached': cached,
                 'report': report
-            })
+            }
+            return stream_response(iter_json(payload, indent=None), 'generate-report')
         else:
             return jsonify({'success': False, 'error': 'Report-Generierung fehlgeschlagen'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+def sse_event(event, data):
+    """Ein Server-Sent Event mit JSON-Daten"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f"event: {event}\ndata: {payload}\n\n".encode('utf-8')
+
+def report_summary(report):
+    """Teilergebnis eines Reports ohne Entitäten (für die erste Anzeige)"""
+    return {key: report[key] for key in REPORT_SUMMARY_KEYS if key in report}
+
+def iter_report_events(url, token, force_refresh=False, compact=False, save=False, sections=None,
+                       entity_filter=None):
+    """
+    Report-Generierung als Server-Sent Events (sections, entity_filter siehe get_report)
+
+    Ereignisse:
+        progress: Phase mit Text, Fortschritt, abgefragten Bytes und Laufzeit;
+                  nach jedem Endpunkt zusätzlich dessen Name, Bytes und Dauer
+        summary:  System-Informationen und Statistiken, sobald der Report steht
+        report:   Ergebnis wie /api/generate-report (zuletzt, mit allen Entitäten)
+        error:    Fehlermeldung
+    """
+    events = queue.Queue()
+    start = time.perf_counter()
+    fetched_bytes = [0]
+
+    def listener(phase, details, status):
+        events.put((phase, details, status))
+
+    try:
+        job = job_manager.submit('report', run_report_job, url, token,
+                                 force_refresh=force_refresh, compact=compact,
+                                 save=save, listener=listener, sections=sections,
+                                 entity_filter=entity_filter)
+    except JobQueueFull as e:
+        yield sse_event('error', {'success': False, 'error': str(e)})
+        return
+
+    def progress_event(phase, details, status):
+        data = {'phase': phase, 'elapsed': round(time.perf_counter() - start, 3)}
+        if phase == 'fetched':
+            fetched_bytes[0] += details.get('bytes') or 0
+            data.update(name=details['name'], seconds=round(details['seconds'], 3),
+                        bytes=details.get('bytes'))
+        data.update(message=status['message'], progress=status['progress'],
+                    bytes_fetched=fetched_bytes[0])
+        return sse_event('progress', data)
+
+    summary_sent = False
+    while True:
+        try:
+            phase, details, status = events.get(timeout=0.25)
+        except queue.Empty:
+            if job.completed and events.empty():
+                break
+            continue
+        if phase == 'built':
+            summary_sent = True
+            yield sse_event('summary', {'elapsed': round(time.perf_counter() - start, 3),
+                                        'bytes_fetched': fetched_bytes[0],
+                                        'report': report_summary(details['report'])})
+        else:
+            yield progress_event(phase, details, status)
+
+    status = job.to_dict(include_result=True)
+    if status['status'] != 'done':
+        yield sse_event('error', {'success': False, 'error': status.get('error')})
+        return
+    result = status['result']
+    if not summary_sent:
+        # Report kam aus dem Cache; die Zusammenfassung trotzdem zuerst senden
+        yield sse_event('summary', {'elapsed': round(time.perf_counter() - start, 3),
+                                    'bytes_fetched': 0,
+                                    'report': report_summary(result['report'])})
+    payload = {'success': True, 'elapsed': round(time.perf_counter() - start, 3)}
+    payload.update(result)
+    # Der komplette Report wird inkrementell serialisiert (kompaktes JSON enthält keine Zeilenumbrüche)
+    yield b"event: report\ndata: "
+    yield from iter_json(payload, indent=None)
+    yield b"\n\n"
+
+@app.route('/api/jobs', methods=['POST'])
+def start_report_job():
+    """Starte die Report-Generierung im Hintergrund und gib die Job-ID zurück"""
+    data = request.json
+    url = data.get('url')
+    token = data.get('token')
+
+    if not url or not token:
+        return jsonify({'success': False, 'error': 'URL und Token sind erforderlich'})
+
+    try:
+        job = job_manager.submit(
+            'report', run_report_job, url, token,
+            force_refresh=bool(data.get('force_refresh')),
+            compact=bool(data.get('compact')),
+            save=bool(data.get('save_config')),
+            sections=parse_sections(data.get('sections')),
+            entity_filter=parse_filter(data.get('filter'))
+        )
+        return jsonify({'success': True, 'job_id': job.id, 'job': job.to_dict()})
+    except JobQueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def report_job_status(job_id):
+    """Fortschritt eines Jobs; nach Abschluss mit Ergebnis unter 'result'"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job nicht gefunden oder abgelaufen'}), 404
+    status = job.to_dict(include_result=True)
+    if 'result' not in status:
+        return jsonify({'success': True, 'job': status})
+    # Das Ergebnis enthält den vollständigen Report und wird gestreamt
+    return stream_response(iter_json({'success': True, 'job': status}, indent=None), 'job')
+
 @app.route('/api/download-report', methods=['POST'])
 def download_report():
     """Erstelle und lade Report-Datei herunter"""
@@ -101,151 +625,266 @@ def download_report():
         return jsonify({'success': False, 'error': 'URL und Token sind erforderlich'})
 
     try:
-        ha = HomeAssistantOverview(url, token)
-        report = ha.generate_report()
-
-        if report:
-            # Erstelle temporäres Verzeichnis falls nicht vorhanden
-            os.makedirs('downloads', exist_ok=True)
+        result = get_report(url, token,
+                            report_id=data.get('report_id'),
+                            force_refresh=bool(data.get('force_refresh')),
+                            sections=data.get('sections'),
+                            entity_filter=parse_filter(data.get('filter')))
 
+        if result:
+            report_id, report = result[0], result[1]
+            sections = get_report_sections(report)
+            compact = bool(data.get('compact'))
+            max_tokens = int(data['max_tokens']) if data.get('max_tokens') else None
+            collapse = data.get('collapse', True) is not False
+            if format_type == 'zip':
+                # Alle Formate aus einem Report, in einem Durchlauf erzeugt und als zip gestreamt
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                chunks = report_cache.iter_export(
+                    report_id,
+                    export_key('zip', sections, compact=compact, max_tokens=max_tokens, collapse=collapse),
+                    lambda: iter_report_bundle(
+                        report if compact else to_full_report(report), bundle_formats(report),
+                        name=f'ha_overview_{timestamp}', max_tokens=max_tokens, collapse=collapse
+                    )
+                )
+                return stream_response(chunks, 'download-report zip', mimetype='application/zip',
+                                       filename=f'ha_overview_{timestamp}.zip', compressible=False)
+            if format_type not in PARTIAL_FORMATS and not is_complete(report):
+                return jsonify({'success': False,
+                                'error': f'Format {format_type} benötigt alle Abschnitte'})
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            compress = bool(data.get('compress'))
+            suffix = '.gz' if compress else ''
+            export_stats = CompressionStats()
 
             if format_type == 'json':
-                filename = f'downloads/ha_overview_{timestamp}.json'
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(report, f, indent=2, ensure_ascii=False)
-            elif format_type == 'txt':
-                filename = f'downloads/ha_overview_{timestamp}.txt'
+                # JSON wird direkt zum Client gestreamt statt über downloads/
+                chunks = report_cache.iter_export(
+                    report_id, export_key('json', sections, compact=compact),
+                    lambda: iter_json(report if compact else to_full_report(report))
+                )
+                return stream_response(
+                    chunks, 'download-report json',
+                    filename=f'ha_overview_{timestamp}.json',
+                    compress=compress
+                )
+
+            if format_type == 'claude' and max_tokens:
+                # Aufgeteilter Export mit Token-Budget pro Teil, Teil für Teil gestreamt
+                chunks = report_cache.iter_export(
+                    report_id, export_key('claude', sections, max_tokens=max_tokens, collapse=collapse),
+                    lambda: iter_chunks(join_claude_chunks(
+                        iter_claude_chunks(report, max_tokens=max_tokens, collapse=collapse)))
+                )
+                return stream_response(
+                    chunks, 'download-report claude',
+                    mimetype='text/markdown',
+                    filename=f'ha_overview_{timestamp}_claude.md',
+                    compress=compress
+                )
+
+            # Erstelle temporäres Verzeichnis falls nicht vorhanden
+            os.makedirs('downloads', exist_ok=True)
+
+            if format_type == 'txt':
+                filename = f'downloads/ha_overview_{timestamp}.txt{suffix}'
                 # Vereinfachte Textausgabe
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write("="*80 + "\n")
-                    f.write("HOME ASSISTANT - VOLLSTÄNDIGER ÜBERBLICK\n")
-                    f.write("="*80 + "\n")
-                    f.write(f"Generiert am: {datetime.now().strftime('%d.%m.%Y um %H:%M:%S')}\n")
-                    f.write("="*80 + "\n\n")
-                    f.write(f"System: {report['system_info']['version']}\n")
-                    f.write(f"Entitäten: {report['statistics']['total_entities']}\n")
-                    f.write(f"Komponenten: {report['statistics']['total_components']}\n")
+                with render_seconds.time(output='download-report txt'), \
+                        open_export(filename, compress, export_stats) as f:
+                    f.write(generate_text_summary(report))
             elif format_type == 'claude':
-                filename = f'downloads/ha_overview_{timestamp}_claude.md'
-                with open(filename, 'w', encoding='utf-8') as f:
+                filename = f'downloads/ha_overview_{timestamp}_claude.md{suffix}'
+                with render_seconds.time(output='download-report claude'), \
+                        open_export(filename, compress, export_stats) as f:
                     f.write(generate_claude_format(report))
             else:
                 return jsonify({'success': False, 'error': 'Ungültiges Format'})
 
-            return send_file(filename, as_attachment=True)
+            log_transfer(f'download-report {format_type}', export_stats)
+            # Ohne expliziten Typ würde .gz als Content-Encoding ausgeliefert
+            return send_file(filename, as_attachment=True,
+                             mimetype='application/gzip' if compress else None)
         else:
             return jsonify({'success': False, 'error': 'Report-Generierung fehlgeschlagen'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/entities', methods=['POST'])
+def query_entities():
+    """Filtere Entitäten eines Reports seitenweise"""
+    data = request.json
+    url = data.get('url')
+    token = data.get('token')
+
+    if not url or not token:
+        return jsonify({'success': False, 'error': 'URL und Token sind erforderlich'})
+
+    try:
+        result = get_report(url, token,
+                            report_id=data.get('report_id'),
+                            force_refresh=bool(data.get('force_refresh')))
+        if not result:
+            return jsonify({'success': False, 'error': 'Report-Generierung fehlgeschlagen'})
+
+        report_id, report, _ = result
+        index = report_cache.get_index(url, token, 'entities', report_id)
+        if index is None:
+            # Z.B. Report aus dem gemeinsamen Cache: Index einmal aufbauen und behalten
+            index = EntityIndex(get_report_states(report))
+            report_cache.set_index(url, token, 'entities', index, report_id)
+
+        page = index.query(
+            domain=data.get('domain') or None,
+            device_class=data.get('device_class') or None,
+            state=data.get('state') or None,
+            search=data.get('search') or None,
+            cursor=data.get('cursor'),
+            limit=data.get('limit', DEFAULT_PAGE_SIZE)
+        )
+        return jsonify({
+            'success': True,
+            'report_id': report_id,
+            'entities': page['entities'],
+            'next_cursor': page['next_cursor']
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/search', methods=['POST'])
+def search_entities():
+    """Volltext-Suche über die Entitäten eines Reports"""
+    data = request.json
+    url = data.get('url')
+    token = data.get('token')
+    query = data.get('q', '')
+
+    if not url or not token:
+        return jsonify({'success': False, 'error': 'URL und Token sind erforderlich'})
+
+    try:
+        result = get_report(url, token,
+                            report_id=data.get('report_id'),
+                            force_refresh=bool(data.get('force_refresh')))
+        if not result:
+            return jsonify({'success': False, 'error': 'Report-Generierung fehlgeschlagen'})
+
+        report_id, report, _ = result
+        index = report_cache.get_index(url, token, 'search', report_id)
+        if index is None:
+            # Z.B. Report aus dem gemeinsamen Cache: Index einmal aufbauen und behalten
+            index = SearchIndex(get_report_states(report))
+            report_cache.set_index(url, token, 'search', index, report_id)
+
+        hits = index.search(
+            query,
+            limit=max(1, min(int(data.get('limit', 20)), 200)),
+            fuzzy=data.get('fuzzy', True)
+        )
+        return jsonify({
+            'success': True,
+            'report_id': report_id,
+            'results': hits
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/fleet-report', methods=['POST'])
+def fleet_report():
+    """Gemeinsamer Bericht über mehrere Home Assistant Instanzen"""
+    data = request.json
+    instances = data.get('instances') or []
+
+    if not instances or not all(i.get('url') and i.get('token') for i in instances):
+        return jsonify({'success': False, 'error': 'URL und Token sind für jede Instanz erforderlich'})
+
+    try:
+        timeout = float(data.get('timeout', DEFAULT_FLEET_TIMEOUT))
+        if not timeout > 0:
+            return jsonify({'success': False, 'error': 'timeout muss größer als 0 sein'})
+        collector = FleetCollector(
+            instances,
+            max_workers=min(int(data.get('workers', FLEET_WORKERS)), FLEET_WORKERS),
+            timeout=min(timeout, FLEET_MAX_TIMEOUT)
+        )
+        payload = {'success': True, 'report': collector.generate_report()}
+        return stream_response(iter_json(payload, indent=None), 'fleet-report')
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def check_snapshot_access(data):
+    """
+    Prüfe URL und Token für Snapshot-Abfragen
+
+    Returns:
+        Fehler-Response oder None, wenn der Zugriff erlaubt ist
+    """
+    if snapshot_store is None:
+        return jsonify({'success': False, 'error': 'Snapshots sind deaktiviert'})
+    url = data.get('url')
+    token = data.get('token')
+    if not url or not token:
+        return jsonify({'success': False, 'error': 'URL und Token sind erforderlich'})
+    # Die Historie einer Instanz sieht nur, wer einen gültigen Token dafür hat
+    if not HomeAssistantOverview(url, token).test_connection():
+        return jsonify({'success': False, 'error': 'Verbindung fehlgeschlagen'})
+    return None
+
+@app.route('/api/snapshots', methods=['POST'])
+def list_snapshots():
+    """Liste die gespeicherten Snapshots einer Instanz"""
+    data = request.json
+
+    try:
+        error = check_snapshot_access(data)
+        if error:
+            return error
+        limit = max(1, min(int(data.get('limit', 50)), 500))
+        return jsonify({
+            'success': True,
+            'snapshots': snapshot_store.list_snapshots(data['url'], limit)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/snapshots/diff', methods=['POST'])
+def diff_snapshots():
+    """Vergleiche zwei Snapshots (Standard: die beiden neuesten)"""
+    data = request.json
+
+    try:
+        error = check_snapshot_access(data)
+        if error:
+            return error
+        instance = data['url'].rstrip('/')
+        from_id = data.get('from_id')
+        to_id = data.get('to_id')
+        try:
+            # IDs kommen auch als Text ("5"); die Datenbank kennt sie als Zahl
+            from_id = None if from_id is None else int(from_id)
+            to_id = None if to_id is None else int(to_id)
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'from_id und to_id müssen Zahlen sein'})
+        if from_id is None or to_id is None:
+            latest = snapshot_store.list_snapshots(instance, 2)
+            if len(latest) < 2:
+                return jsonify({'success': False, 'error': 'Mindestens zwei Snapshots erforderlich'})
+            to_id, from_id = latest[0]['id'], latest[1]['id']
+        for snapshot_id in (from_id, to_id):
+            if snapshot_store.instance_of(snapshot_id) != instance:
+                return jsonify({'success': False, 'error': f'Snapshot {snapshot_id} nicht gefunden'})
+        return jsonify({
+            'success': True,
+            'diff': snapshot_store.diff(from_id, to_id)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Laufzeit-Metriken im Prometheus-Textformat"""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
 
-def generate_claude_format(report):
-    """Generiere Claude-freundliches Markdown-Format"""
-    lines = []
-
-    # Header
-    lines.append("# Home Assistant Konfiguration")
-    lines.append("")
-    lines.append("Dieser Export enthält alle relevanten Informationen meiner Home Assistant Installation.")
-    lines.append("Bitte nutze diese Daten um mir bei Fragen, Automatisierungen oder Problemlösungen zu helfen.")
-    lines.append("")
-
-    # System Info
-    sys_info = report.get('system_info', {})
-    lines.append("## System Information")
-    lines.append("")
-    lines.append(f"- **Version:** {sys_info.get('version', 'Unbekannt')}")
-    lines.append(f"- **Standort:** {sys_info.get('location_name', 'Unbekannt')}")
-    lines.append(f"- **Zeitzone:** {sys_info.get('timezone', 'Unbekannt')}")
-    lines.append(f"- **Einheiten:** {sys_info.get('unit_system', 'Unbekannt')}")
-    lines.append("")
-
-    # Statistiken
-    stats = report.get('statistics', {})
-    lines.append("## Übersicht / Statistiken")
-    lines.append("")
-    lines.append(f"- **Komponenten/Integrationen:** {stats.get('total_components', 0)}")
-    lines.append(f"- **Entitäten gesamt:** {stats.get('total_entities', 0)}")
-    lines.append(f"- **Services:** {stats.get('total_services', 0)}")
-    lines.append(f"- **Domains:** {stats.get('total_domains', 0)}")
-    lines.append(f"- **Events:** {stats.get('total_events', 0)}")
-    lines.append("")
-
-    # Entitäten nach Domain
-    entities_by_domain = report.get('entities_by_domain', {})
-    if entities_by_domain:
-        lines.append("## Entitäten nach Domain")
-        lines.append("")
-        lines.append("| Domain | Anzahl |")
-        lines.append("|--------|--------|")
-        for domain, count in sorted(entities_by_domain.items(), key=lambda x: -x[1]):
-            lines.append(f"| {domain} | {count} |")
-        lines.append("")
-
-    # Detaillierte Entitäten
-    detailed = report.get('detailed_entities', {})
-    if detailed:
-        lines.append("## Alle Entitäten (Details)")
-        lines.append("")
-        for domain, entities in sorted(detailed.items()):
-            lines.append(f"### {domain.upper()} ({len(entities)} Entitäten)")
-            lines.append("")
-            for entity in entities:
-                entity_id = entity.get('entity_id', 'unknown')
-                friendly_name = entity.get('attributes', {}).get('friendly_name', entity_id)
-                state = entity.get('state', 'unknown')
-                device_class = entity.get('attributes', {}).get('device_class', '')
-
-                device_info = f" ({device_class})" if device_class else ""
-                lines.append(f"- `{entity_id}`: **{friendly_name}**{device_info} = `{state}`")
-            lines.append("")
-
-    # Installierte Komponenten
-    components = report.get('components', [])
-    if components:
-        lines.append("## Installierte Komponenten/Integrationen")
-        lines.append("")
-        # Gruppiere in Zeilen zu je 5
-        for i in range(0, len(components), 5):
-            chunk = components[i:i+5]
-            lines.append("- " + ", ".join(f"`{c}`" for c in chunk))
-        lines.append("")
-
-    # Services (gruppiert)
-    services = report.get('services', [])
-    if services:
-        lines.append("## Verfügbare Services")
-        lines.append("")
-        services_by_domain = {}
-        for service in services:
-            domain = service.get('domain', 'unknown')
-            if domain not in services_by_domain:
-                services_by_domain[domain] = []
-            services_by_domain[domain].append(service.get('service', ''))
-
-        for domain, service_list in sorted(services_by_domain.items()):
-            lines.append(f"### {domain}")
-            for svc in sorted(service_list):
-                lines.append(f"- `{domain}.{svc}`")
-            lines.append("")
-
-    # Footer mit Hinweis
-    lines.append("---")
-    lines.append("")
-    lines.append("## Hinweise für Claude")
-    lines.append("")
-    lines.append("Mit diesen Daten kannst du mir helfen bei:")
-    lines.append("- Automatisierungen erstellen (YAML für automations.yaml)")
-    lines.append("- Skripte schreiben")
-    lines.append("- Dashboard/Lovelace Konfigurationen")
-    lines.append("- Problemdiagnose")
-    lines.append("- Entity-IDs für Szenen und Skripte finden")
-    lines.append("- Service-Calls zusammenstellen")
-    lines.append("")
-    lines.append(f"*Exportiert am: {datetime.now().strftime('%d.%m.%Y um %H:%M:%S')}*")
-
-    return "\n".join(lines)
 
 if __name__ == '__main__':
     # Erstelle templates-Verzeichnis falls nicht vorhanden
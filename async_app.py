@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Home Assistant Overview - Asynchroner Web-Server
+aiohttp-basierte Variante der Web-Anwendung: Home Assistant wird über eine
+Event-Loop abgefragt, sodass ein Prozess viele Reports gleichzeitig erstellt.
+Frontend, Report-Cache, Snapshots und Indizes werden von app.py übernommen.
+"""
+
+import asyncio
+import functools
+import json
+import os
+from datetime import datetime
+
+import aiohttp
+from aiohttp import web
+
+from app import (
+    app as flask_app, report_cache, snapshot_store, build_indexes, load_config, save_config,
+    log_transfer, metrics, record_report_metrics, render_seconds, report_requests,
+    USE_STATE_MIRROR, MIRROR_LIMITS, STREAM_STATES, METRICS_CONTENT_TYPE
+)
+from entity_filter import parse_filter
+from entity_index import EntityIndex, DEFAULT_PAGE_SIZE
+from entity_model import json_default
+from exporters import (
+    CompressionStats, iter_chunks, iter_counted, iter_gzip, iter_json,
+    generate_claude_format, generate_text_summary, iter_claude_chunks, join_claude_chunks
+)
+from ha_async import AsyncHomeAssistantOverview, create_session
+from ha_overview import PARTIAL_FORMATS, bundle_formats
+from report_cache import cache_key, export_key
+from report_format import (
+    REPORT_SECTIONS, get_report_sections, get_report_states, is_complete, parse_sections, select_sections,
+    to_full_report
+)
+from report_writer import iter_report_bundle
+from search_index import SearchIndex
+from state_mirror import get_mirror
+
+# Port des asynchronen Servers
+PORT = int(os.environ.get('HA_ASYNC_PORT', 5001))
+
+# Geteilte aiohttp-Session des Prozesses (siehe _session_context)
+HA_SESSION = web.AppKey('ha_session', aiohttp.ClientSession)
+
+# Laufende Report-Generierungen pro Instanz und Token; gleichzeitige Anfragen
+# für dieselbe Instanz warten auf dieselbe Abfrage statt Home Assistant mehrfach abzufragen
+_pending = {}
+
+
+def json_response(data):
+    return web.json_response(data, dumps=lambda obj: json.dumps(obj, ensure_ascii=False,
+                                                                default=json_default))
+
+
+async def read_json(request):
+    """Request-Body als Dict (leeres Dict bei fehlendem oder ungültigem JSON)"""
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def iter_in_executor(chunks):
+    """
+    Treibe einen synchronen Iterator Block für Block in einem Worker-Thread
+
+    Rendern, Serialisieren und Komprimieren sind CPU-Arbeit; liefe der
+    Iterator direkt auf der Event-Loop, stünden währenddessen alle anderen
+    Anfragen des Servers still.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = iter(chunks)
+    done = object()
+    pending = None
+    try:
+        while True:
+            pending = loop.run_in_executor(None, next, iterator, done)
+            # shield: wird die Anfrage abgebrochen, läuft next() im Thread zu Ende
+            chunk = await asyncio.shield(pending)
+            pending = None
+            if chunk is done:
+                return
+            yield chunk
+    finally:
+        # Abbruch (z.B. Client getrennt): Generator erst nach dem laufenden next()
+        # und im Thread schließen, damit sein Aufräumen nicht die Event-Loop blockiert
+        if pending is not None:
+            await asyncio.wait([pending])
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await loop.run_in_executor(None, close)
+
+
+async def stream_response(request, chunks, label, content_type='application/json',
+                          filename=None, compress=False, compressible=True):
+    """
+    Streame Byte-Blöcke zum Client (Gegenstück zu app.stream_response)
+
+    Args:
+        chunks: Iterator über Byte-Blöcke (wird außerhalb der Event-Loop abgearbeitet)
+        label: Bezeichnung für die Größen-Ausgabe auf der Konsole
+        filename: Dateiname für den Download (Content-Disposition)
+        compress: Als .gz-Datei ausliefern; sonst wird gzip als Content-Encoding
+                  verwendet, wenn der Client es akzeptiert
+        compressible: False für bereits komprimierte Inhalte (z.B. zip)
+    """
+    response = web.StreamResponse(headers={'Vary': 'Accept-Encoding'})
+    stats = CompressionStats()
+    if not compressible:
+        chunks = iter_counted(chunks, stats)
+    elif compress:
+        chunks = iter_gzip(chunks, stats)
+        content_type = 'application/gzip'
+        filename = f"{filename}.gz" if filename else None
+    elif 'gzip' in request.headers.get('Accept-Encoding', '').lower():
+        chunks = iter_gzip(chunks, stats)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        chunks = iter_counted(chunks, stats)
+    if filename:
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.content_type = content_type
+
+    await response.prepare(request)
+    with render_seconds.time(output=label):
+        body = iter_in_executor(chunks)
+        try:
+            async for chunk in body:
+                await response.write(chunk)
+        finally:
+            await body.aclose()
+        await response.write_eof()
+    log_transfer(label, stats)
+    return response
+
+
+async def _generate(app, url, token, sections, entity_filter):
+    """Erstelle einen neuen Report und lege ihn im Cache ab (Teil- und gefilterte Reports nicht)"""
+    loop = asyncio.get_running_loop()
+    mirror = None
+    if USE_STATE_MIRROR:
+        # Verdrängte Spiegel werden beim Holen gestoppt (bis zu 1s je Spiegel)
+        mirror = await loop.run_in_executor(None, functools.partial(get_mirror, url, token,
+                                                                    **MIRROR_LIMITS))
+    ha = AsyncHomeAssistantOverview(url, token, app[HA_SESSION], state_mirror=mirror,
+                                    stream_states=STREAM_STATES, entity_filter=entity_filter)
+    report = await ha.generate_report_async(compact=True, sections=sections)
+    if not report:
+        report_requests.inc(result='failed')
+        return None
+    if entity_filter is not None or len(sections) < len(REPORT_SECTIONS):
+        report['diagnostics'] = ha.diagnostics()
+        record_report_metrics(report['diagnostics'])
+        report_requests.inc(result='generated')
+        return None, report
+    # SQLite und Index-Aufbau blockieren; sie laufen außerhalb der Event-Loop
+    if snapshot_store is not None:
+        with ha._timed_phase('snapshot'):
+            await loop.run_in_executor(None, snapshot_store.add, url, report)
+    with ha._timed_phase('indexing'):
+        indexes = await loop.run_in_executor(None, build_indexes, report)
+    report['diagnostics'] = ha.diagnostics()
+    record_report_metrics(report['diagnostics'])
+    report_requests.inc(result='generated')
+    if report_cache.shared is None:
+        return report_cache.put(url, token, report, indexes=indexes), report
+    # Der gemeinsame Cache serialisiert den Report nach SQLite
+    put = functools.partial(report_cache.put, url, token, report, indexes=indexes)
+    return await loop.run_in_executor(None, put), report
+
+
+async def get_report(app, url, token, report_id=None, force_refresh=False, sections=None,
+                     entity_filter=None):
+    """
+    Hole einen Report aus dem Cache oder generiere ihn neu (siehe app.get_report)
+
+    Returns:
+        Tupel (report_id, report, cached) oder None bei Fehlschlag
+    """
+    sections = parse_sections(sections)
+    if not force_refresh and entity_filter is None:
+        if report_cache.shared is None:
+            cached = report_cache.get(url, token, report_id)
+        else:
+            # Ein Report aus dem gemeinsamen Cache wird aus SQLite geladen
+            loop = asyncio.get_running_loop()
+            cached = await loop.run_in_executor(None, report_cache.get, url, token, report_id)
+        if cached:
+            report_requests.inc(result='cached')
+            return cached[0], select_sections(cached[1], sections), True
+
+    key = (cache_key(url, token), sections, entity_filter)
+    task = _pending.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_generate(app, url, token, sections, entity_filter))
+        _pending[key] = task
+        task.add_done_callback(lambda _: _pending.pop(key, None))
+    # shield: bricht ein Client ab, läuft die Abfrage für die übrigen weiter
+    result = await asyncio.shield(task)
+    if not result:
+        return None
+    return result[0], result[1], False
+
+
+routes = web.RouteTableDef()
+
+
+@routes.get('/')
+async def index(request):
+    """Hauptseite mit Anleitung und Formular"""
+    config = await asyncio.get_running_loop().run_in_executor(None, load_config)
+    html = flask_app.jinja_env.get_template('index.html').render(
+        saved_url=config.get('url', ''),
+        has_config=bool(config)
+    )
+    return web.Response(text=html, content_type='text/html')
+
+
+@routes.post('/api/test-connection')
+async def test_connection(request):
+    """Teste die Verbindung zu Home Assistant"""
+    data = await read_json(request)
+    url = data.get('url')
+    token = data.get('token')
+
+    if not url or not token:
+        return json_response({'success': False, 'error': 'URL und Token sind erforderlich'})
+
+    try:
+        ha = AsyncHomeAssistantOverview(url, token, request.app[HA_SESSION])
+        if await ha.test_connection_async():
+            if data.get('save_config'):
+                await asyncio.get_running_loop().run_in_executor(None, save_config, url, token)
+            return json_response({'success': True, 'message': 'Verbindung erfolgreich!'})
+        return json_response({'success': False, 'error': 'Verbindung fehlgeschlagen'})
+    except Exception as e:
+        return json_response({'success': False, 'error': str(e)})
+
+
+@routes.post('/api/generate-report')
+async def generate_report(request):
+    """Generiere vollständigen Bericht"""
+    data = await read_json(request)
+    url = data.get('url')
+    token = data.get('token')
+
+    if not url or not token:
+        return json_response({'success': False, 'error': 'URL und Token sind erforderlich'})
+
+    try:
+        result = await get_report(request.app, url, token,
+                                  force_refresh=bool(data.get('force_refresh')),
+                                  sections=data.get('sections'),
+                                  entity_filter=parse_filter(data.get('filter')))
+        if not result:
+            return json_response({'success': False, 'error': 'Report-Generierung fehlgeschlagen'})
+
+        report_id, report, cached = result
+        if data.get('save_config'):
+            await asyncio.get_running_loop().run_in_executor(None, save_config, url, token)
+        if not data.get('compact'):
+            report = to_full_report(report)
+        payload = {
+            'success': True,
+            'report_id': report_id,
+            'cached': cached,
+            'report': report
+        }
+        return await stream_response(request, iter_json(payload, indent=None), 'generate-report')
+    except Exception as e:
+        return json_response({'success': False, 'error': str(e)})
+
+
+@routes.post('/api/download-report')
+async def download_report(request):
+    """Erstelle und lade Report-Datei herunter"""
+    data = await read_json(request)
+    url = data.get('url')
+    token = data.get('token')
+    format_type = data.get('format', 'json')
+
+    if not url or not token:
+        return json_response({'success': False, 'error': 'URL und Token sind erforderlich'})
+    if format_type not in ('json', 'txt', 'claude', 'zip'):
+        return json_response({'success': False, 'error': 'Ungültiges Format'})
+
+    try:
+        result = await get_report(request.app, url, token,
+                                  report_id=data.get('report_id'),
+                                  force_refresh=bool(data.get('force_refresh')),
+                                  sections=data.get('sections'),
+                                  entity_filter=parse_filter(data.get('filter')))
+        if not result:
+            return json_response({'success': False, 'error': 'Report-Generierung fehlgeschlagen'})
+
+        report_id, report = result[0], result[1]
+        if format_type not in PARTIAL_FORMATS + ('zip',) and not is_complete(report):
+            return json_response({'success': False,
+                                  'error': f'Format {format_type} benötigt alle Abschnitte'})
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        compress = bool(data.get('compress'))
+        compact = bool(data.get('compact'))
+        max_tokens = int(data['max_tokens']) if data.get('max_tokens') else None
+        collapse = data.get('collapse', True) is not False
+        sections = get_report_sections(report)
+
+        # Alle Formate werden direkt gestreamt statt über downloads/ geschrieben;
+        # gerenderte Exporte teilen sich die Worker über den gemeinsamen Cache
+        if format_type == 'zip':
+            # Alle Formate aus einem Report, in einem Durchlauf erzeugt; Rendern und
+            # Packen laufen über stream_response in einem Worker-Thread
+            chunks = report_cache.iter_export(
+                report_id,
+                export_key('zip', sections, compact=compact, max_tokens=max_tokens, collapse=collapse),
+                lambda: iter_report_bundle(
+                    report if compact else to_full_report(report), bundle_formats(report),
+                    name=f'ha_overview_{timestamp}', max_tokens=max_tokens, collapse=collapse
+                )
+            )
+            return await stream_response(request, chunks, 'download-report zip',
+                                         content_type='application/zip',
+                                         filename=f'ha_overview_{timestamp}.zip', compressible=False)
+        if format_type == 'json':
+            key = export_key('json', sections, compact=compact)
+            render = lambda: iter_json(report if compact else to_full_report(report))
+            filename = f'ha_overview_{timestamp}.json'
+            content_type = 'application/json'
+        elif format_type == 'txt':
+            # Kurze Zusammenfassung: neu rendern ist billiger als der Cache
+            key = None
+            render = lambda: iter_chunks([generate_text_summary(report)])
+            filename = f'ha_overview_{timestamp}.txt'
+            content_type = 'text/plain'
+        else:
+            key = export_key('claude', sections, max_tokens=max_tokens, collapse=collapse)
+            if max_tokens:
+                render = lambda: iter_chunks(join_claude_chunks(iter_claude_chunks(
+                    report, max_tokens=max_tokens, collapse=collapse
+                )))
+            else:
+                render = lambda: iter_chunks([generate_claude_format(report)])
+            filename = f'ha_overview_{timestamp}_claude.md'
+            content_type = 'text/markdown'
+
+        chunks = report_cache.iter_export(report_id, key, render) if key else render()
+        return await stream_response(request, chunks, f'download-report {format_type}',
+                                     content_type=content_type, filename=filename,
+                                     compress=compress)
+    except Exception as e:
+        return json_response({'success': False, 'error': str(e)})
+
+
+@routes.post('/api/entities')
+async def query_entities(request):
+    """Filtere Entitäten eines Reports seitenweise"""
+    data = await read_json(request)
+    url = data.get('url')
+    token = data.get('token')
+
+    if not url or not token:
+        return json_response({'success': False, 'error': 'URL und Token sind erforderlich'})
+
+    try:
+        result = await get_report(request.app, url, token,
+                                  report_id=data.get('report_id'),
+                                  force_refresh=bool(data.get('force_refresh')))
+        if not result:
+            return json_response({'success': False, 'error': 'Report-Generierung fehlgeschlagen'})
+
+        report_id, report, _ = result
+        index = report_cache.get_index(url, token, 'entities', report_id)
+        if index is None:
+            # Z.B. Report aus dem gemeinsamen Cache: Index einmal aufbauen und behalten
+            index = EntityIndex(get_report_states(report))
+            report_cache.set_index(url, token, 'entities', index, report_id)
+
+        page = index.query(
+            domain=data.get('domain') or None,
+            device_class=data.get('device_class') or None,
+            state=data.get('state') or None,
+            search=data.get('search') or None,
+            cursor=data.get('cursor'),
+            limit=data.get('limit', DEFAULT_PAGE_SIZE)
+        )
+        return json_response({
+            'success': True,
+            'report_id': report_id,
+            'entities': page['entities'],
+            'next_cursor': page['next_cursor']
+        })
+    except Exception as e:
+        return json_response({'success': False, 'error': str(e)})
+
+
+@routes.post('/api/search')
+async def search_entities(request):
+    """Volltext-Suche über die Entitäten eines Reports"""
+    data = await read_json(request)
+    url = data.get('url')
+    token = data.get('token')
+
+    if not url or not token:
+        return json_response({'success': False, 'error': 'URL und Token sind erforderlich'})
+
+    try:
+        result = await get_report(request.app, url, token,
+                                  report_id=data.get('report_id'),
+                                  force_refresh=bool(data.get('force_refresh')))
+        if not result:
+            return json_response({'success': False, 'error': 'Report-Generierung fehlgeschlagen'})
+
+        report_id, report, _ = result
+        index = report_cache.get_index(url, token, 'search', report_id)
+        if index is None:
+            # Z.B. Report aus dem gemeinsamen Cache: Index einmal aufbauen und behalten
+            index = SearchIndex(get_report_states(report))
+            report_cache.set_index(url, token, 'search', index, report_id)
+
+        hits = index.search(
+            data.get('q', ''),
+            limit=max(1, min(int(data.get('limit', 20)), 200)),
+            fuzzy=data.get('fuzzy', True)
+        )
+        return json_response({
+            'success': True,
+            'report_id': report_id,
+            'results': hits
+        })
+    except Exception as e:
+        return json_response({'success': False, 'error': str(e)})
+
+
+@routes.get('/metrics')
+async def prometheus_metrics(request):
+    """Laufzeit-Metriken im Prometheus-Textformat (geteilt mit app.py)"""
+    return web.Response(text=metrics.render(), headers={'Content-Type': METRICS_CONTENT_TYPE})
+
+
+async def _session_context(app):
+    """Eine geteilte aiohttp-Session für alle Abfragen des Prozesses"""
+    app[HA_SESSION] = create_session()
+    yield
+    await app[HA_SESSION].close()
+
+
+def create_app():
+    app = web.Application()
+    app.add_routes(routes)
+    app.cleanup_ctx.append(_session_context)
+    return app
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("HOME ASSISTANT OVERVIEW - ASYNCHRONER SERVER")
+    print("="*80)
+    print(f"\nStarte Server auf http://localhost:{PORT}")
+    print("Drücke CTRL+C zum Beenden\n")
+
+    web.run_app(create_app(), host='0.0.0.0', port=PORT, print=None)
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Benchmark der Report-Generierung
+Startet einen simulierten Home Assistant (fake_ha) in einem eigenen Prozess und
+misst für verschiedene Installationsgrößen Gesamtdauer, Dauer je Phase und
+Endpunkt sowie den Spitzenspeicher von generate_report und den Speicher, den der
+fertige Report belegt. Ergebnisse lassen sich
+als Baseline speichern und mit späteren Läufen vergleichen.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import requests
+
+from exporters import iter_json
+from fake_ha import DEFAULT_TOKEN
+from ha_overview import HomeAssistantOverview, FETCH_STEPS
+
+# Simulierter Server (läuft als eigener Prozess, damit er die Messung nicht beeinflusst)
+FAKE_HA_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_ha.py')
+
+# Standard-Installationsgrößen (Anzahl Entitäten)
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# Messläufe pro Größe (der Median wird verwendet)
+DEFAULT_REPEATS = 3
+
+# Datei mit den Referenzwerten
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+# Ab dieser relativen Verschlechterung gilt ein Wert als Regression
+DEFAULT_THRESHOLD = 0.25
+
+# Werte unterhalb dieser Dauer (Sekunden) werden nicht als Regression gewertet,
+# da sie vor allem Messrauschen enthalten
+MIN_COMPARABLE_SECONDS = 0.1
+
+# Kennzahlen in Bytes (alle übrigen sind Sekunden)
+MEMORY_METRICS = ('peak_memory', 'retained_memory')
+
+# Phasen aus den Fortschrittsmeldungen von generate_report (Start, Ende)
+PHASES = (
+    ('connect', 'connecting', 'fetching'),
+    ('fetch', 'fetching', 'building'),
+    ('build', 'building', 'built'),
+)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def fake_server(entities, delay=0.0):
+    """Simulierten Home Assistant in einem eigenen Prozess starten"""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, FAKE_HA_SCRIPT, '--entities', str(entities), '--port', str(port),
+         '--delay', str(delay)],
+        stdout=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 120
+        while True:
+            try:
+                requests.get(f"{url}/api/", timeout=1)
+                break
+            except requests.ConnectionError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("Simulierter Server startet nicht")
+                time.sleep(0.1)
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run_once(url, concurrent=True, compact=True, trace_memory=False):
+    """
+    Einen Report erzeugen und messen
+
+    Returns:
+        Dict mit 'total', 'phases', 'endpoints', 'bytes' und ggf. 'peak_memory'
+        und 'retained_memory' (vom fertigen Report belegter Speicher)
+    """
+    marks = {}
+
+    def progress(phase, **details):
+        marks.setdefault(phase, time.perf_counter())
+
+    ha = HomeAssistantOverview(url, DEFAULT_TOKEN, progress=progress)
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            report = ha.generate_report(concurrent=concurrent, compact=compact)
+            generated = time.perf_counter()
+            retained = tracemalloc.get_traced_memory()[0] if trace_memory else None
+            size = sum(len(chunk) for chunk in iter_json(report, indent=None))
+            end = time.perf_counter()
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    if not report:
+        raise RuntimeError("Report-Generierung fehlgeschlagen")
+
+    phases = {name: marks[stop] - marks[begin] for name, begin, stop in PHASES}
+    phases['serialize'] = end - generated
+    result = {
+        'total': generated - start,
+        'phases': phases,
+        'endpoints': dict(ha.fetch_timings),
+        'bytes': {'fetched': sum(ha.fetch_bytes.values()), 'report_json': size},
+    }
+    if peak is not None:
+        result['peak_memory'] = peak
+        result['retained_memory'] = retained
+    return result
+
+
+def benchmark(sizes=DEFAULT_SIZES, repeats=DEFAULT_REPEATS, delay=0.0, log=print):
+    """
+    Führe den Benchmark für alle Größen aus
+
+    Pro Größe gibt es einen Aufwärmlauf, repeats Messläufe für die Zeiten
+    (Median) und einen separaten Lauf mit tracemalloc für den Spitzenspeicher.
+
+    Returns:
+        Ergebnis-Dict im Baseline-Format
+    """
+    results = {}
+    for size in sizes:
+        log(f"  {size:>7,} Entitäten ...")
+        with fake_server(size, delay) as url:
+            run_once(url)
+            runs = [run_once(url) for _ in range(repeats)]
+            memory = run_once(url, trace_memory=True)
+        median = lambda values: round(statistics.median(values), 4)
+        results[str(size)] = {
+            'entities': size,
+            'total': median([run['total'] for run in runs]),
+            'phases': {name: median([run['phases'][name] for run in runs])
+                       for name in runs[0]['phases']},
+            'endpoints': {name: median([run['endpoints'][name] for run in runs])
+                          for name, _ in FETCH_STEPS},
+            'peak_memory': memory['peak_memory'],
+            'retained_memory': memory['retained_memory'],
+            'bytes': runs[0]['bytes'],
+        }
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeats': repeats,
+        'delay': delay,
+        'results': results
+    }
+
+
+def flatten(result):
+    """Vergleichbare Kennzahlen eines Größen-Ergebnisses (Name -> Wert)"""
+    values = {'total': result['total'], 'peak_memory': result['peak_memory'],
+              'retained_memory': result.get('retained_memory')}
+    values.update({f"phase.{name}": value for name, value in result['phases'].items()})
+    values.update({f"endpoint.{name}": value for name, value in result['endpoints'].items()})
+    return values
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Vergleiche einen Lauf mit der Baseline
+
+    Returns:
+        Liste von Dicts (size, metric, baseline, current, change, regression)
+    """
+    rows = []
+    for size, result in current['results'].items():
+        reference = baseline['results'].get(size)
+        if reference is None:
+            continue
+        old_values = flatten(reference)
+        for metric, value in flatten(result).items():
+            old = old_values.get(metric)
+            # Fehlende Werte (z.B. retained_memory) auf einer Seite werden übersprungen
+            if not old or value is None:
+                continue
+            change = (value - old) / old
+            comparable = metric in MEMORY_METRICS or max(old, value) >= MIN_COMPARABLE_SECONDS
+            rows.append({
+                'size': int(size),
+                'metric': metric,
+                'baseline': old,
+                'current': value,
+                'change': round(change, 3),
+                'regression': comparable and change > threshold
+            })
+    return rows
+
+
+def format_value(metric, value):
+    if metric in MEMORY_METRICS:
+        return f"{value / 1024 / 1024:8.1f} MB"
+    return f"{value * 1000:8.1f} ms"
+
+
+def print_results(data):
+    """Ergebnistabelle auf der Konsole"""
+    print(f"\n{'Entitäten':>10} {'Gesamt':>11} {'Verbinden':>11} {'Abfragen':>11} "
+          f"{'Aufbau':>11} {'JSON':>11} {'Speicher':>11} {'Report':>11}")
+    print("-"*92)
+    for result in data['results'].values():
+        phases = result['phases']
+        print(f"{result['entities']:>10,} {format_value('total', result['total'])} "
+              f"{format_value('', phases['connect'])} {format_value('', phases['fetch'])} "
+              f"{format_value('', phases['build'])} {format_value('', phases['serialize'])} "
+              f"{format_value('peak_memory', result['peak_memory'])} "
+              f"{format_value('retained_memory', result.get('retained_memory') or 0)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark der Report-Generierung")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="Kommagetrennte Anzahl Entitäten (Standard: 1000,10000,100000)")
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS,
+                        help=f"Messläufe pro Größe (Standard: {DEFAULT_REPEATS})")
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help="Simulierte Antwortzeit pro Anfrage in Sekunden (Standard: 0)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help=f"Baseline-Datei (Standard: {DEFAULT_BASELINE})")
+    parser.add_argument('--save', action='store_true',
+                        help="Ergebnis als neue Baseline speichern")
+    parser.add_argument('--compare', action='store_true',
+                        help="Mit der Baseline vergleichen; Exit-Code 1 bei Regressionen")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Erlaubte Verschlechterung (Standard: {DEFAULT_THRESHOLD:.0%})")
+    parser.add_argument('--output', metavar='DATEI', help="Ergebnis zusätzlich als JSON speichern")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    print(f"Benchmark: {len(sizes)} Größen, {args.repeats} Messläufe")
+    data = benchmark(sizes, args.repeats, args.delay)
+    print_results(data)
+
+    for path in filter(None, (args.output, args.baseline if args.save else None)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+        print(f"\n✓ Ergebnis gespeichert: {path}")
+
+    if args.compare:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(baseline, data, args.threshold)
+        regressions = [row for row in rows if row['regression']]
+        print(f"\nVergleich mit {args.baseline} ({baseline['created']}):")
+        for row in rows:
+            marker = '✗' if row['regression'] else ' '
+            print(f" {marker} {row['size']:>7,} {row['metric']:<22} "
+                  f"{format_value(row['metric'], row['baseline'])} → "
+                  f"{format_value(row['metric'], row['current'])} ({row['change']:+.0%})")
+        if regressions:
+            print(f"\n✗ {len(regressions)} Regression(en) über {args.threshold:.0%}")
+            return 1
+        print("\n✓ Keine Regressionen")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
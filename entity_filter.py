@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Regeln zum Ein- und Ausschließen von Entitäten
+Domains, Muster für entity_id (glob oder regulärer Ausdruck) und Bedingungen
+an Attribute werden einmal kompiliert und beim Einlesen von /api/states auf
+jede Entität angewendet; ausgeschlossene Entitäten werden nie gespeichert.
+"""
+
+import fnmatch
+import re
+
+# Schlüssel einer Regel-Beschreibung (Web-API "filter", siehe parse_filter)
+FILTER_KEYS = (
+    'include_domains', 'exclude_domains',
+    'include_entities', 'exclude_entities',
+    'include_attributes', 'exclude_attributes',
+)
+
+# Präfix für reguläre Ausdrücke in Mustern (sonst glob, z.B. sensor.*_temperatur)
+REGEX_PREFIX = 're:'
+
+# Attribut-Bedingung: name, name=wert, name!=wert, name~regex oder !name
+_CONDITION = re.compile(r'^(?P<negate>!)?(?P<name>[^=!~]+?)\s*(?:(?P<op>!=|=|~)\s*(?P<value>.*))?$')
+
+
+def _text(value):
+    """Attributwert als Text für Vergleiche (Wahrheitswerte wie in YAML/JSON)"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def _compile_patterns(patterns):
+    """
+    Kompiliere Muster für entity_id (leeres Tupel ohne Muster)
+
+    glob-Muster werden zu einem Ausdruck zusammengefasst; jeder reguläre
+    Ausdruck wird einzeln kompiliert, damit Flags wie (?i), Rückverweise und
+    benannte Gruppen nur für ihn selbst gelten.
+    """
+    globs = []
+    compiled = []
+    for pattern in patterns:
+        if pattern.startswith(REGEX_PREFIX):
+            expression = pattern[len(REGEX_PREFIX):]
+            try:
+                compiled.append(re.compile(expression))
+            except re.error as e:
+                raise ValueError(f"Ungültiger regulärer Ausdruck {expression!r}: {e}")
+        else:
+            globs.append(fnmatch.translate(pattern))
+    if globs:
+        try:
+            compiled.insert(0, re.compile('|'.join(globs)))
+        except re.error as e:
+            raise ValueError(f"Ungültiges Muster in {', '.join(globs)!r}: {e}")
+    return tuple(compiled)
+
+
+def _matches(patterns, entity_id):
+    """Trifft eines der kompilierten Muster die ganze entity_id?"""
+    return any(pattern.fullmatch(entity_id) for pattern in patterns)
+
+
+def _compile_condition(condition):
+    """Attribut-Bedingung als Funktion test(attributes) -> bool"""
+    match = _CONDITION.match(condition.strip())
+    if not match or (match['negate'] and match['op']):
+        raise ValueError(f"Ungültige Attribut-Bedingung {condition!r} "
+                         f"(erlaubt: name, !name, name=wert, name!=wert, name~regex)")
+    name, op, value = match['name'].strip(), match['op'], match['value']
+    if op is None and match['negate']:
+        return lambda attributes: attributes.get(name) is None
+    if op is None:
+        return lambda attributes: attributes.get(name) is not None
+    if op == '=':
+        return lambda attributes: attributes.get(name) is not None and _text(attributes[name]) == value
+    if op == '!=':
+        return lambda attributes: attributes.get(name) is None or _text(attributes[name]) != value
+    try:
+        expression = re.compile(value)
+    except re.error as e:
+        raise ValueError(f"Ungültiger regulärer Ausdruck {value!r}: {e}")
+    return lambda attributes: (attributes.get(name) is not None
+                               and expression.search(_text(attributes[name])) is not None)
+
+
+def _as_list(value, key):
+    """Regel-Liste aus Liste oder kommagetrenntem Text"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, (list, tuple)):
+        raise ValueError(f"{key} muss eine Liste sein")
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+class EntityFilter:
+    """
+    Kompilierte Ein- und Ausschluss-Regeln, aufrufbar als entity_filter(entity) -> bool
+
+    Eine Entität bleibt erhalten, wenn sie jede angegebene Art von
+    Einschluss-Regel erfüllt (Domain in include_domains, entity_id passt auf
+    eines der include_entities, alle include_attributes gelten) und keine
+    einzige Ausschluss-Regel auf sie zutrifft.
+    """
+
+    def __init__(self, include_domains=(), exclude_domains=(), include_entities=(),
+                 exclude_entities=(), include_attributes=(), exclude_attributes=()):
+        """
+        Args:
+            include_domains / exclude_domains: Domains, z.B. ['light', 'switch']
+            include_entities / exclude_entities: Muster für entity_id, glob
+                (z.B. 'sensor.*_temperatur') oder mit 're:' ein regulärer
+                Ausdruck, der die ganze entity_id treffen muss
+            include_attributes / exclude_attributes: Attribut-Bedingungen
+                'name' (vorhanden), '!name' (fehlt), 'name=wert', 'name!=wert'
+                oder 'name~regex'
+
+        Raises:
+            ValueError: Bei ungültigen Mustern oder Bedingungen
+        """
+        self.rules = {
+            'include_domains': sorted(set(include_domains)),
+            'exclude_domains': sorted(set(exclude_domains)),
+            'include_entities': list(include_entities),
+            'exclude_entities': list(exclude_entities),
+            'include_attributes': list(include_attributes),
+            'exclude_attributes': list(exclude_attributes),
+        }
+        self._include_domains = frozenset(include_domains)
+        self._exclude_domains = frozenset(exclude_domains)
+        self._include_entities = _compile_patterns(include_entities)
+        self._exclude_entities = _compile_patterns(exclude_entities)
+        self._include_attributes = [_compile_condition(c) for c in include_attributes]
+        self._exclude_attributes = [_compile_condition(c) for c in exclude_attributes]
+
+    def __call__(self, entity):
+        """Prüfe eine Entität (Dict aus /api/states oder kompakter Record)"""
+        entity_id = entity.get('entity_id') or ''
+        domain = entity_id.split('.', 1)[0]
+        if domain in self._exclude_domains:
+            return False
+        if self._include_domains and domain not in self._include_domains:
+            return False
+        if self._include_entities and not _matches(self._include_entities, entity_id):
+            return False
+        if self._exclude_entities and _matches(self._exclude_entities, entity_id):
+            return False
+        if self._include_attributes or self._exclude_attributes:
+            attributes = entity.get('attributes') or {}
+            for test in self._include_attributes:
+                if not test(attributes):
+                    return False
+            for test in self._exclude_attributes:
+                if test(attributes):
+                    return False
+        return True
+
+    def to_dict(self):
+        """Regeln in der Form von parse_filter (nur belegte Schlüssel)"""
+        return {key: list(value) for key, value in self.rules.items() if value}
+
+    def __eq__(self, other):
+        return isinstance(other, EntityFilter) and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash(tuple((key, tuple(value)) for key, value in self.to_dict().items()))
+
+    def __repr__(self):
+        return f"EntityFilter({self.to_dict()!r})"
+
+
+def parse_filter(rules):
+    """
+    Erstelle einen EntityFilter aus einer Regel-Beschreibung
+
+    Args:
+        rules: Dict mit Schlüsseln aus FILTER_KEYS; Werte sind Listen oder
+               kommagetrennter Text. None oder leere Regeln ergeben None.
+
+    Returns:
+        EntityFilter oder None, wenn keine Regel angegeben ist
+
+    Raises:
+        ValueError: Bei unbekannten Schlüsseln, ungültigen Mustern oder Bedingungen
+    """
+    if not rules:
+        return None
+    if not isinstance(rules, dict):
+        raise ValueError("Filter muss ein Objekt mit Regeln sein")
+    unknown = sorted(set(rules) - set(FILTER_KEYS))
+    if unknown:
+        raise ValueError(f"Unbekannte Filter-Regeln: {', '.join(unknown)} "
+                         f"(möglich: {', '.join(FILTER_KEYS)})")
+    lists = {key: _as_list(rules.get(key), key) for key in FILTER_KEYS}
+    if not any(lists.values()):
+        return None
+    return EntityFilter(**lists)
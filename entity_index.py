@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Entitäten-Index für Reports
+Wird einmal pro Report aufgebaut und beantwortet gefilterte, seitenweise
+Abfragen, ohne bei jeder Abfrage alle Entitäten zu durchlaufen
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+
+# Standard- und Maximalgröße einer Seite
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class EntityIndex:
+    def __init__(self, states):
+        """
+        Baue die Indizes auf
+
+        Args:
+            states: Liste aller Entitäten (Format von /api/states)
+        """
+        self.states = states
+        by_domain = defaultdict(list)
+        by_device_class = defaultdict(list)
+        by_state = defaultdict(list)
+        search_text = []
+        # Positionen werden aufsteigend angehängt, die Listen sind also sortiert
+        for position, entity in enumerate(states):
+            entity_id = entity['entity_id']
+            attributes = entity.get('attributes') or {}
+            by_domain[entity_id.split('.')[0]].append(position)
+            device_class = attributes.get('device_class')
+            if device_class:
+                by_device_class[device_class].append(position)
+            by_state[str(entity.get('state'))].append(position)
+            search_text.append(f"{entity_id}\n{attributes.get('friendly_name', '')}".lower())
+        self.by_domain = dict(by_domain)
+        self.by_device_class = dict(by_device_class)
+        self.by_state = dict(by_state)
+        self._search_text = search_text
+
+    def __len__(self):
+        return len(self.states)
+
+    def _candidates(self, domain=None, device_class=None, state=None):
+        """Sortierte Positionsliste aller Entitäten, die die exakten Filter erfüllen"""
+        lists = []
+        for index, value in ((self.by_domain, domain),
+                             (self.by_device_class, device_class),
+                             (self.by_state, state)):
+            if value is not None:
+                lists.append(index.get(value, []))
+        if not lists:
+            return range(len(self.states))
+        # Mit der kürzesten Liste beginnen und die übrigen schneiden
+        lists.sort(key=len)
+        if len(lists) == 1:
+            return lists[0]
+        others = [set(positions) for positions in lists[1:]]
+        return [p for p in lists[0] if all(p in other for other in others)]
+
+    def query(self, domain=None, device_class=None, state=None, search=None,
+              cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        Filtere Entitäten seitenweise
+
+        Args:
+            domain: Exakte Domain (z.B. 'light')
+            device_class: Exakte device_class (z.B. 'temperature')
+            state: Exakter Zustand (z.B. 'on')
+            search: Teilstring in entity_id oder friendly_name (ohne Groß/Klein)
+            cursor: Wert von 'next_cursor' der vorherigen Seite
+            limit: Anzahl Entitäten pro Seite (max. MAX_PAGE_SIZE)
+
+        Returns:
+            Dict mit 'entities' und 'next_cursor' (None auf der letzten Seite)
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        candidates = self._candidates(domain, device_class, state)
+        start = bisect_right(candidates, int(cursor)) if cursor not in (None, '') else 0
+        needle = search.lower() if search else None
+
+        page = []
+        last = None
+        for i in range(start, len(candidates)):
+            position = candidates[i]
+            if needle and needle not in self._search_text[position]:
+                continue
+            if len(page) == limit:
+                return {
+                    'entities': [self.states[p] for p in page],
+                    'next_cursor': str(last)
+                }
+            page.append(position)
+            last = position
+        return {
+            'entities': [self.states[p] for p in page],
+            'next_cursor': None
+        }
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Kompaktes Speichermodell für Entitäten
+Ersetzt die Dicts aus /api/states durch schlanke Records mit __slots__:
+Domain, Zustand und Attribut-Schlüssel werden interniert, und Entitäten mit
+gleichem Aufbau (gleiche Attribut-Schlüssel) teilen sich ein gemeinsames Schema.
+Die Records verhalten sich wie unveränderliche Dicts (Mapping), sodass
+Report-Aufbau, Indizes und Exporte sie ohne Anpassung lesen können.
+"""
+
+import sys
+import threading
+from collections.abc import Mapping
+
+# Felder, die direkt im Record statt im Werte-Tupel liegen
+SLOT_FIELDS = ('entity_id', 'state', 'last_changed', 'last_updated')
+
+# Aufbau einer Entität aus /api/states (schneller Weg in Entity.from_dict)
+STANDARD_KEYS = ('entity_id', 'state', 'attributes', 'last_changed', 'last_updated', 'context')
+
+# Zeichenketten bis zu dieser Länge werden interniert (typische Zustände,
+# Einheiten, device_class usw.); längere Werte sind meist eindeutig
+INTERN_MAX_LENGTH = 32
+
+# Höchstzahl geteilter Schemata je Cache; jenseits davon bekommt jeder neue
+# Aufbau ein eigenes, nicht geteiltes Schema
+MAX_SCHEMAS = 10000
+
+# Geteilte Schemata (Aufbau -> EntitySchema) aller Entitäten des Prozesses.
+# Beide Caches leben so lange wie der Prozess (über alle Instanzen hinweg)
+# und wachsen bis MAX_SCHEMAS; geschrieben wird nur unter _schemas_lock.
+_schemas = {}
+# Schemata des Standard-Aufbaus nach (Attribut-Schlüssel, Kontext-Schlüssel)
+_standard_schemas = {}
+# RLock: _standard_schema ruft get_schema mit gehaltenem Lock auf
+_schemas_lock = threading.RLock()
+
+
+def _intern(value):
+    if type(value) is str and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+class EntitySchema:
+    """Aufbau einer Entität: Reihenfolge der Schlüssel und verschachtelte Attribut-Schlüssel"""
+
+    __slots__ = ('layout', 'keys', 'positions', 'indexes', 'standard')
+
+    def __init__(self, layout):
+        """
+        Args:
+            layout: Tupel aus (Schlüssel, verschachtelte Schlüssel) je Feld;
+                    verschachtelte Schlüssel sind None für einfache Werte
+        """
+        self.layout = layout
+        self.keys = tuple(key for key, _ in layout)
+        # Schlüssel -> (Position im Werte-Tupel oder None für SLOT_FIELDS, verschachtelte Schlüssel)
+        positions = {}
+        # Verschachtelter Schlüssel -> {Name: Position innerhalb des Feldes}
+        indexes = {}
+        offset = 0
+        for key, nested in layout:
+            if nested is None and key in SLOT_FIELDS:
+                positions[key] = (None, None)
+            elif nested is None:
+                positions[key] = (offset, None)
+                offset += 1
+            else:
+                positions[key] = (offset, nested)
+                indexes[key] = {name: i for i, name in enumerate(nested)}
+                offset += len(nested)
+        self.positions = positions
+        self.indexes = indexes
+        # Beim Standard-Aufbau (Attribut-Schlüssel, Kontext-Schlüssel) für den schnellen Weg in to_dict
+        self.standard = None
+        if self.keys == STANDARD_KEYS and layout[2][1] is not None and layout[5][1] is not None:
+            self.standard = (layout[2][1], layout[5][1])
+
+
+def get_schema(layout):
+    """Geteiltes Schema für einen Aufbau (wird beim ersten Auftreten angelegt)"""
+    schema = _schemas.get(layout)
+    if schema is None:
+        with _schemas_lock:
+            schema = _schemas.get(layout)
+            if schema is None:
+                layout = tuple((sys.intern(key),
+                                None if nested is None else tuple(sys.intern(name) for name in nested))
+                               for key, nested in layout)
+                schema = EntitySchema(layout)
+                if len(_schemas) < MAX_SCHEMAS:
+                    _schemas[layout] = schema
+    return schema
+
+
+def _standard_schema(shape):
+    """Schema des Standard-Aufbaus für (Attribut-Schlüssel, Kontext-Schlüssel)"""
+    with _schemas_lock:
+        schema = _standard_schemas.get(shape)
+        if schema is None:
+            schema = get_schema(tuple(
+                (key, shape[0] if key == 'attributes' else shape[1] if key == 'context' else None)
+                for key in STANDARD_KEYS))
+            if len(_standard_schemas) < MAX_SCHEMAS:
+                _standard_schemas[shape] = schema
+    return schema
+
+
+class AttributeView(Mapping):
+    """
+    Unveränderliche Sicht auf ein verschachteltes Feld (attributes, context)
+
+    Liest direkt aus Schema und Werte-Tupel des Records, statt bei jedem
+    Zugriff ein Dict zu kopieren; to_dict() liefert bei Bedarf eine Kopie.
+    """
+
+    __slots__ = ('_names', '_index', '_values', '_offset')
+
+    def __init__(self, names, index, values, offset):
+        self._names = names
+        self._index = index
+        self._values = values
+        self._offset = offset
+
+    def __getitem__(self, name):
+        return self._values[self._offset + self._index[name]]
+
+    def get(self, name, default=None):
+        position = self._index.get(name)
+        return default if position is None else self._values[self._offset + position]
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def to_dict(self):
+        return dict(zip(self._names, self._values[self._offset:self._offset + len(self._names)]))
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def __reduce__(self):
+        return (dict, (self.to_dict(),))
+
+
+class Entity(Mapping):
+    """Unveränderliche Entität im kompakten Speichermodell (liest sich wie das Dict aus /api/states)"""
+
+    __slots__ = ('entity_id', 'domain', 'state', 'last_changed', 'last_updated', '_schema', '_values')
+
+    @classmethod
+    def from_dict(cls, data, intern=sys.intern):
+        """Erzeuge einen Record aus einem Dict im Format von /api/states"""
+        entity = cls.__new__(cls)
+        attributes = data.get('attributes')
+        context = data.get('context')
+        if (type(attributes) is dict and type(context) is dict
+                and tuple(data) == STANDARD_KEYS):
+            # Schneller Weg für den üblichen Aufbau: Schema nur nach den Schlüsseln nachschlagen
+            shape = (tuple(attributes), tuple(context))
+            schema = _standard_schemas.get(shape)
+            if schema is None:
+                schema = _standard_schema(shape)
+            entity._schema = schema
+            entity._values = (*[intern(value) if value.__class__ is str and len(value) <= INTERN_MAX_LENGTH
+                                else value for value in attributes.values()], *context.values())
+            entity.entity_id = data['entity_id']
+            entity.state = data['state']
+            entity.last_changed = data['last_changed']
+            entity.last_updated = data['last_updated']
+        else:
+            layout = []
+            values = []
+            entity.entity_id = entity.state = entity.last_changed = entity.last_updated = None
+            for key, value in data.items():
+                if type(value) is dict:
+                    layout.append((key, tuple(value)))
+                    values.extend(_intern(item) for item in value.values())
+                elif key in SLOT_FIELDS:
+                    layout.append((key, None))
+                    setattr(entity, key, value)
+                else:
+                    layout.append((key, None))
+                    values.append(_intern(value))
+            entity._schema = get_schema(tuple(layout))
+            entity._values = tuple(values)
+        entity_id = entity.entity_id
+        entity.domain = sys.intern(entity_id.split('.', 1)[0]) if type(entity_id) is str else None
+        entity.state = _intern(entity.state)
+        # Meist identisch; dann teilen sich beide Felder eine Zeichenkette
+        if entity.last_updated == entity.last_changed:
+            entity.last_updated = entity.last_changed
+        return entity
+
+    def __getitem__(self, key):
+        """
+        Feld wie im Dict aus /api/states
+
+        Verschachtelte Felder (attributes, context) kommen als AttributeView
+        ohne Kopie; ein veränderbares Dict liefert to_dict().
+        """
+        position = self._schema.positions.get(key)
+        if position is None:
+            raise KeyError(key)
+        offset, nested = position
+        if offset is None:
+            return getattr(self, key)
+        if nested is None:
+            return self._values[offset]
+        return AttributeView(nested, self._schema.indexes[key], self._values, offset)
+
+    def __contains__(self, key):
+        return key in self._schema.positions
+
+    def __iter__(self):
+        return iter(self._schema.keys)
+
+    def __len__(self):
+        return len(self._schema.keys)
+
+    def to_dict(self):
+        """Entität als Dict (gleiche Schlüssel und Reihenfolge wie im Original)"""
+        values = self._values
+        standard = self._schema.standard
+        if standard is not None:
+            split = len(standard[0])
+            return {
+                'entity_id': self.entity_id,
+                'state': self.state,
+                'attributes': dict(zip(standard[0], values[:split])),
+                'last_changed': self.last_changed,
+                'last_updated': self.last_updated,
+                'context': dict(zip(standard[1], values[split:])),
+            }
+        result = {}
+        offset = 0
+        for key, nested in self._schema.layout:
+            if nested is not None:
+                end = offset + len(nested)
+                result[key] = dict(zip(nested, values[offset:end]))
+                offset = end
+            elif key in SLOT_FIELDS:
+                result[key] = getattr(self, key)
+            else:
+                result[key] = values[offset]
+                offset += 1
+        return result
+
+    def __repr__(self):
+        return f"Entity({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (Entity.from_dict, (self.to_dict(),))
+
+
+def json_default(obj):
+    """default-Funktion für json.dumps: kompakte Entitäten und ihre Felder als Dict serialisieren"""
+    if isinstance(obj, (Entity, AttributeView)):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
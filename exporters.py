@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+Export-Hilfen für Home Assistant Reports
+Serialisiert Reports inkrementell, damit große Exporte direkt zum Client
+gestreamt werden können, ohne sie vorher komplett aufzubauen
+"""
+
+import gzip
+import io
+import json
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from entity_model import json_default
+from report_format import iter_domain_entities
+
+# Größe der Blöcke, die an den Client geschickt werden (Bytes, ungefähr)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Kompressionsstufe für gzip (1 = schnell, 9 = klein)
+GZIP_LEVEL = 6
+
+# Verschachtelungstiefe, bis zu der kompaktes JSON zerlegt geschrieben wird
+# (z.B. Job -> Ergebnis -> Report -> Domain -> Entitäten)
+STREAM_DEPTH = 6
+
+# Listen mit höchstens so vielen Elementen werden in einem Stück kodiert,
+# längere Listen in Blöcken dieser Größe
+STREAM_MIN_ITEMS = 64
+
+
+class CompressionStats:
+    """Zählt unkomprimierte und komprimierte Bytes eines Exports"""
+
+    def __init__(self):
+        self.raw_bytes = 0
+        self.compressed_bytes = None
+
+    @property
+    def ratio(self):
+        if not self.raw_bytes or self.compressed_bytes is None:
+            return None
+        return self.compressed_bytes / self.raw_bytes
+
+    def to_dict(self):
+        stats = {'bytes': self.raw_bytes}
+        if self.compressed_bytes is not None:
+            stats['compressed_bytes'] = self.compressed_bytes
+        return stats
+
+
+def iter_chunks(pieces, chunk_size=STREAM_CHUNK_SIZE):
+    """Fasse kleine Text-Stücke zu UTF-8 Blöcken von etwa chunk_size Bytes zusammen"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def iter_json(report, indent=2, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Serialisiere einen Report inkrementell als JSON
+
+    Der Encoder läuft Domain für Domain und Entität für Entität durch den
+    Report; es liegt nie das komplette Dokument als String im Speicher.
+    Die Ausgabe ist identisch zu json.dump(report, indent=2, ensure_ascii=False);
+    mit indent=None wird kompaktes JSON ohne Leerzeichen erzeugt.
+
+    Yields:
+        UTF-8 kodierte Blöcke
+    """
+    if indent is None:
+        yield from iter_chunks(_iter_compact_json(report, 0), chunk_size)
+        return
+    encoder = json.JSONEncoder(indent=indent, ensure_ascii=False, default=json_default)
+    yield from iter_chunks(encoder.iterencode(report), chunk_size)
+
+
+def _needs_streaming(value, depth):
+    """Prüfe, ob value (bis STREAM_DEPTH) eine Liste mit mehr als STREAM_MIN_ITEMS Elementen enthält"""
+    if depth >= STREAM_DEPTH:
+        return False
+    if isinstance(value, (list, tuple)):
+        return len(value) > STREAM_MIN_ITEMS or any(
+            isinstance(item, (dict, list, tuple)) and _needs_streaming(item, depth + 1) for item in value)
+    if isinstance(value, dict):
+        return any(isinstance(item, (dict, list, tuple)) and _needs_streaming(item, depth + 1)
+                   for item in value.values())
+    return False
+
+
+def _json_key(key):
+    """
+    Schlüssel eines Objekts wie bei json.dumps kodiert (mit Anführungszeichen)
+
+    Der Encoder selbst übernimmt die Umwandlung (True -> "true", None -> "null",
+    1.5 -> "1.5") und lehnt andere Typen mit TypeError ab.
+    """
+    # {"schlüssel":0} -> "schlüssel"
+    return json.dumps({key: 0}, ensure_ascii=False, separators=(',', ':'))[1:-3]
+
+
+def _iter_compact_json(value, depth):
+    """
+    Kompaktes JSON ohne Leerzeichen, große Container Element für Element
+
+    Nur Container, die (bis STREAM_DEPTH) eine Liste mit mehr als
+    STREAM_MIN_ITEMS Elementen enthalten, werden zerlegt (Antwort, Report,
+    Domains). Listenelemente werden blockweise mit dem schnellen C-Encoder
+    serialisiert, solange sie selbst nicht zerlegt werden müssen (z.B. Entitäten).
+    Die Ausgabe ist in jedem Fall identisch zu json.dumps; die Aufteilung
+    bestimmt nur die Größe der Blöcke.
+    """
+    if not _needs_streaming(value, depth):
+        yield json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=json_default)
+    elif isinstance(value, dict):
+        yield '{'
+        for i, (key, item) in enumerate(value.items()):
+            yield f'{"," if i else ""}{_json_key(key)}:'
+            yield from _iter_compact_json(item, depth + 1)
+        yield '}'
+    else:
+        yield '['
+        for start in range(0, len(value), STREAM_MIN_ITEMS):
+            batch = value[start:start + STREAM_MIN_ITEMS]
+            if start:
+                yield ','
+            # Listen sind gleichförmig (Entitäten, Domains); das erste Element entscheidet
+            if _needs_streaming(batch[0], depth + 1):
+                for i, item in enumerate(batch):
+                    if i:
+                        yield ','
+                    yield from _iter_compact_json(item, depth + 1)
+            else:
+                # Ganzer Block in einem Aufruf, ohne die äußeren Klammern
+                yield json.dumps(list(batch), ensure_ascii=False, separators=(',', ':'),
+                                 default=json_default)[1:-1]
+        yield ']'
+
+
+def iter_counted(chunks, stats):
+    """Reiche Blöcke unverändert durch und zähle die Bytes"""
+    for chunk in chunks:
+        stats.raw_bytes += len(chunk)
+        yield chunk
+
+
+def iter_gzip(chunks, stats=None, level=GZIP_LEVEL, flush=False):
+    """
+    Komprimiere Blöcke im gzip-Format, ohne das Dokument zu puffern
+
+    Args:
+        chunks: Iterator über Byte-Blöcke
+        stats: Optionale CompressionStats, die mitgezählt werden
+        level: gzip Kompressionsstufe
+        flush: Jeden Block sofort vollständig ausgeben (Z_SYNC_FLUSH), z.B.
+               für Server-Sent Events; kostet etwas Kompressionsrate
+    """
+    stats = stats if stats is not None else CompressionStats()
+    stats.compressed_bytes = 0
+    # wbits=31: zlib-Stream mit gzip-Header und -Trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        stats.raw_bytes += len(chunk)
+        data = compressor.compress(chunk)
+        if flush:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            stats.compressed_bytes += len(data)
+            yield data
+    data = compressor.flush()
+    stats.compressed_bytes += len(data)
+    yield data
+
+
+class _CountingStream(io.RawIOBase):
+    """Binärer Schreib-Stream, der geschriebene Bytes zählt"""
+
+    def __init__(self, target, stats, attribute):
+        self.target = target
+        self.stats = stats
+        self.attribute = attribute
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.target.write(data)
+        setattr(self.stats, self.attribute, (getattr(self.stats, self.attribute) or 0) + len(data))
+        return len(data)
+
+
+@contextmanager
+def open_export(path, compress=False, stats=None):
+    """
+    Öffne eine Export-Datei als Text-Datei (UTF-8), optional gzip-komprimiert
+
+    Der Text wird beim Schreiben direkt durch den Kompressor geschickt;
+    stats enthält danach die unkomprimierte und ggf. komprimierte Größe.
+    """
+    stats = stats if stats is not None else CompressionStats()
+    with open(path, 'wb') as raw:
+        compressed = None
+        target = raw
+        if compress:
+            counter = _CountingStream(raw, stats, 'compressed_bytes')
+            stats.compressed_bytes = 0
+            compressed = gzip.GzipFile(fileobj=counter, mode='wb', compresslevel=GZIP_LEVEL)
+            target = compressed
+        text = io.TextIOWrapper(
+            io.BufferedWriter(_CountingStream(target, stats, 'raw_bytes'), STREAM_CHUNK_SIZE),
+            encoding='utf-8'
+        )
+        try:
+            yield text
+        finally:
+            text.flush()
+            text.detach()
+            if compressed is not None:
+                compressed.close()
+
+
+def generate_text_summary(report):
+    """Kurze Textzusammenfassung eines Reports (Download-Format 'txt' der Web-Anwendung)"""
+    return (
+        "="*80 + "\n"
+        "HOME ASSISTANT - VOLLSTÄNDIGER ÜBERBLICK\n"
+        + "="*80 + "\n"
+        f"Generiert am: {datetime.now().strftime('%d.%m.%Y um %H:%M:%S')}\n"
+        + "="*80 + "\n\n"
+        f"System: {report['system_info']['version']}\n"
+        f"Entitäten: {report['statistics']['total_entities']}\n"
+        f"Komponenten: {report['statistics']['total_components']}\n"
+    )
+
+
+# Grobe Schätzung für die Größe von LLM-Exporten: ein Token entspricht etwa 4 Zeichen
+CHARS_PER_TOKEN = 4
+
+# Standard-Budget pro Teil eines aufgeteilten Claude-Exports (Tokens)
+DEFAULT_TOKEN_BUDGET = 8000
+
+# Ab so vielen gleichartigen Entitäten (gleiche Endung und device_class)
+# werden sie im Budget-Modus zu einer Zeile zusammengefasst
+COLLAPSE_MIN_GROUP = 5
+
+# Anzahl Beispiele in einer zusammengefassten Zeile
+COLLAPSE_EXAMPLES = 3
+
+# Trenner zwischen den Teilen, wenn alle Teile in einer Datei ausgeliefert werden
+CLAUDE_PART_SEPARATOR = "\n\n<!-- Teil {part} -->\n\n"
+
+
+def estimate_tokens(text):
+    """Schätze die Anzahl Tokens eines Textes"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _claude_header(report):
+    """Kopf des Claude-Exports: Einleitung, System-Informationen und Statistiken"""
+    sys_info = report.get('system_info', {})
+    stats = report.get('statistics', {})
+    return [
+        "# Home Assistant Konfiguration",
+        "",
+        "Dieser Export enthält alle relevanten Informationen meiner Home Assistant Installation.",
+        "Bitte nutze diese Daten um mir bei Fragen, Automatisierungen oder Problemlösungen zu helfen.",
+        "",
+        "## System Information",
+        "",
+        f"- **Version:** {sys_info.get('version', 'Unbekannt')}",
+        f"- **Standort:** {sys_info.get('location_name', 'Unbekannt')}",
+        f"- **Zeitzone:** {sys_info.get('timezone', 'Unbekannt')}",
+        f"- **Einheiten:** {sys_info.get('unit_system', 'Unbekannt')}",
+        "",
+        "## Übersicht / Statistiken",
+        "",
+        f"- **Komponenten/Integrationen:** {stats.get('total_components', 0)}",
+        f"- **Entitäten gesamt:** {stats.get('total_entities', 0)}",
+        f"- **Services:** {stats.get('total_services', 0)}",
+        f"- **Domains:** {stats.get('total_domains', 0)}",
+        f"- **Events:** {stats.get('total_events', 0)}",
+        "",
+    ]
+
+
+def _claude_entity_line(entity):
+    entity_id = entity.get('entity_id', 'unknown')
+    friendly_name = entity.get('attributes', {}).get('friendly_name', entity_id)
+    state = entity.get('state', 'unknown')
+    device_class = entity.get('attributes', {}).get('device_class', '')
+    device_info = f" ({device_class})" if device_class else ""
+    return f"- `{entity_id}`: **{friendly_name}**{device_info} = `{state}`"
+
+
+def _describe_states(entities):
+    """Kurze Beschreibung der Zustände einer Gruppe (Wertebereich oder häufigste Zustände)"""
+    states = [entity.get('state', 'unknown') for entity in entities]
+    try:
+        values = [float(state) for state in states]
+        return f"Werte {min(values):g} bis {max(values):g}"
+    except (TypeError, ValueError):
+        counts = defaultdict(int)
+        for state in states:
+            counts[state] += 1
+        top = sorted(counts.items(), key=lambda item: -item[1])[:3]
+        more = ", …" if len(counts) > 3 else ""
+        return "Zustände " + ", ".join(f"`{state}` ×{count}" for state, count in top) + more
+
+
+def _collapsed_entity_lines(domain, entities):
+    """
+    Entitäten-Zeilen einer Domain, gleichartige Entitäten zusammengefasst
+
+    Gleichartig sind Entitäten mit derselben Endung der Object-ID (z.B. *_battery)
+    und derselben device_class. Die Reihenfolge der ersten Vorkommen bleibt erhalten.
+    """
+    groups = defaultdict(list)
+    for entity in entities:
+        object_id = entity.get('entity_id', '').split('.', 1)[-1]
+        suffix = object_id.rsplit('_', 1)[1] if '_' in object_id else None
+        device_class = entity.get('attributes', {}).get('device_class', '')
+        groups[(suffix, device_class)].append(entity)
+
+    emitted = set()
+    for entity in entities:
+        object_id = entity.get('entity_id', '').split('.', 1)[-1]
+        suffix = object_id.rsplit('_', 1)[1] if '_' in object_id else None
+        key = (suffix, entity.get('attributes', {}).get('device_class', ''))
+        group = groups[key]
+        if suffix is None or len(group) < COLLAPSE_MIN_GROUP:
+            yield _claude_entity_line(entity)
+        elif key not in emitted:
+            emitted.add(key)
+            device_info = f" ({key[1]})" if key[1] else ""
+            examples = ", ".join(f"`{e['entity_id']}`" for e in group[:COLLAPSE_EXAMPLES])
+            yield (f"- `{domain}.*_{suffix}`{device_info}: **{len(group)} Entitäten**, "
+                   f"{_describe_states(group)} – z.B. {examples}")
+
+
+# Überschrift vor der ersten Domain im Claude-Export
+CLAUDE_ENTITIES_HEADING = (["## Alle Entitäten (Details)", ""], [], [])
+
+
+def _claude_domain_table(report):
+    """Abschnitt 'Entitäten nach Domain' (None ohne Entitäten)"""
+    entities_by_domain = report.get('entities_by_domain', {})
+    if not entities_by_domain:
+        return None
+    return (["## Entitäten nach Domain", "", "| Domain | Anzahl |", "|--------|--------|"],
+            [f"| {domain} | {count} |"
+             for domain, count in sorted(entities_by_domain.items(), key=lambda x: -x[1])],
+            [""])
+
+
+def _claude_domain_section(domain, entities, collapse=False):
+    """Abschnitt mit den Entitäten einer Domain"""
+    if collapse:
+        lines = _collapsed_entity_lines(domain, entities)
+    else:
+        lines = (_claude_entity_line(entity) for entity in entities)
+    return ([f"### {domain.upper()} ({len(entities)} Entitäten)", ""], lines, [""])
+
+
+def _claude_sections(report, collapse=False):
+    """
+    Abschnitte des Claude-Exports nach dem Kopf
+
+    Yields:
+        Tupel (kopf, zeilen, abschluss) aus Listen von Zeilen. Beim Aufteilen
+        wird der Kopf eines angefangenen Abschnitts im nächsten Teil wiederholt.
+    """
+    table = _claude_domain_table(report)
+    if table is not None:
+        yield table
+
+    first = True
+    for domain, entities in iter_domain_entities(report):
+        if first:
+            yield CLAUDE_ENTITIES_HEADING
+            first = False
+        yield _claude_domain_section(domain, entities, collapse)
+
+    yield from _claude_closing_sections(report)
+
+
+def _claude_closing_sections(report):
+    """Abschnitte nach den Entitäten: Komponenten und Services"""
+    components = report.get('components', [])
+    if components:
+        # Gruppiere in Zeilen zu je 5
+        yield (["## Installierte Komponenten/Integrationen", ""],
+               ["- " + ", ".join(f"`{c}`" for c in components[i:i + 5])
+                for i in range(0, len(components), 5)],
+               [""])
+
+    services = report.get('services', [])
+    if services:
+        yield (["## Verfügbare Services", ""], [], [])
+        services_by_domain = defaultdict(list)
+        for domain_services in services:
+            domain = domain_services.get('domain', 'unknown')
+            services_by_domain[domain].extend(domain_services.get('services', {}))
+        for domain, service_list in sorted(services_by_domain.items()):
+            yield ([f"### {domain}"],
+                   [f"- `{domain}.{svc}`" for svc in sorted(service_list)],
+                   [""])
+
+
+def _claude_footer():
+    return [
+        "---",
+        "",
+        "## Hinweise für Claude",
+        "",
+        "Mit diesen Daten kannst du mir helfen bei:",
+        "- Automatisierungen erstellen (YAML für automations.yaml)",
+        "- Skripte schreiben",
+        "- Dashboard/Lovelace Konfigurationen",
+        "- Problemdiagnose",
+        "- Entity-IDs für Szenen und Skripte finden",
+        "- Service-Calls zusammenstellen",
+        "",
+        f"*Exportiert am: {datetime.now().strftime('%d.%m.%Y um %H:%M:%S')}*",
+    ]
+
+
+def generate_claude_format(report):
+    """Generiere Claude-freundliches Markdown-Format"""
+    lines = _claude_header(report)
+    for head, body, tail in _claude_sections(report):
+        lines.extend(head)
+        lines.extend(body)
+        lines.extend(tail)
+    lines.extend(_claude_footer())
+    return "\n".join(lines)
+
+
+def iter_claude_chunks(report, max_tokens=DEFAULT_TOKEN_BUDGET, collapse=True):
+    """
+    Claude-Export in Teilen mit begrenzter Größe
+
+    Jeder Teil beginnt mit demselben Kopf (System-Informationen, Statistiken)
+    und ist damit für sich verständlich. Die Größe wird beim Aufbau geschätzt
+    (estimate_tokens); der komplette Export liegt nie als ein String vor.
+
+    Args:
+        report: Report (volles oder kompaktes Format)
+        max_tokens: Geschätzte Obergrenze pro Teil
+        collapse: Gleichartige Entitäten zu einer Zeile zusammenfassen
+
+    Yields:
+        Markdown-Text je Teil
+    """
+    header = _claude_header(report)
+    header_tokens = estimate_tokens("\n".join(header)) + 20
+    footer = _claude_footer()
+    # Mindestens etwas Platz für Inhalt lassen, auch bei sehr kleinem Budget
+    budget = max(max_tokens - header_tokens, 200)
+
+    part = 1
+    lines = []
+    used = 0
+
+    def flush():
+        title = f"> Teil {part} des Exports. Alle Teile teilen sich denselben Kopf."
+        return "\n".join(header + [title, ""] + lines)
+
+    def add(line):
+        nonlocal used
+        lines.append(line)
+        used += estimate_tokens(line)
+
+    for head, body, tail in _claude_sections(report, collapse=collapse):
+        head_tokens = sum(estimate_tokens(line) for line in head)
+        body = iter(body)
+        first_line = next(body, None)
+        needed = head_tokens + (estimate_tokens(first_line) if first_line is not None else 0)
+        # Überschrift nicht allein am Ende eines Teils stehen lassen
+        if used and used + needed > budget:
+            yield flush()
+            part += 1
+            lines, used = [], 0
+        for line in head:
+            add(line)
+        body_lines = 0
+        for line in ([first_line] if first_line is not None else []):
+            add(line)
+            body_lines += 1
+        for line in body:
+            if body_lines and used + estimate_tokens(line) > budget:
+                yield flush()
+                part += 1
+                lines, used = [], 0
+                # Abschnitt im neuen Teil mit demselben Kopf fortsetzen
+                add(f"{head[0]} (Fortsetzung)")
+                for extra in head[1:]:
+                    add(extra)
+                body_lines = 0
+            add(line)
+            body_lines += 1
+        for line in tail:
+            add(line)
+
+    footer_tokens = sum(estimate_tokens(line) for line in footer)
+    if used and used + footer_tokens > budget:
+        yield flush()
+        part += 1
+        lines, used = [], 0
+    for line in footer:
+        add(line)
+    yield flush()
+
+
+def join_claude_chunks(chunks):
+    """Verbinde Teile eines aufgeteilten Exports mit CLAUDE_PART_SEPARATOR (als Text-Stücke)"""
+    for part, chunk in enumerate(chunks, 1):
+        if part > 1:
+            yield CLAUDE_PART_SEPARATOR.format(part=part)
+        yield chunk
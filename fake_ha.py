@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Simulierter Home Assistant Server für Last- und Leistungstests
+Liefert die vom Tool genutzten REST-Endpunkte mit synthetischen Daten und
+einstellbarer Antwortzeit, ohne dass eine echte Installation nötig ist.
+Verzögerungen je Pfad und Fehlerantworten lassen sich gezielt einschleusen,
+um Zeitlimits, Wiederholungen und Circuit Breaker zu prüfen.
+Unter /api/websocket steht zusätzlich ein Ausschnitt der WebSocket-API bereit
+(auth, subscribe_events für state_changed, get_states) für den State-Mirror.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Domains der synthetischen Entitäten mit typischen Zuständen und device_class
+DOMAINS = (
+    ('sensor', ('21.5', '48', '1013.2', 'unavailable'), ('temperature', 'humidity', 'pressure', None)),
+    ('binary_sensor', ('on', 'off'), ('motion', 'door', 'window', None)),
+    ('light', ('on', 'off'), (None,)),
+    ('switch', ('on', 'off'), ('outlet', None)),
+    ('climate', ('heat', 'off'), (None,)),
+    ('cover', ('open', 'closed'), ('shutter', None)),
+    ('automation', ('on',), (None,)),
+    ('media_player', ('playing', 'idle', 'off'), ('speaker', 'tv')),
+)
+
+# Räume für entity_id und friendly_name
+ROOMS = ('wohnzimmer', 'kueche', 'schlafzimmer', 'bad', 'flur', 'buero', 'garten', 'keller')
+
+# Standard-Token, das der Server akzeptiert
+DEFAULT_TOKEN = 'test-token'
+
+# GUID für den WebSocket-Handshake (RFC 6455)
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+# Pfad der WebSocket-API
+WEBSOCKET_PATH = '/api/websocket'
+
+
+def generate_states(count):
+    """Erzeuge count reproduzierbare Entitäten im Format von /api/states"""
+    states = []
+    for i in range(count):
+        domain, values, device_classes = DOMAINS[i % len(DOMAINS)]
+        room = ROOMS[(i // len(DOMAINS)) % len(ROOMS)]
+        number = i // (len(DOMAINS) * len(ROOMS))
+        attributes = {'friendly_name': f"{room.capitalize()} {domain.replace('_', ' ')} {number}"}
+        device_class = device_classes[number % len(device_classes)]
+        if device_class:
+            attributes['device_class'] = device_class
+        if domain == 'sensor' and device_class == 'temperature':
+            attributes['unit_of_measurement'] = '°C'
+            attributes['state_class'] = 'measurement'
+        timestamp = f"2024-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}+00:00"
+        states.append({
+            'entity_id': f"{domain}.{room}_{domain}_{number}",
+            'state': values[i % len(values)],
+            'attributes': attributes,
+            'last_changed': timestamp,
+            'last_updated': timestamp,
+            'context': {'id': f"{i:026d}", 'parent_id': None, 'user_id': None}
+        })
+    return states
+
+
+def generate_services():
+    """Services aller simulierten Domains (Format von /api/services)"""
+    services = [{
+        'domain': domain,
+        'services': {
+            'turn_on': {'name': 'Turn on', 'description': f"Schaltet {domain} ein", 'fields': {}},
+            'turn_off': {'name': 'Turn off', 'description': f"Schaltet {domain} aus", 'fields': {}},
+            'toggle': {'name': 'Toggle', 'description': '', 'fields': {}}
+        }
+    } for domain, _, _ in DOMAINS if domain not in ('sensor', 'binary_sensor')]
+    services.append({'domain': 'homeassistant', 'services': {
+        'restart': {'name': 'Restart', 'description': 'Startet Home Assistant neu', 'fields': {}},
+        'reload_all': {'name': 'Reload all', 'description': '', 'fields': {}}
+    }})
+    return services
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Viele gleichzeitige Verbindungen annehmen (Standard wäre 5)
+    request_queue_size = 256
+
+    def handle_error(self, request, client_address):
+        # Vom Client geschlossene Keep-Alive-Verbindungen sind im Lasttest normal
+        pass
+
+
+class _WebSocket:
+    """Server-Seite einer WebSocket-Verbindung (nur Text-Nachrichten ohne Fragmentierung)"""
+
+    def __init__(self, rfile, wfile):
+        self.rfile = rfile
+        self.wfile = wfile
+        # Ereignis-Abonnements dieser Verbindung (Nachrichten-ID)
+        self.subscriptions = set()
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def _read(self, size):
+        data = self.rfile.read(size)
+        if len(data) < size:
+            raise ConnectionError("Verbindung geschlossen")
+        return data
+
+    def _write_frame(self, opcode, payload=b''):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        with self._lock:
+            if self.closed:
+                raise ConnectionError("Verbindung geschlossen")
+            self.wfile.write(header + payload)
+            self.wfile.flush()
+
+    def send(self, message):
+        self._write_frame(0x1, json.dumps(message, ensure_ascii=False).encode('utf-8'))
+
+    def receive(self):
+        """Nächste Text-Nachricht als Dict, None, wenn der Client die Verbindung schließt"""
+        while True:
+            first, second = self._read(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack('!H', self._read(2))[0]
+            elif length == 127:
+                length = struct.unpack('!Q', self._read(8))[0]
+            mask = self._read(4) if second & 0x80 else b'\0\0\0\0'
+            payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(self._read(length)))
+            if opcode == 0x8:
+                return None
+            if opcode == 0x9:
+                self._write_frame(0xA, payload)
+            elif opcode == 0x1:
+                return json.loads(payload.decode('utf-8'))
+
+    def close(self):
+        """Sende einen Close-Frame und nimm keine weiteren Nachrichten an"""
+        try:
+            self._write_frame(0x8, struct.pack('!H', 1000))
+        except (ConnectionError, OSError):
+            pass
+        with self._lock:
+            self.closed = True
+
+
+class FakeHomeAssistant:
+    def __init__(self, entities=200, delay=0.0, token=DEFAULT_TOKEN, path_delays=None,
+                 error_rate=0.0, error_status=503):
+        """
+        Erzeuge die Antworten des simulierten Servers
+
+        Alle Fehler-Einstellungen sind Attribute und können zur Laufzeit
+        geändert werden (z.B. fail_next = 3 für die nächsten drei Anfragen).
+
+        Args:
+            entities: Anzahl Entitäten unter /api/states
+            delay: Künstliche Antwortzeit pro Anfrage in Sekunden
+            token: Akzeptiertes Bearer-Token (None akzeptiert jedes Token)
+            path_delays: Zusätzliche Antwortzeit je Pfad in Sekunden (Pfad -> Sekunden)
+            error_rate: Anteil der Anfragen (0-1), die mit error_status beantwortet werden
+            error_status: Status-Code eingeschleuster Fehler
+        """
+        self.delay = delay
+        self.path_delays = dict(path_delays or {})
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Anzahl der nächsten Anfragen, die unabhängig von error_rate fehlschlagen
+        self.fail_next = 0
+        self.errors = 0
+        self.token = token
+        self.requests = 0
+        # Anzahl aufgebauter WebSocket-Verbindungen (inkl. abgelehnter Anmeldungen)
+        self.websocket_connections = 0
+        self._websockets = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._states = {state['entity_id']: state for state in generate_states(entities)}
+        components = sorted({domain for domain, _, _ in DOMAINS} | {'api', 'http', 'frontend'})
+        config = {
+            'version': '2024.1.0',
+            'location_name': 'Testhaus',
+            'time_zone': 'Europe/Berlin',
+            'unit_system': {'temperature': '°C', 'length': 'km'},
+            'latitude': 52.52,
+            'longitude': 13.40,
+            'components': components
+        }
+        # Antworten werden einmal kodiert, damit der Server selbst nicht zum Engpass wird
+        self._responses = {
+            path: json.dumps(body, ensure_ascii=False).encode('utf-8')
+            for path, body in (
+                ('/api/', {'message': 'API running.'}),
+                ('/api/config', config),
+                ('/api/config/core', {'components': components}),
+                ('/api/states', list(self._states.values())),
+                ('/api/services', generate_services()),
+                ('/api/events', [{'event': name, 'listener_count': count} for name, count in (
+                    ('state_changed', 12), ('call_service', 3), ('homeassistant_start', 1),
+                    ('automation_triggered', 2), ('service_registered', 1))]),
+            )
+        }
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _inject_error(self):
+        """Entscheide, ob die aktuelle Anfrage mit einem Fehler beantwortet wird"""
+        with self._lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+            elif not (self.error_rate and random.random() < self.error_rate):
+                return False
+            self.errors += 1
+            return True
+
+    def set_state(self, entity_id, state, attributes=None, last_updated=None):
+        """
+        Ändere (oder erzeuge) eine Entität und melde state_changed an alle Abonnenten
+
+        Returns:
+            Der neue Zustand im Format von /api/states
+        """
+        timestamp = last_updated or time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime())
+        with self._lock:
+            old_state = self._states.get(entity_id)
+            if attributes is None:
+                attributes = dict(old_state['attributes']) if old_state else {}
+            new_state = {
+                'entity_id': entity_id,
+                'state': state,
+                'attributes': attributes,
+                'last_changed': timestamp,
+                'last_updated': timestamp,
+                'context': {'id': f"{random.getrandbits(64):026d}", 'parent_id': None, 'user_id': None}
+            }
+            self._states[entity_id] = new_state
+            self._update_states()
+        self._broadcast(entity_id, old_state, new_state)
+        return new_state
+
+    def remove_state(self, entity_id):
+        """Entferne eine Entität (state_changed mit new_state None)"""
+        with self._lock:
+            old_state = self._states.pop(entity_id, None)
+            self._update_states()
+        self._broadcast(entity_id, old_state, None)
+
+    def _update_states(self):
+        """Kodiere /api/states neu (Lock wird gehalten)"""
+        self._responses['/api/states'] = json.dumps(
+            list(self._states.values()), ensure_ascii=False).encode('utf-8')
+
+    def _broadcast(self, entity_id, old_state, new_state):
+        with self._lock:
+            websockets = list(self._websockets)
+        for ws in websockets:
+            for subscription in list(ws.subscriptions):
+                try:
+                    ws.send({'id': subscription, 'type': 'event', 'event': {
+                        'event_type': 'state_changed',
+                        'data': {'entity_id': entity_id, 'old_state': old_state, 'new_state': new_state},
+                        'origin': 'LOCAL',
+                    }})
+                except (ConnectionError, OSError):
+                    pass
+
+    def drop_websockets(self):
+        """Schließe alle WebSocket-Verbindungen (z.B. um einen Reconnect zu prüfen)"""
+        with self._lock:
+            websockets = list(self._websockets)
+        for ws in websockets:
+            ws.close()
+
+    def _serve_websocket(self, ws):
+        """Beantworte die Nachrichten einer WebSocket-Verbindung bis zum Schließen"""
+        ws.send({'type': 'auth_required', 'ha_version': '2024.1.0'})
+        message = ws.receive()
+        if message is None:
+            return
+        if (message.get('type') != 'auth'
+                or (self.token is not None and message.get('access_token') != self.token)):
+            ws.send({'type': 'auth_invalid', 'message': 'Invalid access token or password'})
+            return
+        ws.send({'type': 'auth_ok', 'ha_version': '2024.1.0'})
+        with self._lock:
+            self._websockets.append(ws)
+        try:
+            while not ws.closed:
+                message = ws.receive()
+                if message is None:
+                    return
+                kind, message_id = message.get('type'), message.get('id')
+                if kind == 'subscribe_events' and message.get('event_type') == 'state_changed':
+                    ws.subscriptions.add(message_id)
+                    ws.send({'id': message_id, 'type': 'result', 'success': True, 'result': None})
+                elif kind == 'get_states':
+                    with self._lock:
+                        states = list(self._states.values())
+                    ws.send({'id': message_id, 'type': 'result', 'success': True, 'result': states})
+                elif kind == 'ping':
+                    ws.send({'id': message_id, 'type': 'pong'})
+                else:
+                    ws.send({'id': message_id, 'type': 'result', 'success': False,
+                             'error': {'code': 'unknown_command', 'message': 'Unknown command.'}})
+        finally:
+            with self._lock:
+                self._websockets.remove(ws)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Kopf und Body gehen getrennt raus; ohne Nagle keine künstlichen ACK-Wartezeiten
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body=b'', content_type='application/json'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _websocket(self):
+                """Handshake und Nachrichten-Schleife der WebSocket-API"""
+                key = self.headers.get('Sec-WebSocket-Key', '')
+                accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+                self.send_response(101)
+                self.send_header('Upgrade', 'websocket')
+                self.send_header('Connection', 'Upgrade')
+                self.send_header('Sec-WebSocket-Accept', accept)
+                self.end_headers()
+                self.wfile.flush()
+                self.close_connection = True
+                with fake._lock:
+                    fake.websocket_connections += 1
+                ws = _WebSocket(self.rfile, self.wfile)
+                try:
+                    fake._serve_websocket(ws)
+                except (ConnectionError, OSError, ValueError):
+                    pass
+                finally:
+                    ws.close()
+
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == WEBSOCKET_PATH and self.headers.get('Upgrade', '').lower() == 'websocket':
+                    self._websocket()
+                    return
+                with fake._lock:
+                    fake.requests += 1
+                delay = fake.delay + fake.path_delays.get(path, 0)
+                if delay:
+                    time.sleep(delay)
+                if fake._inject_error():
+                    self._send(fake.error_status, f"{fake.error_status}: Simulierter Fehler".encode(),
+                               'text/plain')
+                    return
+                if fake.token is not None and self.headers.get('Authorization') != f"Bearer {fake.token}":
+                    self._send(401, b'401: Unauthorized', 'text/plain')
+                    return
+                with fake._lock:
+                    body = fake._responses.get(path)
+                if body is None:
+                    self._send(404, b'404: Not Found', 'text/plain')
+                    return
+                self._send(200, body)
+
+        return Handler
+
+    def start(self, host='127.0.0.1', port=0):
+        """Starte den Server in einem Hintergrund-Thread (port=0 wählt einen freien Port)"""
+        self._server = _Server((host, port), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self.drop_websockets()
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start() if self._server is None else self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    """Starte den simulierten Server im Vordergrund"""
+    parser = argparse.ArgumentParser(description="Simulierter Home Assistant Server")
+    parser.add_argument('--entities', type=int, default=200, help="Anzahl Entitäten (Standard: 200)")
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help="Antwortzeit pro Anfrage in Sekunden (Standard: 0)")
+    parser.add_argument('--path-delay', action='append', default=[], metavar='PFAD=SEKUNDEN',
+                        help="Zusätzliche Antwortzeit für einen Pfad, z.B. /api/states=5 (mehrfach möglich)")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="Anteil fehlerhafter Antworten zwischen 0 und 1 (Standard: 0)")
+    parser.add_argument('--error-status', type=int, default=503,
+                        help="Status-Code fehlerhafter Antworten (Standard: 503)")
+    parser.add_argument('--port', type=int, default=8123, help="Port (Standard: 8123)")
+    parser.add_argument('--token', default=DEFAULT_TOKEN,
+                        help=f"Akzeptiertes Token (Standard: {DEFAULT_TOKEN})")
+    args = parser.parse_args(argv)
+
+    path_delays = {}
+    for entry in args.path_delay:
+        path, separator, seconds = entry.partition('=')
+        if not separator:
+            parser.error(f"--path-delay erwartet PFAD=SEKUNDEN, nicht {entry!r}")
+        path_delays[path] = float(seconds)
+
+    fake = FakeHomeAssistant(entities=args.entities, delay=args.delay, token=args.token,
+                             path_delays=path_delays, error_rate=args.error_rate,
+                             error_status=args.error_status)
+    fake.start(host='0.0.0.0', port=args.port)
+    print(f"Simulierter Home Assistant auf http://localhost:{args.port} "
+          f"({args.entities:,} Entitäten, Token: {args.token})")
+    print("Drücke CTRL+C zum Beenden\n")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
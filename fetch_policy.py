@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Abfrage-Regeln für Home Assistant Verbindungen
+Zeitlimits je Endpunkt (Verbindungsaufbau und Lesen), begrenzte Wiederholungen
+mit zufälligem Backoff für GET-Anfragen und ein Circuit Breaker pro Instanz,
+damit eine hängende oder tote Instanz keine Worker blockiert
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+import requests
+
+# Zeitlimit für den Verbindungsaufbau in Sekunden
+DEFAULT_CONNECT_TIMEOUT = 5
+
+# Zeitlimit zwischen zwei empfangenen Datenblöcken je Endpunkt in Sekunden
+DEFAULT_READ_TIMEOUTS = {
+    '/api/': 10,
+    '/api/config': 10,
+    '/api/config/core': 10,
+    '/api/states': 60,
+    '/api/services': 30,
+    '/api/events': 10,
+}
+
+# Lese-Zeitlimit für alle übrigen Pfade
+DEFAULT_READ_TIMEOUT = 30
+
+# Wiederholungen nach dem ersten Versuch
+DEFAULT_RETRIES = 2
+
+# Backoff: Basis und Obergrenze in Sekunden (Wartezeit zufällig zwischen 0 und Basis * 2^Versuch)
+DEFAULT_BACKOFF = 0.25
+DEFAULT_MAX_BACKOFF = 4.0
+
+# Nach so vielen Fehlschlägen in Folge öffnet der Circuit Breaker einer Instanz ...
+DEFAULT_FAILURE_THRESHOLD = 5
+
+# ... und lässt erst nach so vielen Sekunden wieder einen Probe-Versuch zu
+DEFAULT_RESET_TIMEOUT = 30
+
+# Antworten mit diesen Status-Codes gelten als vorübergehender Fehler und werden wiederholt
+RETRY_STATUS = (502, 503, 504)
+
+# Ab diesem Status-Code zählt eine Antwort für den Circuit Breaker als Fehlschlag
+# (auch ohne Wiederholung, z.B. 500)
+FAILURE_STATUS = 500
+
+# Ausnahmen, nach denen eine Abfrage wiederholt wird (requests)
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+
+# Zustände des Circuit Breakers
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Die Instanz gilt als nicht erreichbar; Abfragen schlagen sofort fehl"""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        """
+        Circuit Breaker einer Instanz
+
+        Args:
+            failure_threshold: Fehlschläge in Folge, nach denen der Breaker öffnet
+            reset_timeout: Sekunden, nach denen ein offener Breaker einen
+                           einzelnen Probe-Versuch zulässt (half_open)
+        """
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Prüfe, ob eine Abfrage erlaubt ist
+
+        Returns:
+            None, wenn erlaubt, sonst die Sekunden bis zum nächsten Probe-Versuch
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return None
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                # Genau eine Abfrage darf testen, ob die Instanz wieder antwortet
+                self._probing = True
+                return None
+            return max(remaining, 0.0)
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def release(self):
+        """Gib einen Probe-Versuch frei, der ohne Ergebnis abgebrochen wurde"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        """Vermerke einen Fehlschlag; True, wenn der Breaker dadurch öffnet"""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def to_dict(self):
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures}
+
+
+def _status(response):
+    """Status-Code einer requests- oder aiohttp-Antwort"""
+    status = getattr(response, 'status_code', None)
+    return status if status is not None else getattr(response, 'status', None)
+
+
+class FetchPolicy:
+    def __init__(self, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeouts=None,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF,
+                 failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT,
+                 listener=None):
+        """
+        Initialisiere die Regeln
+
+        Args:
+            connect_timeout: Zeitlimit für den Verbindungsaufbau in Sekunden
+            read_timeouts: Lese-Zeitlimit je Pfad (ergänzt DEFAULT_READ_TIMEOUTS)
+            retries: Wiederholungen nach dem ersten Versuch (nur bei
+                     Verbindungsfehlern, Zeitüberschreitung und RETRY_STATUS)
+            backoff: Basis der Wartezeit vor einer Wiederholung in Sekunden
+            max_backoff: Obergrenze der Wartezeit in Sekunden
+            failure_threshold: Siehe CircuitBreaker
+            reset_timeout: Siehe CircuitBreaker
+            listener: Optionaler Callback listener(event, url) für 'retry',
+                      'circuit_open' und 'rejected' (z.B. für Metriken)
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeouts = dict(DEFAULT_READ_TIMEOUTS)
+        self.read_timeouts.update(read_timeouts or {})
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.listener = listener
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def timeouts(self, path, limit=None):
+        """
+        Zeitlimits (Verbindungsaufbau, Lesen) für einen Pfad
+
+        Args:
+            limit: Optionale Obergrenze für beide Werte (z.B. Zeitlimit des Aufrufers)
+        """
+        connect = self.connect_timeout
+        read = self.read_timeouts.get(path.split('?')[0], DEFAULT_READ_TIMEOUT)
+        if limit is not None:
+            connect, read = min(connect, limit), min(read, limit)
+        return connect, read
+
+    def _limits(self, url, path, limit, deadline):
+        """
+        Zeitlimits des nächsten Versuchs unter Beachtung einer Frist
+
+        Raises:
+            requests.Timeout: Wenn die Frist bereits abgelaufen ist
+        """
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.Timeout(f"{url}{path}: Zeitlimit überschritten")
+            limit = remaining if limit is None else min(limit, remaining)
+        return self.timeouts(path, limit)
+
+    def _backoff(self, attempt, deadline):
+        """Wartezeit vor der nächsten Wiederholung (höchstens bis zur Frist)"""
+        wait = self.delay(attempt)
+        if deadline is not None:
+            wait = min(wait, max(0.0, deadline - time.monotonic()))
+        return wait
+
+    def delay(self, attempt):
+        """Zufällige Wartezeit vor Wiederholung Nummer attempt (ab 0)"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def breaker(self, url):
+        """Circuit Breaker einer Instanz (Basis-URL)"""
+        key = url.rstrip('/')
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def reset(self, url=None):
+        """Setze die Breaker einer oder aller Instanzen zurück"""
+        with self._lock:
+            if url is None:
+                self._breakers.clear()
+            else:
+                self._breakers.pop(url.rstrip('/'), None)
+
+    def _notify(self, event, url):
+        if self.listener is not None:
+            self.listener(event, url)
+
+    def _check(self, url, breaker):
+        wait = breaker.allow()
+        if wait is not None:
+            self._notify('rejected', url)
+            raise CircuitOpenError(f"{url} ist nicht erreichbar (Circuit Breaker offen, "
+                                   f"nächster Versuch in {wait:.0f}s)")
+
+    def _record(self, url, breaker, response):
+        """Vermerke eine endgültige Antwort (Server-Fehler zählen als Fehlschlag)"""
+        status = _status(response)
+        if status is not None and status >= FAILURE_STATUS:
+            self._failed(url, breaker)
+        else:
+            breaker.record_success()
+
+    def _failed(self, url, breaker):
+        if breaker.record_failure():
+            self._notify('circuit_open', url)
+
+    def call(self, url, path, request, limit=None, retry_on=RETRY_EXCEPTIONS, deadline=None):
+        """
+        Führe eine GET-Anfrage nach diesen Regeln aus
+
+        Args:
+            url: Basis-URL der Instanz (bestimmt den Circuit Breaker)
+            path: Pfad (bestimmt das Lese-Zeitlimit)
+            request: Funktion request(timeout) -> Antwort, timeout ist ein
+                     Tupel (Verbindungsaufbau, Lesen)
+            limit: Optionale Obergrenze der Zeitlimits in Sekunden
+            retry_on: Ausnahmen, nach denen wiederholt wird
+            deadline: Optionale Frist (time.monotonic()) für alle Versuche
+                      zusammen; Zeitlimits und Wartezeiten werden darauf
+                      gekürzt, danach folgt kein weiterer Versuch
+
+        Returns:
+            Die Antwort (auch bei Fehler-Status nach der letzten Wiederholung)
+
+        Raises:
+            CircuitOpenError: Wenn der Breaker der Instanz offen ist
+            requests.Timeout: Wenn die Frist abgelaufen ist
+        """
+        breaker = self.breaker(url)
+        for attempt in range(self.retries + 1):
+            timeout = self._limits(url, path, limit, deadline)
+            self._check(url, breaker)
+            try:
+                response = request(timeout)
+            except retry_on:
+                self._failed(url, breaker)
+                if attempt == self.retries:
+                    raise
+            except BaseException:
+                breaker.release()
+                raise
+            else:
+                if _status(response) not in RETRY_STATUS:
+                    self._record(url, breaker, response)
+                    return response
+                self._failed(url, breaker)
+                if attempt == self.retries:
+                    return response
+                response.close()
+            self._notify('retry', url)
+            time.sleep(self._backoff(attempt, deadline))
+
+    async def call_async(self, url, path, request, limit=None, retry_on=(asyncio.TimeoutError,),
+                         deadline=None):
+        """
+        Asynchrone Variante von call
+
+        Args:
+            request: Coroutine-Funktion request(timeout) -> Antwort
+            retry_on: Ausnahmen, nach denen wiederholt wird (z.B. aiohttp.ClientConnectionError)
+        """
+        breaker = self.breaker(url)
+        for attempt in range(self.retries + 1):
+            timeout = self._limits(url, path, limit, deadline)
+            self._check(url, breaker)
+            try:
+                response = await request(timeout)
+            except retry_on:
+                self._failed(url, breaker)
+                if attempt == self.retries:
+                    raise
+            except BaseException:
+                breaker.release()
+                raise
+            else:
+                if _status(response) not in RETRY_STATUS:
+                    self._record(url, breaker, response)
+                    return response
+                self._failed(url, breaker)
+                if attempt == self.retries:
+                    return response
+                response.close()
+            self._notify('retry', url)
+            await asyncio.sleep(self._backoff(attempt, deadline))
+
+
+# Prozessweite Regeln, die CLI und Web-Anwendung gemeinsam nutzen
+default_policy = FetchPolicy()
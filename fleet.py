@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Flotten-Modus: ein Report über viele Home Assistant Instanzen
+Fragt die Instanzen parallel (begrenzt) mit Zeitlimit pro Instanz ab und fasst
+die Ergebnisse zu einem Report mit flottenweiten Statistiken zusammen
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from urllib.parse import urlparse
+
+from exporters import iter_json
+from ha_overview import HomeAssistantOverview
+
+# Format-Kennung des Flotten-Reports
+FLEET_FORMAT = 'fleet'
+
+# Standardmäßig gleichzeitig abgefragte Instanzen
+DEFAULT_MAX_WORKERS = 4
+
+# Zeitlimit pro Instanz in Sekunden (Verbindungstest und alle Endpunkte zusammen)
+DEFAULT_TIMEOUT = 30
+
+
+def instance_name(instance):
+    """Anzeigename einer Instanz ('name' oder Host der URL)"""
+    return instance.get('name') or urlparse(instance['url']).netloc or instance['url']
+
+
+def load_instances(path):
+    """
+    Lade die Instanz-Liste aus einer JSON-Datei
+
+    Erwartet eine Liste von Objekten mit 'url', 'token' und optional 'name'.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        instances = json.load(f)
+    if isinstance(instances, dict):
+        instances = instances.get('instances', [])
+    for instance in instances:
+        if not instance.get('url') or not instance.get('token'):
+            raise ValueError(f"Instanz ohne URL oder Token: {instance.get('name') or instance.get('url')}")
+    return instances
+
+
+class FleetCollector:
+    def __init__(self, instances, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT):
+        """
+        Initialisiere den Collector
+
+        Args:
+            instances: Liste von Dicts mit 'url', 'token' und optional 'name'
+            max_workers: Maximale Anzahl gleichzeitig abgefragter Instanzen
+            timeout: Zeitlimit pro Instanz in Sekunden
+        """
+        self.instances = list(instances)
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = timeout
+
+    def _fetch(self, instance, deadline):
+        """Erstelle den Report einer Instanz (läuft in einem eigenen Thread)"""
+        result = {}
+        try:
+            # Alle Abfragen samt Wiederholungen enden spätestens zur Frist der
+            # Instanz, damit ein aufgegebener Thread nicht weiterläuft
+            ha = HomeAssistantOverview(instance['url'], instance['token'], timeout=self.timeout,
+                                       deadline=deadline)
+            ha.check_connection()
+            data = ha.fetch_all(concurrent=True)
+            result['report'] = ha.build_report(data, compact=True)
+            result['fetch_timings'] = {name: round(t, 3) for name, t in ha.fetch_timings.items()}
+        except Exception as e:
+            result['error'] = str(e) or type(e).__name__
+        return result
+
+    def collect(self):
+        """
+        Frage alle Instanzen ab
+
+        Eine Instanz, die ihr Zeitlimit überschreitet, wird als 'timeout'
+        markiert, sodass langsame oder tote Instanzen die übrigen nicht
+        aufhalten. Ihr Thread endet kurz darauf (die Frist gilt auch für seine
+        Abfragen) und belegt bis dahin weiter einen der max_workers Plätze.
+
+        Returns:
+            Liste der Ergebnisse je Instanz (Reihenfolge wie instances)
+        """
+        results = [{'name': instance_name(instance), 'url': instance['url'].rstrip('/')}
+                   for instance in self.instances]
+        # Jeder Thread schreibt nur in outcomes; results übernimmt das Ergebnis,
+        # solange das Zeitlimit nicht überschritten ist
+        outcomes = {}
+        queue = list(range(len(self.instances)))
+        running = {}
+        # Aufgegebene Instanzen, deren Thread noch läuft
+        abandoned = set()
+        finished = threading.Condition()
+
+        def run(position, deadline):
+            outcome = self._fetch(self.instances[position], deadline)
+            with finished:
+                outcomes[position] = outcome
+                finished.notify()
+
+        with finished:
+            while queue or running:
+                for position in abandoned & outcomes.keys():
+                    # Ergebnis nach Ablauf des Zeitlimits wird verworfen, der Platz ist frei
+                    abandoned.discard(position)
+                    del outcomes[position]
+
+                while queue and len(running) + len(abandoned) < self.max_workers:
+                    position = queue.pop(0)
+                    started = time.monotonic()
+                    thread = threading.Thread(target=run, args=(position, started + self.timeout),
+                                              daemon=True)
+                    running[position] = started
+                    thread.start()
+
+                now = time.monotonic()
+                for position, started in list(running.items()):
+                    result = results[position]
+                    if position in outcomes:
+                        result.update(outcomes.pop(position))
+                        result['status'] = 'error' if 'error' in result else 'ok'
+                    elif now - started >= self.timeout:
+                        abandoned.add(position)
+                        result['status'] = 'timeout'
+                        result['error'] = f"Keine Antwort innerhalb von {self.timeout}s"
+                    else:
+                        continue
+                    result['duration'] = round(now - started, 3)
+                    del running[position]
+
+                if running:
+                    if not (queue and len(running) + len(abandoned) < self.max_workers):
+                        next_deadline = min(running.values()) + self.timeout
+                        finished.wait(max(0.01, next_deadline - time.monotonic()))
+                elif queue:
+                    # Alle Plätze belegen aufgegebene Threads: warten, bis einer endet
+                    finished.wait(1.0)
+
+        return results
+
+    def generate_report(self):
+        """
+        Erstelle den Flotten-Report
+
+        Returns:
+            Dict mit 'fleet_statistics' und einem Abschnitt je Instanz unter
+            'instances' (Report im kompakten Format, siehe report_format)
+        """
+        start = time.perf_counter()
+        results = self.collect()
+        report = {
+            'timestamp': datetime.now().isoformat(),
+            'format': FLEET_FORMAT,
+            'fleet_statistics': fleet_statistics(results),
+            'instances': results
+        }
+        report['fleet_statistics']['duration'] = round(time.perf_counter() - start, 3)
+        return report
+
+
+def fleet_statistics(results):
+    """Flottenweite Kennzahlen über alle erfolgreich abgefragten Instanzen"""
+    reports = [result['report'] for result in results if result.get('status') == 'ok']
+    entities_by_domain = Counter()
+    adoption = Counter()
+    versions = defaultdict(list)
+    for result in results:
+        if result.get('status') != 'ok':
+            continue
+        report = result['report']
+        entities_by_domain.update(report['entities_by_domain'])
+        adoption.update(set(report['components']))
+        versions[report['system_info'].get('version') or 'unbekannt'].append(result['name'])
+
+    return {
+        'total_instances': len(results),
+        'instances_ok': len(reports),
+        'instances_failed': len(results) - len(reports),
+        'total_entities': sum(r['statistics']['total_entities'] for r in reports),
+        'total_components': len(adoption),
+        'total_services': sum(r['statistics']['total_services'] for r in reports),
+        'entities_by_domain': dict(entities_by_domain.most_common()),
+        # Komponente -> Anzahl Instanzen, die sie verwenden (häufigste zuerst)
+        'component_adoption': dict(sorted(adoption.items(), key=lambda item: (-item[1], item[0]))),
+        # Version -> Instanzen mit dieser Version
+        'version_spread': dict(sorted(versions.items())),
+    }
+
+
+def print_fleet_summary(report):
+    """Drucke eine Zusammenfassung des Flotten-Reports auf die Konsole"""
+    stats = report['fleet_statistics']
+    print("\n" + "="*80)
+    print("FLOTTE")
+    print("="*80)
+    for result in report['instances']:
+        if result['status'] == 'ok':
+            entities = result['report']['statistics']['total_entities']
+            version = result['report']['system_info'].get('version')
+            print(f"✓ {result['name']:<30} {version or '?':<12} {entities:>6} Entitäten  {result['duration']:6.2f}s")
+        else:
+            print(f"✗ {result['name']:<30} {result['status']}: {result['error']}")
+
+    print("\n" + "="*80)
+    print("FLOTTEN-STATISTIKEN")
+    print("="*80)
+    print(f"Instanzen:      {stats['instances_ok']}/{stats['total_instances']} erreichbar")
+    print(f"Entitäten:      {stats['total_entities']}")
+    print(f"Komponenten:    {stats['total_components']}")
+    print(f"Services:       {stats['total_services']}")
+    print(f"Dauer:          {stats['duration']:.2f}s")
+
+    print("\nVersionen:")
+    for version, names in stats['version_spread'].items():
+        print(f"  {version:.<20} {len(names):>3}  ({', '.join(names)})")
+
+    print("\nVerbreitung der Komponenten (Top 20):")
+    for component, count in list(stats['component_adoption'].items())[:20]:
+        print(f"  {component:.<30} {count:>3}/{stats['instances_ok']}")
+
+
+def main(argv=None):
+    """Flotten-Report über die Kommandozeile"""
+    parser = argparse.ArgumentParser(description="Home Assistant Flotten-Report")
+    parser.add_argument('instances', help="JSON-Datei mit einer Liste von {name, url, token}")
+    parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f"Gleichzeitig abgefragte Instanzen (Standard: {DEFAULT_MAX_WORKERS})")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Zeitlimit pro Instanz in Sekunden (Standard: {DEFAULT_TIMEOUT})")
+    parser.add_argument('--output', metavar='DATEI',
+                        help="Flotten-Report als JSON speichern")
+    args = parser.parse_args(argv)
+
+    collector = FleetCollector(load_instances(args.instances),
+                               max_workers=args.workers, timeout=args.timeout)
+    print(f"Frage {len(collector.instances)} Instanzen ab "
+          f"({collector.max_workers} gleichzeitig, Zeitlimit {collector.timeout}s)...")
+    report = collector.generate_report()
+    print_fleet_summary(report)
+
+    if args.output:
+        with open(args.output, 'wb') as f:
+            for chunk in iter_json(report):
+                f.write(chunk)
+        print(f"\n✓ Flotten-Report: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
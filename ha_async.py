@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Asynchroner Client für Home Assistant
+Fragt die Endpunkte über aiohttp auf einer Event-Loop ab, sodass ein Prozess
+viele Reports gleichzeitig erstellen kann, ohne pro Report Threads zu blockieren
+"""
+
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from ha_overview import HomeAssistantOverview, FETCH_PATHS, fetch_steps
+from report_format import parse_sections
+from state_stream import JsonArrayParser, StateCounts, StateList, collect_states, STATE_CHUNK_SIZE
+
+# Maximale gleichzeitige Verbindungen pro Home Assistant Instanz (über alle Reports)
+CONNECTIONS_PER_HOST = 10
+
+# Gesamt-Timeout einer Abfrage in Sekunden (Verbindungsaufbau und Lesen regelt fetch_policy)
+REQUEST_TIMEOUT = 60
+
+# Ausnahmen, nach denen eine Abfrage wiederholt wird (aiohttp)
+RETRY_EXCEPTIONS = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+# Antworten ab dieser Größe (Bytes) werden außerhalb der Event-Loop geparst
+JSON_THREAD_THRESHOLD = 256 * 1024
+
+
+def create_session(connections_per_host=CONNECTIONS_PER_HOST):
+    """
+    Erstelle eine aiohttp-Session mit Keep-Alive-Verbindungen
+
+    Muss innerhalb der laufenden Event-Loop aufgerufen werden; die Session
+    sollte von allen Reports des Prozesses geteilt werden.
+    """
+    connector = aiohttp.TCPConnector(limit=0, limit_per_host=connections_per_host)
+    return aiohttp.ClientSession(connector=connector,
+                                 timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT))
+
+
+class AsyncHomeAssistantOverview(HomeAssistantOverview):
+    def __init__(self, url, token, session, state_mirror=None, progress=None,
+                 stream_states=True, entity_filter=None, policy=None):
+        """
+        Initialisiere den asynchronen Client
+
+        Auswertung und Report-Aufbau (build_report) werden von
+        HomeAssistantOverview übernommen; nur die Abfragen laufen asynchron.
+
+        Args:
+            url: Home Assistant URL
+            token: Long-Lived Access Token
+            session: Geteilte aiohttp.ClientSession (siehe create_session)
+            state_mirror: Optionaler StateMirror (siehe HomeAssistantOverview)
+            progress: Optionaler Fortschritts-Callback (siehe HomeAssistantOverview)
+            stream_states: /api/states blockweise parsen (siehe HomeAssistantOverview)
+            entity_filter: Optionaler Filter beim Einlesen (siehe HomeAssistantOverview)
+            policy: Abfrage-Regeln (siehe HomeAssistantOverview)
+        """
+        super().__init__(url, token, state_mirror=state_mirror, progress=progress,
+                         stream_states=stream_states, entity_filter=entity_filter, policy=policy)
+        self.async_session = session
+
+    async def _get_async(self, path, timeout=None, stream=False):
+        """
+        GET-Anfrage nach den Abfrage-Regeln (Zeitlimits, Wiederholungen, Circuit Breaker)
+
+        Args:
+            timeout: Obergrenze der Zeitlimits in Sekunden
+            stream: Antwort ungelesen zurückgeben (der Aufrufer muss sie schließen);
+                    sonst ist der Inhalt bereits vollständig gelesen
+
+        Returns:
+            aiohttp.ClientResponse
+        """
+        async def request(limits):
+            connect, read = limits
+            response = await self.async_session.get(
+                f"{self.url}{path}", headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, sock_connect=connect, sock_read=read)
+            )
+            if not stream:
+                # Nach dem vollständigen Lesen geht die Verbindung an den Pool zurück
+                await response.read()
+            return response
+
+        start = time.perf_counter()
+        response = await self.policy.call_async(self.url, path, request, limit=timeout,
+                                                retry_on=RETRY_EXCEPTIONS)
+        self.network_timings[path] = time.perf_counter() - start
+        return response
+
+    async def _get_json(self, path, timeout=None):
+        """
+        GET-Anfrage und JSON-Antwort; große Antworten werden in einem Thread geparst
+
+        Raises:
+            aiohttp.ClientResponseError: Bei einem Fehler-Status (auch nach allen Wiederholungen)
+        """
+        response = await self._get_async(path, timeout)
+        response.raise_for_status()
+        body = await response.read()
+        self.fetch_bytes[path] = len(body)
+        start = time.perf_counter()
+        try:
+            if len(body) >= JSON_THREAD_THRESHOLD:
+                return await asyncio.get_running_loop().run_in_executor(None, json.loads, body)
+            return json.loads(body)
+        finally:
+            self.parse_timings[path] = time.perf_counter() - start
+
+    async def test_connection_async(self):
+        """Teste die Verbindung zu Home Assistant"""
+        try:
+            response = await self._get_async("/api/", timeout=10)
+            if response.status == 200:
+                print("✓ Verbindung erfolgreich!")
+                return True
+            print(f"✗ Fehler: Status Code {response.status}")
+            return False
+        except Exception as e:
+            print(f"✗ Verbindungsfehler: {e}")
+            return False
+
+    async def get_config_async(self):
+        """Hole die Konfiguration"""
+        return await self._get_json(FETCH_PATHS['config'])
+
+    async def get_components_async(self):
+        """Hole alle installierten Komponenten/Integrationen"""
+        data = await self._get_json(FETCH_PATHS['components'])
+        return data.get('components', [])
+
+    async def get_states_async(self, counts_only=False):
+        """Hole alle Entitäten mit ihren Zuständen (StateList oder StateCounts, siehe get_states)"""
+        if self.state_mirror is not None and self.state_mirror.ready:
+            states = collect_states(self.state_mirror.get_states(), self.entity_filter, counts_only)
+        elif self.stream_states:
+            states = await self._stream_states_async(counts_only)
+        else:
+            states = collect_states(await self._get_json(FETCH_PATHS['states']), self.entity_filter,
+                                    counts_only)
+        self.filtered_entities = states.filtered
+        return states
+
+    async def _stream_states_async(self, counts_only=False):
+        """
+        Lade /api/states blockweise (siehe HomeAssistantOverview._stream_states)
+
+        Jeder Block wird direkt auf der Event-Loop geparst; ein Block enthält
+        nur wenige hundert Entitäten, sodass andere Reports nicht lange warten.
+        """
+        path = FETCH_PATHS['states']
+        parser = JsonArrayParser()
+        states = StateCounts(self.entity_filter) if counts_only else StateList(self.entity_filter)
+        size = 0
+        parse = 0.0
+        # Wiederholt wird nur bis zum Antwortkopf (siehe _stream_states)
+        async with await self._get_async(path, stream=True) as response:
+            response.raise_for_status()
+            received = time.perf_counter()
+            network = self.network_timings[path]
+            async for chunk in response.content.iter_chunked(STATE_CHUNK_SIZE):
+                parsed = time.perf_counter()
+                network += parsed - received
+                size += len(chunk)
+                states.add_all(parser.feed(chunk))
+                received = time.perf_counter()
+                parse += received - parsed
+        states.add_all(parser.close())
+        parse += time.perf_counter() - received
+        self.network_timings[path] = network
+        self.parse_timings[path] = parse
+        self.fetch_bytes[path] = size
+        return states
+
+    async def get_services_async(self):
+        """Hole alle verfügbaren Services"""
+        return await self._get_json(FETCH_PATHS['services'])
+
+    async def get_events_async(self):
+        """Hole alle verfügbaren Events"""
+        return await self._get_json(FETCH_PATHS['events'])
+
+    async def _timed_fetch_async(self, name, coroutine):
+        """Warte auf eine Abfrage und merke die Dauer in fetch_timings"""
+        start = time.perf_counter()
+        try:
+            return await coroutine
+        finally:
+            self.fetch_timings[name] = time.perf_counter() - start
+            self._report_progress('fetched', name=name, seconds=self.fetch_timings[name],
+                                  bytes=self.fetch_bytes.get(FETCH_PATHS[name]))
+
+    async def fetch_all_async(self, sections=None):
+        """
+        Hole alle unabhängigen Endpunkte gleichzeitig
+
+        Args:
+            sections: Nur die Endpunkte für diese Abschnitte abfragen (siehe fetch_all)
+
+        Returns:
+            Dict mit den Ergebnissen je abgefragtem Endpunkt-Name (siehe FETCH_STEPS)
+        """
+        self.fetch_timings = {}
+        self.fetch_bytes = {}
+        self.network_timings = {}
+        self.parse_timings = {}
+        methods = self._fetch_methods(sections, suffix='_async')
+        results = await asyncio.gather(*(
+            self._timed_fetch_async(name, method()) for name, method in methods.items()
+        ))
+        return dict(zip(methods, results))
+
+    async def generate_report_async(self, compact=False, sections=None):
+        """
+        Erstelle einen vollständigen Bericht (asynchrone Variante von generate_report)
+
+        Args:
+            compact: Report im kompakten Format erstellen
+            sections: Nur diese Abschnitte erstellen und abfragen (siehe generate_report)
+        """
+        sections = parse_sections(sections)
+        self._print_header()
+        self.phase_timings = {}
+
+        self._report_progress('connecting')
+        with self._timed_phase('connect'):
+            if not await self.test_connection_async():
+                return None
+
+        print("\n📊 Sammle Daten...\n")
+
+        self._report_progress('fetching', total=len(fetch_steps(sections)))
+        with self._timed_phase('fetch'):
+            data = await self.fetch_all_async(sections)
+        self._print_fetch_timings(self.phase_timings['fetch'])
+
+        self._report_progress('building')
+        with self._timed_phase('build'):
+            report = self.build_report(data, compact=compact, sections=sections)
+        report['diagnostics'] = self.diagnostics()
+        self._report_progress('built', report=report)
+        return report
@@ -4,123 +4,527 @@ Home Assistant Complete Overview Tool
 Erstellt eine vollständige Dokumentation aller Integrationen, Entitäten und Dienste
 """
 
-import requests
-import json
+import argparse
+import contextlib
+import functools
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from collections import defaultdict
 
+import requests
+
+from entity_filter import EntityFilter, FILTER_KEYS, parse_filter
+from exporters import CompressionStats, open_export
+from report_format import (
+    COMPACT_FORMAT, REPORT_SECTIONS, is_complete, get_report_sections, get_report_states, parse_sections
+)
+from report_writer import BUNDLE_FORMATS, FORMAT_SUFFIXES, SINKS, make_sink, write_report
+from search_index import SearchIndex
+from snapshot_store import SnapshotStore, DEFAULT_PATH as DEFAULT_SNAPSHOT_PATH
+from fetch_policy import default_policy
+from session_pool import lease_session
+from state_stream import JsonArrayParser, StateCounts, StateList, collect_states, STATE_CHUNK_SIZE
+
+# Unabhängige Endpunkte, die für einen Report abgefragt werden (Name, Methode)
+FETCH_STEPS = (
+    ('config', 'get_config'),
+    ('components', 'get_components'),
+    ('states', 'get_states'),
+    ('services', 'get_services'),
+    ('events', 'get_events'),
+)
+
+# REST-Pfad je Endpunkt-Name
+FETCH_PATHS = {
+    'config': '/api/config',
+    'components': '/api/config/core',
+    'states': '/api/states',
+    'services': '/api/services',
+    'events': '/api/events',
+}
+
+# Endpunkte, die ein Report-Abschnitt (siehe report_format.REPORT_SECTIONS) benötigt
+SECTION_ENDPOINTS = {
+    'system_info': ('config',),
+    'statistics': ('components', 'states', 'services', 'events'),
+    'components': ('components',),
+    'entities_by_domain': ('states',),
+    'entities': ('states',),
+    'services': ('services',),
+    'events': ('events',),
+}
+
+
+# Export-Formate, die auch Teil-Reports (nicht alle Abschnitte) darstellen
+PARTIAL_FORMATS = ('json', 'claude')
+
+# Standard-Zielverzeichnis der Berichte (Kommandozeile: --output-dir bzw. HA_OUTPUT_DIR)
+DEFAULT_OUTPUT_DIR = '/mnt/user-data/outputs'
+
+# Standard-Formate der Kommandozeile (Teil-Reports nur in PARTIAL_FORMATS)
+DEFAULT_FORMATS = ('json', 'txt', 'html')
+
+
+def bundle_formats(report):
+    """Formate aus BUNDLE_FORMATS, die der Report darstellen kann (Teil-Reports nur PARTIAL_FORMATS)"""
+    complete = is_complete(report)
+    return tuple(format for format in BUNDLE_FORMATS if complete or format in PARTIAL_FORMATS)
+
+
+def fetch_steps(sections=None):
+    """Endpunkte aus FETCH_STEPS, die für die gewählten Abschnitte abgefragt werden müssen"""
+    needed = {name for section in parse_sections(sections) for name in SECTION_ENDPOINTS[section]}
+    return tuple(step for step in FETCH_STEPS if step[0] in needed)
+
+
 class HomeAssistantOverview:
-    def __init__(self, url, token):
+    def __init__(self, url, token, max_workers=5, session=None, state_mirror=None, timeout=None,
+                 progress=None, stream_states=True, entity_filter=None, policy=None, deadline=None):
         """
         Initialize Home Assistant connection
         
         Args:
             url: Home Assistant URL (z.B. http://homeassistant.local:8123)
             token: Long-Lived Access Token
+            max_workers: Maximale Anzahl paralleler Abfragen im Concurrent-Modus
+            session: Eigene requests.Session; standardmäßig wird die geteilte
+                     Keep-Alive-Session aus dem session_pool verwendet
+            state_mirror: Optionaler StateMirror; ist er bereit, liefert
+                          get_states die gespiegelten Zustände ohne REST-Abfrage
+            timeout: Obergrenze der Zeitlimits jeder Abfrage in Sekunden
+                     (None = Zeitlimits der Abfrage-Regeln)
+            progress: Optionaler Callback progress(phase, **details) für
+                      Fortschrittsanzeigen; Phasen: 'connecting', 'fetching'
+                      (total), 'fetched' (name, seconds, bytes), 'building',
+                      'built' (report)
+            stream_states: /api/states beim Empfang blockweise parsen, statt die
+                           komplette Antwort zu laden (siehe state_stream)
+            entity_filter: Optionale Funktion entity_filter(entity) -> bool, z.B.
+                           ein EntityFilter; Entitäten mit False werden schon
+                           beim Einlesen verworfen
+            policy: Abfrage-Regeln (Zeitlimits, Wiederholungen, Circuit Breaker);
+                    standardmäßig die geteilten Regeln aus fetch_policy
+            deadline: Optionale Frist (time.monotonic()) für alle Abfragen
+                      zusammen; danach schlägt jede weitere Abfrage mit
+                      requests.Timeout fehl (z.B. Zeitlimit pro Instanz im Flotten-Modus)
         """
         self.url = url.rstrip('/')
         self.headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json"
         }
+        self.max_workers = max(1, int(max_workers))
+        self.fetch_timings = {}
+        self.fetch_bytes = {}
+        self.network_timings = {}
+        self.parse_timings = {}
+        self.phase_timings = {}
+        self._session = session
+        self.state_mirror = state_mirror
+        self.timeout = timeout
+        self.progress = progress
+        self.stream_states = stream_states
+        self.entity_filter = entity_filter
+        self.filtered_entities = 0
+        self.policy = policy or default_policy
+        self.deadline = deadline
+    
+    def _report_progress(self, phase, **details):
+        """Melde eine Phase an den progress-Callback (falls gesetzt)"""
+        if self.progress is not None:
+            self.progress(phase, **details)
+    
+    @contextlib.contextmanager
+    def _timed_phase(self, name):
+        """Miss die Dauer des with-Blocks als Phase name in phase_timings"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_timings[name] = self.phase_timings.get(name, 0.0) + time.perf_counter() - start
+    
+    @contextlib.contextmanager
+    def _session_lease(self):
+        """Eigene Session oder die geteilte Session, solange der with-Block läuft"""
+        if self._session is not None:
+            yield self._session
+        else:
+            with lease_session(self.url) as session:
+                yield session
+    
+    def _get(self, path, timeout=None, session=None, **kwargs):
+        """
+        GET-Anfrage über die (geteilte) Keep-Alive-Session
+        
+        Zeitlimits, Wiederholungen und Circuit Breaker kommen aus self.policy.
+        
+        Args:
+            timeout: Obergrenze der Zeitlimits in Sekunden (Standard: self.timeout)
+            session: Bereits belegte Session (nötig bei stream=True, damit sie
+                     bis zum Ende des Lesens belegt bleibt)
+        """
+        if session is None:
+            with self._session_lease() as session:
+                return self._get(path, timeout=timeout, session=session, **kwargs)
+        start = time.perf_counter()
+        response = self.policy.call(
+            self.url, path,
+            lambda limits: session.get(f"{self.url}{path}", headers=self.headers, timeout=limits, **kwargs),
+            limit=timeout if timeout is not None else self.timeout,
+            deadline=self.deadline
+        )
+        self.network_timings[path] = time.perf_counter() - start
+        if not kwargs.get('stream'):
+            self.fetch_bytes[path] = len(response.content)
+        return response
+    
+    def _get_json(self, path):
+        """
+        GET-Anfrage und JSON-Antwort; die Dauer des Parsens landet in parse_timings
+
+        Raises:
+            requests.HTTPError: Bei einem Fehler-Status (auch nach allen Wiederholungen)
+        """
+        response = self._get(path)
+        response.raise_for_status()
+        start = time.perf_counter()
+        try:
+            return response.json()
+        finally:
+            self.parse_timings[path] = time.perf_counter() - start
         
+    def check_connection(self, timeout=None):
+        """
+        Prüfe die Verbindung zu Home Assistant ohne Konsolenausgabe
+
+        Args:
+            timeout: Zeitlimit in Sekunden (Standard: self.timeout)
+
+        Raises:
+            RuntimeError: Wenn Home Assistant nicht mit Status 200 antwortet
+            requests.RequestException: Bei Verbindungsfehlern
+        """
+        response = self._get("/api/", timeout=timeout)
+        if response.status_code != 200:
+            raise RuntimeError(f"Status Code {response.status_code}")
+
     def test_connection(self):
         """Teste die Verbindung zu Home Assistant"""
         try:
-            response = requests.get(f"{self.url}/api/", headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                print("✓ Verbindung erfolgreich!")
-                return True
-            else:
-                print(f"✗ Fehler: Status Code {response.status_code}")
-                return False
+            self.check_connection(timeout=10)
+        except RuntimeError as e:
+            print(f"✗ Fehler: {e}")
+            return False
         except Exception as e:
             print(f"✗ Verbindungsfehler: {e}")
             return False
+        print("✓ Verbindung erfolgreich!")
+        return True
     
     def get_config(self):
         """Hole die Konfiguration"""
-        response = requests.get(f"{self.url}/api/config", headers=self.headers)
-        return response.json()
+        return self._get_json(FETCH_PATHS['config'])
     
     def get_components(self):
         """Hole alle installierten Komponenten/Integrationen"""
-        response = requests.get(f"{self.url}/api/config/core", headers=self.headers)
-        data = response.json()
+        data = self._get_json(FETCH_PATHS['components'])
         return data.get('components', [])
     
-    def get_states(self):
-        """Hole alle Entitäten mit ihren Zuständen"""
-        response = requests.get(f"{self.url}/api/states", headers=self.headers)
-        return response.json()
+    def get_states(self, counts_only=False):
+        """
+        Hole alle Entitäten mit ihren Zuständen
+        
+        Args:
+            counts_only: Nur die Entitäten je Domain zählen, ohne sie zu speichern
+        
+        Returns:
+            StateList mit kompakten Records (siehe entity_model) und Domain-Index,
+            bei counts_only eine StateCounts
+        """
+        if self.state_mirror is not None and self.state_mirror.ready:
+            states = collect_states(self.state_mirror.get_states(), self.entity_filter, counts_only)
+        elif self.stream_states:
+            states = self._stream_states(counts_only)
+        else:
+            states = collect_states(self._get_json(FETCH_PATHS['states']), self.entity_filter, counts_only)
+        self.filtered_entities = states.filtered
+        return states
+    
+    def _stream_states(self, counts_only=False):
+        """
+        Lade /api/states blockweise und parse jede Entität, sobald sie vollständig ist
+        
+        Die Antwort liegt nie komplett im Speicher; network_timings enthält die
+        Wartezeit auf Daten, parse_timings die Zeit für Parsen und Aufnahme.
+        """
+        path = FETCH_PATHS['states']
+        parser = JsonArrayParser()
+        states = StateCounts(self.entity_filter) if counts_only else StateList(self.entity_filter)
+        size = 0
+        parse = 0.0
+        # Wiederholt wird nur bis zum Antwortkopf; danach ist der Parser schon gefüllt
+        with self._session_lease() as session, self._get(path, session=session, stream=True) as response:
+            response.raise_for_status()
+            chunks = response.iter_content(STATE_CHUNK_SIZE)
+            received = time.perf_counter()
+            network = self.network_timings[path]
+            for chunk in chunks:
+                parsed = time.perf_counter()
+                network += parsed - received
+                # Das Lese-Zeitlimit gilt je Block; eine tröpfelnde Antwort endet spätestens zur Frist
+                if self.deadline is not None and time.monotonic() > self.deadline:
+                    raise requests.Timeout(f"{self.url}{path}: Zeitlimit überschritten")
+                size += len(chunk)
+                states.add_all(parser.feed(chunk))
+                received = time.perf_counter()
+                parse += received - parsed
+        states.add_all(parser.close())
+        parse += time.perf_counter() - received
+        self.network_timings[path] = network
+        self.parse_timings[path] = parse
+        self.fetch_bytes[path] = size
+        return states
     
     def get_services(self):
         """Hole alle verfügbaren Services"""
-        response = requests.get(f"{self.url}/api/services", headers=self.headers)
-        return response.json()
+        return self._get_json(FETCH_PATHS['services'])
     
     def get_events(self):
         """Hole alle verfügbaren Events"""
-        response = requests.get(f"{self.url}/api/events", headers=self.headers)
-        return response.json()
+        return self._get_json(FETCH_PATHS['events'])
+    
+    def _timed_fetch(self, name, method):
+        """Rufe einen Endpunkt ab und merke die Dauer in fetch_timings"""
+        start = time.perf_counter()
+        try:
+            return method()
+        finally:
+            self.fetch_timings[name] = time.perf_counter() - start
+            self._report_progress('fetched', name=name, seconds=self.fetch_timings[name],
+                                  bytes=self.fetch_bytes.get(FETCH_PATHS[name]))
+    
+    def _fetch_methods(self, sections, suffix=''):
+        """Abfrage-Methoden je Endpunkt-Name für die gewählten Abschnitte"""
+        sections = parse_sections(sections)
+        methods = {name: getattr(self, method + suffix) for name, method in fetch_steps(sections)}
+        if 'states' in methods and 'entities' not in sections:
+            # Ohne Entitäten-Abschnitt genügt die Anzahl je Domain
+            methods['states'] = functools.partial(methods['states'], counts_only=True)
+        return methods
+    
+    def fetch_all(self, concurrent=False, sections=None):
+        """
+        Hole alle unabhängigen Endpunkte
+        
+        Args:
+            concurrent: Endpunkte parallel über einen Thread-Pool abfragen
+                        (begrenzt durch max_workers) statt nacheinander
+            sections: Nur die Endpunkte für diese Abschnitte abfragen
+                      (siehe report_format.parse_sections; None = alle)
+        
+        Returns:
+            Dict mit den Ergebnissen je abgefragtem Endpunkt-Name (siehe FETCH_STEPS)
+        """
+        self.fetch_timings = {}
+        self.fetch_bytes = {}
+        self.network_timings = {}
+        self.parse_timings = {}
+        methods = self._fetch_methods(sections)
+        if not concurrent or self.max_workers == 1 or len(methods) == 1:
+            return {name: self._timed_fetch(name, method) for name, method in methods.items()}
+        
+        workers = min(self.max_workers, len(methods))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                name: executor.submit(self._timed_fetch, name, method)
+                for name, method in methods.items()
+            }
+            return {name: future.result() for name, future in futures.items()}
     
     def analyze_entities(self, states):
         """Analysiere Entitäten nach Domains"""
+        if isinstance(states, StateList):
+            # Beim Einlesen bereits gruppiert
+            return {domain: [states[i] for i in positions]
+                    for domain, positions in states.domain_index.items()}
         by_domain = defaultdict(list)
         for entity in states:
             domain = entity['entity_id'].split('.')[0]
             by_domain[domain].append(entity)
         return dict(by_domain)
     
-    def generate_report(self):
-        """Erstelle einen vollständigen Bericht"""
+    def index_entities(self, states):
+        """Analysiere Entitäten nach Domains (Positionen in states statt Kopien)"""
+        if isinstance(states, StateList):
+            return dict(sorted(states.domain_index.items()))
+        by_domain = defaultdict(list)
+        for i, entity in enumerate(states):
+            by_domain[entity['entity_id'].split('.')[0]].append(i)
+        return dict(sorted(by_domain.items()))
+    
+    def diagnostics(self):
+        """
+        Zeitmessungen der letzten Report-Generierung
+        
+        Returns:
+            Dict mit 'phases' (Sekunden je Phase, z.B. connect, fetch, analyze,
+            build), 'endpoints' (je Endpunkt Gesamtdauer, Netzwerk, JSON-Parsen
+            und Bytes; None, wenn nicht per REST abgefragt), 'bytes_fetched'
+            und bei gesetztem entity_filter 'filtered_entities'
+        """
+        endpoints = {}
+        for name, _ in FETCH_STEPS:
+            path = FETCH_PATHS[name]
+            seconds = {
+                'seconds': self.fetch_timings.get(name),
+                'network': self.network_timings.get(path),
+                'parse': self.parse_timings.get(path),
+            }
+            endpoints[name] = {key: round(value, 4) if value is not None else None
+                               for key, value in seconds.items()}
+            endpoints[name]['bytes'] = self.fetch_bytes.get(path)
+        diagnostics = {
+            'phases': {name: round(seconds, 4) for name, seconds in self.phase_timings.items()},
+            'endpoints': endpoints,
+            'bytes_fetched': sum(self.fetch_bytes.get(FETCH_PATHS[name], 0) for name, _ in FETCH_STEPS)
+        }
+        if self.entity_filter is not None:
+            diagnostics['filtered_entities'] = self.filtered_entities
+        return diagnostics
+    
+    def _print_header(self):
+        """Kopfzeilen der Report-Generierung auf der Konsole"""
         print("\n" + "="*80)
         print("HOME ASSISTANT - VOLLSTÄNDIGER ÜBERBLICK")
         print("="*80)
         print(f"Generiert am: {datetime.now().strftime('%d.%m.%Y um %H:%M:%S')}")
         print("="*80 + "\n")
+    
+    def _print_fetch_timings(self, elapsed):
+        """Dauer je abgefragtem Endpunkt (fetch_timings) und gesamt ausgeben"""
+        for name, _ in FETCH_STEPS:
+            if name not in self.fetch_timings:
+                continue
+            print(f"  ⏱ {name:.<20} {self.fetch_timings[name]:6.2f}s")
+        print(f"  ⏱ {'gesamt':.<20} {elapsed:6.2f}s\n")
+    
+    def generate_report(self, concurrent=False, compact=False, sections=None):
+        """
+        Erstelle einen vollständigen Bericht
+        
+        Args:
+            concurrent: Endpunkte parallel abfragen (siehe fetch_all)
+            compact: Report im kompakten Format erstellen (jede Entität nur
+                     einmal unter 'entities', siehe to_compact_report)
+            sections: Nur diese Abschnitte erstellen und nur die dafür nötigen
+                      Endpunkte abfragen (siehe report_format.REPORT_SECTIONS;
+                      None = alle)
+        
+        Returns:
+            Report-Dict mit den Zeitmessungen unter 'diagnostics' (siehe
+            diagnostics) oder None, wenn die Verbindung fehlschlägt
+        
+        Raises:
+            ValueError: Bei unbekannten Abschnitten
+        """
+        sections = parse_sections(sections)
+        self._print_header()
+        self.phase_timings = {}
         
         # Test connection
-        if not self.test_connection():
-            return None
+        self._report_progress('connecting')
+        with self._timed_phase('connect'):
+            if not self.test_connection():
+                return None
         
         print("\n📊 Sammle Daten...\n")
         
         # Sammle alle Daten
-        config = self.get_config()
-        components = self.get_components()
-        states = self.get_states()
-        services = self.get_services()
-        events = self.get_events()
-        entities_by_domain = self.analyze_entities(states)
+        self._report_progress('fetching', total=len(fetch_steps(sections)))
+        with self._timed_phase('fetch'):
+            data = self.fetch_all(concurrent=concurrent, sections=sections)
+        self._print_fetch_timings(self.phase_timings['fetch'])
+        
+        self._report_progress('building')
+        with self._timed_phase('build'):
+            report = self.build_report(data, compact=compact, sections=sections)
+        report['diagnostics'] = self.diagnostics()
+        self._report_progress('built', report=report)
+        return report
+    
+    def build_report(self, data, compact=False, sections=None):
+        """
+        Baue die Report-Struktur aus den abgefragten Daten
+        
+        Args:
+            data: Ergebnisse je Endpunkt-Name (siehe fetch_all)
+            compact: Report im kompakten Format erstellen
+            sections: Nur diese Abschnitte aufbauen (None = alle); data muss
+                      die dafür nötigen Endpunkte enthalten (siehe fetch_steps)
+        """
+        sections = parse_sections(sections)
+        states = data.get('states')
+        
+        with self._timed_phase('analyze'):
+            if isinstance(states, StateCounts):
+                # Ohne Entitäten-Abschnitt wurden nur die Domains gezählt
+                domain_counts = dict(sorted(states.domain_counts.items()))
+                entities_by_domain = None
+            elif states is not None:
+                if compact:
+                    entities_by_domain = self.index_entities(states)
+                else:
+                    entities_by_domain = self.analyze_entities(states)
+                domain_counts = {
+                    domain: len(entities) for domain, entities in sorted(entities_by_domain.items())
+                }
         
         # Erstelle Report-Struktur
         report = {
             "timestamp": datetime.now().isoformat(),
-            "system_info": {
+            "sections": list(sections),
+        }
+        if isinstance(self.entity_filter, EntityFilter):
+            report["filter"] = self.entity_filter.to_dict()
+        if 'system_info' in sections:
+            config = data['config']
+            report["system_info"] = {
                 "version": config.get('version'),
                 "location_name": config.get('location_name'),
                 "timezone": config.get('time_zone'),
                 "unit_system": config.get('unit_system'),
                 "latitude": config.get('latitude'),
                 "longitude": config.get('longitude')
-            },
-            "statistics": {
-                "total_components": len(components),
+            }
+        if 'statistics' in sections:
+            report["statistics"] = {
+                "total_components": len(data['components']),
                 "total_entities": len(states),
-                "total_services": sum(len(domain['services']) for domain in services),
-                "total_domains": len(entities_by_domain),
-                "total_events": len(events)
-            },
-            "components": sorted(components),
-            "entities_by_domain": {
-                domain: len(entities) for domain, entities in sorted(entities_by_domain.items())
-            },
-            "detailed_entities": entities_by_domain,
-            "services": services,
-            "events": events,
-            "all_states": states
-        }
+                "total_services": sum(len(domain['services']) for domain in data['services']),
+                "total_domains": len(domain_counts),
+                "total_events": len(data['events'])
+            }
+        if 'components' in sections:
+            report["components"] = sorted(data['components'])
+        if 'entities_by_domain' in sections:
+            report["entities_by_domain"] = domain_counts
+        
+        if compact:
+            report["format"] = COMPACT_FORMAT
+            if 'entities' in sections:
+                report["domain_index"] = entities_by_domain
+        elif 'entities' in sections:
+            report["detailed_entities"] = entities_by_domain
+        if 'services' in sections:
+            report["services"] = data['services']
+        if 'events' in sections:
+            report["events"] = data['events']
+        if 'entities' in sections:
+            report["entities" if compact else "all_states"] = states
         
         return report
     
@@ -128,361 +532,317 @@ class HomeAssistantOverview:
         """Drucke eine Zusammenfassung auf die Konsole"""
         if not report:
             return
+        sections = get_report_sections(report)
         
-        print("\n" + "="*80)
-        print("SYSTEM INFORMATIONEN")
-        print("="*80)
-        info = report['system_info']
-        print(f"Version:        {info['version']}")
-        print(f"Standort:       {info['location_name']}")
-        print(f"Zeitzone:       {info['timezone']}")
-        print(f"Einheitensystem: {info['unit_system']}")
+        if 'system_info' in sections:
+            print("\n" + "="*80)
+            print("SYSTEM INFORMATIONEN")
+            print("="*80)
+            info = report['system_info']
+            print(f"Version:        {info['version']}")
+            print(f"Standort:       {info['location_name']}")
+            print(f"Zeitzone:       {info['timezone']}")
+            print(f"Einheitensystem: {info['unit_system']}")
         
-        print("\n" + "="*80)
-        print("STATISTIKEN")
-        print("="*80)
-        stats = report['statistics']
-        print(f"Komponenten:    {stats['total_components']}")
-        print(f"Entitäten:      {stats['total_entities']}")
-        print(f"Services:       {stats['total_services']}")
-        print(f"Domains:        {stats['total_domains']}")
-        print(f"Events:         {stats['total_events']}")
+        if 'statistics' in sections:
+            print("\n" + "="*80)
+            print("STATISTIKEN")
+            print("="*80)
+            stats = report['statistics']
+            print(f"Komponenten:    {stats['total_components']}")
+            print(f"Entitäten:      {stats['total_entities']}")
+            print(f"Services:       {stats['total_services']}")
+            print(f"Domains:        {stats['total_domains']}")
+            print(f"Events:         {stats['total_events']}")
         
-        print("\n" + "="*80)
-        print("ENTITÄTEN NACH DOMAIN")
-        print("="*80)
-        for domain, count in sorted(report['entities_by_domain'].items(), key=lambda x: x[1], reverse=True):
-            print(f"{domain:.<30} {count:>4}")
+        if 'entities_by_domain' in sections:
+            print("\n" + "="*80)
+            print("ENTITÄTEN NACH DOMAIN")
+            print("="*80)
+            for domain, count in sorted(report['entities_by_domain'].items(), key=lambda x: x[1], reverse=True):
+                print(f"{domain:.<30} {count:>4}")
         
-        print("\n" + "="*80)
-        print("TOP 20 KOMPONENTEN")
-        print("="*80)
-        for i, component in enumerate(report['components'][:20], 1):
-            print(f"{i:2}. {component}")
-        if len(report['components']) > 20:
-            print(f"... und {len(report['components']) - 20} weitere")
+        if 'components' in sections:
+            print("\n" + "="*80)
+            print("TOP 20 KOMPONENTEN")
+            print("="*80)
+            for i, component in enumerate(report['components'][:20], 1):
+                print(f"{i:2}. {component}")
+            if len(report['components']) > 20:
+                print(f"... und {len(report['components']) - 20} weitere")
         
-    def save_report(self, report, format='json'):
-        """Speichere den Report in verschiedenen Formaten"""
+    def _record_export(self, report, format, filename, stats):
+        """Vermerke Datei und Größe eines Exports im Report unter 'exports'"""
+        entry = {"format": format, "file": filename}
+        entry.update(stats.to_dict())
+        report.setdefault("exports", []).append(entry)
+    
+    def save_reports(self, report, formats=('json',), compress=False, max_tokens=None, output_dir=None):
+        """
+        Speichere den Report in mehreren Formaten in einem Durchlauf
+        
+        Der Report wird nur einmal durchlaufen; jeder Teil geht gleichzeitig an
+        alle Formate (siehe report_writer.write_report).
+        
+        Args:
+            report: Report (volles oder kompaktes Format)
+            formats: Formate aus 'json', 'txt', 'html' und 'claude'
+            compress: Dateien gzip-komprimiert schreiben (Endung .gz)
+            max_tokens: Nur für 'claude' - Export in Teile mit diesem Token-Budget aufteilen
+            output_dir: Zielverzeichnis (Standard: DEFAULT_OUTPUT_DIR, wird bei Bedarf angelegt)
+        
+        Returns:
+            Liste der Dateinamen in der Reihenfolge von formats
+        
+        Raises:
+            ValueError: Bei unbekanntem Format oder wenn ein Format einen
+                        vollständigen Report benötigt (siehe PARTIAL_FORMATS),
+                        der Report aber nur Teile enthält
+        """
         if not report:
-            return None
+            return []
+        for format in formats:
+            if format not in SINKS:
+                raise ValueError(f"Unbekanntes Format {format} (möglich: {', '.join(SINKS)})")
+            if format not in PARTIAL_FORMATS and not is_complete(report):
+                raise ValueError(f"Format {format} benötigt einen vollständigen Report "
+                                 f"(enthalten: {', '.join(get_report_sections(report))})")
         
+        output_dir = output_dir or DEFAULT_OUTPUT_DIR
+        os.makedirs(output_dir, exist_ok=True)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        suffix = '.gz' if compress else ''
+        exports = []
         
-        if format == 'json':
-            filename = f"/mnt/user-data/outputs/ha_overview_{timestamp}.json"
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(report, f, indent=2, ensure_ascii=False)
-            return filename
-        
-        elif format == 'txt':
-            filename = f"/mnt/user-data/outputs/ha_overview_{timestamp}.txt"
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write("="*80 + "\n")
-                f.write("HOME ASSISTANT - VOLLSTÄNDIGER ÜBERBLICK\n")
-                f.write("="*80 + "\n")
-                f.write(f"Generiert am: {datetime.now().strftime('%d.%m.%Y um %H:%M:%S')}\n")
-                f.write("="*80 + "\n\n")
-                
-                # System Info
-                f.write("SYSTEM INFORMATIONEN\n")
-                f.write("-"*80 + "\n")
-                info = report['system_info']
-                for key, value in info.items():
-                    f.write(f"{key:20}: {value}\n")
-                
-                # Statistiken
-                f.write("\n" + "="*80 + "\n")
-                f.write("STATISTIKEN\n")
-                f.write("-"*80 + "\n")
-                stats = report['statistics']
-                for key, value in stats.items():
-                    f.write(f"{key:20}: {value}\n")
-                
-                # Komponenten
-                f.write("\n" + "="*80 + "\n")
-                f.write(f"ALLE KOMPONENTEN ({len(report['components'])})\n")
-                f.write("-"*80 + "\n")
-                for component in sorted(report['components']):
-                    f.write(f"  • {component}\n")
-                
-                # Entitäten nach Domain
-                f.write("\n" + "="*80 + "\n")
-                f.write("ENTITÄTEN NACH DOMAIN\n")
-                f.write("-"*80 + "\n")
-                for domain, count in sorted(report['entities_by_domain'].items(), key=lambda x: x[1], reverse=True):
-                    f.write(f"{domain:.<30} {count:>4}\n")
-                
-                # Detaillierte Entitäten
-                f.write("\n" + "="*80 + "\n")
-                f.write("ALLE ENTITÄTEN (DETAILLIERT)\n")
-                f.write("-"*80 + "\n")
-                for domain, entities in sorted(report['detailed_entities'].items()):
-                    f.write(f"\n### {domain.upper()} ({len(entities)} Entitäten) ###\n")
-                    for entity in entities:
-                        f.write(f"\n  Entity ID: {entity['entity_id']}\n")
-                        f.write(f"  Name:      {entity['attributes'].get('friendly_name', 'N/A')}\n")
-                        f.write(f"  Zustand:   {entity['state']}\n")
-                        if entity['attributes'].get('device_class'):
-                            f.write(f"  Klasse:    {entity['attributes']['device_class']}\n")
-                        f.write(f"  Letzte Änderung: {entity['last_changed']}\n")
-                
-                # Services
-                f.write("\n" + "="*80 + "\n")
-                f.write("VERFÜGBARE SERVICES\n")
-                f.write("-"*80 + "\n")
-                for domain_services in report['services']:
-                    domain = domain_services['domain']
-                    f.write(f"\n### {domain.upper()} ###\n")
-                    for service_name, service_data in domain_services['services'].items():
-                        f.write(f"  • {domain}.{service_name}\n")
-                        if service_data.get('description'):
-                            f.write(f"    {service_data['description']}\n")
-                
-                # Events
-                f.write("\n" + "="*80 + "\n")
-                f.write("VERFÜGBARE EVENTS\n")
-                f.write("-"*80 + "\n")
-                for event in report['events']:
-                    f.write(f"  • {event['event']}\n")
-            
-            return filename
-        
-        elif format == 'html':
-            filename = f"/mnt/user-data/outputs/ha_overview_{timestamp}.html"
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write("""<!DOCTYPE html>
-<html lang="de">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Home Assistant Überblick</title>
-    <style>
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }
-        h1, h2, h3 {
-            color: #03a9f4;
-        }
-        .header {
-            background: linear-gradient(135deg, #03a9f4 0%, #0288d1 100%);
-            color: white;
-            padding: 30px;
-            border-radius: 10px;
-            margin-bottom: 20px;
-        }
-        .stats-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 15px;
-            margin-bottom: 20px;
-        }
-        .stat-card {
-            background: white;
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            text-align: center;
-        }
-        .stat-card h3 {
-            margin: 0 0 10px 0;
-            font-size: 14px;
-            color: #666;
-        }
-        .stat-card .number {
-            font-size: 32px;
-            font-weight: bold;
-            color: #03a9f4;
-        }
-        .section {
-            background: white;
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            margin-bottom: 20px;
-        }
-        .entity-list {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-            gap: 10px;
-        }
-        .entity-card {
-            border: 1px solid #e0e0e0;
-            padding: 15px;
-            border-radius: 5px;
-            background: #fafafa;
-        }
-        .entity-card .id {
-            font-weight: bold;
-            color: #0288d1;
-            margin-bottom: 5px;
-        }
-        .entity-card .state {
-            color: #4caf50;
-            font-weight: bold;
-        }
-        table {
-            width: 100%;
-            border-collapse: collapse;
-        }
-        th, td {
-            padding: 10px;
-            text-align: left;
-            border-bottom: 1px solid #e0e0e0;
-        }
-        th {
-            background-color: #03a9f4;
-            color: white;
-        }
-        .component-tag {
-            display: inline-block;
-            background: #e3f2fd;
-            color: #0288d1;
-            padding: 5px 10px;
-            margin: 5px;
-            border-radius: 15px;
-            font-size: 12px;
-        }
-    </style>
-</head>
-<body>
-""")
-                
-                f.write(f"""
-    <div class="header">
-        <h1>🏠 Home Assistant Überblick</h1>
-        <p>Generiert am: {datetime.now().strftime('%d.%m.%Y um %H:%M:%S')}</p>
-        <p>Version: {report['system_info']['version']} | Standort: {report['system_info']['location_name']}</p>
-    </div>
-    
-    <div class="stats-grid">
-        <div class="stat-card">
-            <h3>Komponenten</h3>
-            <div class="number">{report['statistics']['total_components']}</div>
-        </div>
-        <div class="stat-card">
-            <h3>Entitäten</h3>
-            <div class="number">{report['statistics']['total_entities']}</div>
-        </div>
-        <div class="stat-card">
-            <h3>Services</h3>
-            <div class="number">{report['statistics']['total_services']}</div>
-        </div>
-        <div class="stat-card">
-            <h3>Domains</h3>
-            <div class="number">{report['statistics']['total_domains']}</div>
-        </div>
-        <div class="stat-card">
-            <h3>Events</h3>
-            <div class="number">{report['statistics']['total_events']}</div>
-        </div>
-    </div>
-    
-    <div class="section">
-        <h2>📦 Installierte Komponenten</h2>
-""")
-                
-                for component in sorted(report['components']):
-                    f.write(f'        <span class="component-tag">{component}</span>\n')
-                
-                f.write("""
-    </div>
-    
-    <div class="section">
-        <h2>📊 Entitäten nach Domain</h2>
-        <table>
-            <thead>
-                <tr>
-                    <th>Domain</th>
-                    <th>Anzahl</th>
-                </tr>
-            </thead>
-            <tbody>
-""")
-                
-                for domain, count in sorted(report['entities_by_domain'].items(), key=lambda x: x[1], reverse=True):
-                    f.write(f"""
-                <tr>
-                    <td><strong>{domain}</strong></td>
-                    <td>{count}</td>
-                </tr>
-""")
-                
-                f.write("""
-            </tbody>
-        </table>
-    </div>
-    
-    <div class="section">
-        <h2>🔧 Alle Entitäten</h2>
-""")
-                
-                for domain, entities in sorted(report['detailed_entities'].items()):
-                    f.write(f"""
-        <h3>{domain.upper()} ({len(entities)} Entitäten)</h3>
-        <div class="entity-list">
-""")
-                    for entity in entities:
-                        name = entity['attributes'].get('friendly_name', entity['entity_id'])
-                        f.write(f"""
-            <div class="entity-card">
-                <div class="id">{entity['entity_id']}</div>
-                <div>{name}</div>
-                <div class="state">Zustand: {entity['state']}</div>
-            </div>
-""")
-                    f.write("        </div>\n")
-                
-                f.write("""
-    </div>
-</body>
-</html>
-""")
-            
-            return filename
+        with contextlib.ExitStack() as stack:
+            sinks = []
+            for format in formats:
+                filename = os.path.join(output_dir, f"ha_overview_{timestamp}{FORMAT_SUFFIXES[format]}{suffix}")
+                export_stats = CompressionStats()
+                f = stack.enter_context(open_export(filename, compress, export_stats))
+                sinks.append(make_sink(format, f, max_tokens))
+                exports.append((format, filename, export_stats))
+            write_report(report, sinks)
+        
+        for format, filename, export_stats in exports:
+            self._record_export(report, format, filename, export_stats)
+        return [filename for _, filename, _ in exports]
+    
+    def save_report(self, report, format='json', compress=False, max_tokens=None, output_dir=None):
+        """
+        Speichere den Report in einem Format (siehe save_reports)
+        
+        Returns:
+            Dateiname oder None ohne Report
+        """
+        filenames = self.save_reports(report, (format,), compress, max_tokens, output_dir)
+        return filenames[0] if filenames else None
 
 
-def main():
-    """Hauptfunktion"""
+def print_search_results(report, query, limit=20):
+    """Durchsuche die Entitäten eines Reports und gib die Treffer aus"""
+    index = SearchIndex(get_report_states(report))
+    start = time.perf_counter()
+    results = index.search(query, limit=limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    
     print("\n" + "="*80)
-    print("HOME ASSISTANT OVERVIEW TOOL")
-    print("="*80 + "\n")
+    print(f"SUCHE: {query} ({len(results)} Treffer in {elapsed:.2f} ms)")
+    print("="*80)
+    for hit in results:
+        entity = hit['entity']
+        name = entity.get('attributes', {}).get('friendly_name', '')
+        print(f"{hit['score']:5.1f}  {entity['entity_id']:<45} {name} = {entity['state']}")
+
+
+def print_snapshot_diff(store, instance, report):
+    """Speichere den Report als Snapshot und zeige die Änderungen zum vorherigen"""
+    snapshot_id = store.add(instance, report)
+    previous = [s for s in store.list_snapshots(instance, 2) if s['id'] != snapshot_id]
+    
+    print("\n" + "="*80)
+    print(f"SNAPSHOT #{snapshot_id} GESPEICHERT ({store.path})")
+    print("="*80)
+    if not previous:
+        print("Erster Snapshot dieser Instanz - kein Vergleich möglich.")
+        return
     
-    # Eingaben
-    url = input("Home Assistant URL (z.B. http://homeassistant.local:8123): ").strip()
-    token = input("Long-Lived Access Token: ").strip()
+    diff = store.diff(previous[0]['id'], snapshot_id)
+    print(f"Vergleich mit Snapshot #{previous[0]['id']} vom {diff['from']['created']}:")
+    labels = (
+        ('entities_added', 'Neue Entitäten'),
+        ('entities_removed', 'Entfernte Entitäten'),
+        ('components_added', 'Neue Komponenten'),
+        ('components_removed', 'Entfernte Komponenten'),
+        ('services_added', 'Neue Services'),
+        ('services_removed', 'Entfernte Services'),
+    )
+    for key, label in labels:
+        print(f"{label:.<30} {len(diff[key]):>4}")
+        for name in diff[key][:10]:
+            print(f"  + {name}" if key.endswith('added') else f"  - {name}")
+    print(f"{'Zustandsänderungen':.<30} {len(diff['state_changes']):>4}")
+    for change in diff['state_changes'][:10]:
+        print(f"  ~ {change['entity_id']}: {change['old_state']} → {change['new_state']}")
+    print(f"{'Attributänderungen':.<30} {len(diff['attribute_changes']):>4}")
+
+
+def parse_formats(value):
+    """Kommagetrennte Export-Formate prüfen (Reihenfolge bleibt erhalten)"""
+    formats = []
+    for format in value.split(',') if isinstance(value, str) else value:
+        format = format.strip().lower()
+        if not format:
+            continue
+        if format not in SINKS:
+            raise ValueError(f"Unbekanntes Format {format} (möglich: {', '.join(SINKS)})")
+        if format not in formats:
+            formats.append(format)
+    if not formats:
+        raise ValueError("Mindestens ein Format angeben")
+    return formats
+
+
+def main(argv=None):
+    """
+    Hauptfunktion
     
-    # Erstelle Overview-Objekt
-    ha = HomeAssistantOverview(url, token)
+    Ohne Terminal (z.B. per cron) werden URL und Token nur aus Argumenten bzw.
+    HA_URL/HA_TOKEN gelesen; es gibt keine Rückfragen.
     
-    # Generiere Report
-    report = ha.generate_report()
+    Returns:
+        Exit-Code (0 = Erfolg, 1 = Report konnte nicht erstellt werden)
+    """
+    parser = argparse.ArgumentParser(description="Home Assistant Overview Tool")
+    connection = parser.add_argument_group(
+        "Verbindung", "Fehlen URL oder Token, wird nur in einem Terminal nachgefragt")
+    connection.add_argument('--url', default=os.environ.get('HA_URL'),
+                            help="Home Assistant URL, z.B. http://homeassistant.local:8123 (Standard: HA_URL)")
+    connection.add_argument('--token', default=os.environ.get('HA_TOKEN'),
+                            help="Long-Lived Access Token (Standard: HA_TOKEN; die Variable ist "
+                                 "sicherer, da Argumente in der Prozessliste sichtbar sind)")
+    parser.add_argument('--output-dir', metavar='VERZEICHNIS',
+                        default=os.environ.get('HA_OUTPUT_DIR', DEFAULT_OUTPUT_DIR),
+                        help=f"Zielverzeichnis der Berichte (Standard: HA_OUTPUT_DIR oder {DEFAULT_OUTPUT_DIR})")
+    parser.add_argument('--formats', metavar='FORMATE',
+                        default=os.environ.get('HA_FORMATS', ','.join(DEFAULT_FORMATS)),
+                        help=f"Kommagetrennte Formate aus {', '.join(SINKS)}; alle werden in einem "
+                             f"Durchlauf geschrieben (Standard: HA_FORMATS oder {','.join(DEFAULT_FORMATS)})")
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="Keine Ausgabe außer Fehlern (z.B. für cron)")
+    parser.add_argument('--search', metavar='SUCHTEXT',
+                        help="Entitäten durchsuchen (Präfix- und Tippfehler-Suche) statt Berichte zu speichern")
+    parser.add_argument('--limit', type=int, default=20,
+                        help="Maximale Anzahl Suchtreffer (Standard: 20)")
+    parser.add_argument('--snapshot', action='store_true',
+                        help="Report als Snapshot speichern und mit dem vorherigen vergleichen")
+    parser.add_argument('--snapshot-db', default=DEFAULT_SNAPSHOT_PATH,
+                        help=f"Pfad der Snapshot-Datenbank (Standard: {DEFAULT_SNAPSHOT_PATH})")
+    parser.add_argument('--gzip', action='store_true',
+                        help="Berichte gzip-komprimiert speichern (.gz)")
+    parser.add_argument('--claude', action='store_true',
+                        help="Zusätzlich einen für Claude optimierten Markdown-Export speichern")
+    parser.add_argument('--max-tokens', type=int, metavar='N',
+                        help="Claude-Export in Teile mit höchstens ca. N Tokens aufteilen")
+    parser.add_argument('--sections', metavar='ABSCHNITTE',
+                        help="Nur diese Abschnitte erstellen und abfragen, kommagetrennt aus: "
+                             f"{', '.join(REPORT_SECTIONS)} (Standard: alle)")
+    filters = parser.add_argument_group(
+        "Entitäten filtern",
+        "Regeln werden beim Einlesen angewendet; jede Option ist mehrfach möglich")
+    filters.add_argument('--include-domain', dest='include_domains', action='append', metavar='DOMAIN',
+                         help="Nur Entitäten dieser Domains")
+    filters.add_argument('--exclude-domain', dest='exclude_domains', action='append', metavar='DOMAIN',
+                         help="Entitäten dieser Domains auslassen")
+    filters.add_argument('--include', dest='include_entities', action='append', metavar='MUSTER',
+                         help="Nur passende entity_id (glob, z.B. 'sensor.*_temperatur', oder 're:REGEX')")
+    filters.add_argument('--exclude', dest='exclude_entities', action='append', metavar='MUSTER',
+                         help="Passende entity_id auslassen (glob oder 're:REGEX')")
+    filters.add_argument('--include-attr', dest='include_attributes', action='append', metavar='BEDINGUNG',
+                         help="Nur Entitäten mit diesem Attribut (name, !name, name=wert, name!=wert, name~regex)")
+    filters.add_argument('--exclude-attr', dest='exclude_attributes', action='append', metavar='BEDINGUNG',
+                         help="Entitäten mit diesem Attribut auslassen")
+    args = parser.parse_args(argv)
+    try:
+        sections = parse_sections(args.sections)
+        entity_filter = parse_filter({key: getattr(args, key) for key in FILTER_KEYS})
+        formats = parse_formats(args.formats)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.search and 'entities' not in sections:
+        parser.error("--search benötigt den Abschnitt entities")
+    if (args.claude or args.max_tokens) and 'claude' not in formats:
+        formats.append('claude')
+    if not (args.url and args.token) and not sys.stdin.isatty():
+        parser.error("Ohne Terminal werden --url und --token (bzw. HA_URL und HA_TOKEN) benötigt")
     
-    if report:
-        # Zeige Zusammenfassung
-        ha.print_summary(report)
-        
-        # Speichere in allen Formaten
+    if not args.quiet:
         print("\n" + "="*80)
-        print("SPEICHERE BERICHTE...")
-        print("="*80)
-        
-        json_file = ha.save_report(report, 'json')
-        txt_file = ha.save_report(report, 'txt')
-        html_file = ha.save_report(report, 'html')
+        print("HOME ASSISTANT OVERVIEW TOOL")
+        print("="*80 + "\n")
+    
+    # Eingaben (nur, wenn weder Argument noch Umgebungsvariable gesetzt ist)
+    url = args.url or input("Home Assistant URL (z.B. http://homeassistant.local:8123): ").strip()
+    token = args.token or input("Long-Lived Access Token: ").strip()
+    
+    # Mit --quiet wird die Ausgabe nur bei Fehlern (auf stderr) gezeigt
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output) if args.quiet else contextlib.nullcontext():
+        # Erstelle Overview-Objekt
+        ha = HomeAssistantOverview(url, token, entity_filter=entity_filter)
         
-        print(f"\n✓ JSON-Bericht:  {json_file}")
-        print(f"✓ Text-Bericht:  {txt_file}")
-        print(f"✓ HTML-Bericht:  {html_file}")
+        # Generiere Report (nur die nötigen Endpunkte, parallel abgefragt)
+        report = ha.generate_report(concurrent=True, sections=sections)
         
-        print("\n" + "="*80)
-        print("FERTIG!")
-        print("="*80 + "\n")
+        if report and args.search:
+            print_search_results(report, args.search, args.limit)
+        elif report:
+            # Zeige Zusammenfassung
+            ha.print_summary(report)
+            
+            if args.snapshot and is_complete(report) and entity_filter is None:
+                print_snapshot_diff(SnapshotStore(args.snapshot_db), url, report)
+            elif args.snapshot:
+                print("\n⚠ Snapshots werden nur für vollständige, ungefilterte Reports gespeichert")
+            
+            # Teil-Reports nur als JSON bzw. Claude-Export
+            if not is_complete(report):
+                skipped = [format for format in formats if format not in PARTIAL_FORMATS]
+                if skipped:
+                    print(f"\n⚠ {', '.join(skipped)} nur für vollständige Reports - nicht gespeichert")
+                formats = [format for format in formats if format in PARTIAL_FORMATS]
+            
+            # Speichere alle Formate in einem Durchlauf
+            print("\n" + "="*80)
+            print("SPEICHERE BERICHTE...")
+            print("="*80)
+            
+            try:
+                ha.save_reports(report, formats, compress=args.gzip, max_tokens=args.max_tokens,
+                                output_dir=args.output_dir)
+            except OSError as e:
+                print(f"✗ Berichte konnten nicht gespeichert werden: {e}", file=sys.stderr)
+                return 1
+            
+            print()
+            labels = {'json': 'JSON-Bericht:', 'txt': 'Text-Bericht:', 'html': 'HTML-Bericht:',
+                      'claude': 'Claude-Export:'}
+            for export in report.get('exports', []):
+                size = f"{export['bytes']:,} Bytes"
+                if 'compressed_bytes' in export:
+                    size += f" → {export['compressed_bytes']:,} Bytes komprimiert"
+                print(f"✓ {labels[export['format']]:<14} {export['file']} ({size})")
+            
+            print("\n" + "="*80)
+            print("FERTIG!")
+            print("="*80 + "\n")
+    
+    if not report:
+        if args.quiet:
+            sys.stderr.write(output.getvalue())
+        return 1
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Hintergrund-Jobs für die Web-Anwendung
+Langlaufende Arbeiten (z.B. Report-Generierung) laufen in einem begrenzten
+Thread-Pool; der Client fragt Fortschritt und Ergebnis über die Job-ID ab
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Gleichzeitig laufende Jobs
+DEFAULT_MAX_WORKERS = 2
+
+# Maximale Anzahl wartender und laufender Jobs
+DEFAULT_MAX_PENDING = 50
+
+# Abgeschlossene Jobs werden nach so vielen Sekunden verworfen
+DEFAULT_TTL = 600
+
+# Abstand der Aufräumläufe in Sekunden
+DEFAULT_CLEANUP_INTERVAL = 60
+
+# Zustände eines Jobs
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobQueueFull(RuntimeError):
+    """Es warten bereits zu viele Jobs"""
+
+
+class Job:
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.phase = None
+        self.message = None
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created = datetime.now().isoformat()
+        self.finished = None
+        self._finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def completed(self):
+        return self.status in (DONE, FAILED)
+
+    def update(self, phase=None, message=None, progress=None):
+        """
+        Aktualisiere den Fortschritt (aus dem Job-Thread)
+
+        Args:
+            phase: Kurzname der aktuellen Phase (z.B. 'fetching')
+            message: Lesbare Beschreibung für die Anzeige
+            progress: Fortschritt zwischen 0 und 1 (wird nie kleiner)
+        """
+        with self._lock:
+            if phase is not None:
+                self.phase = phase
+            if message is not None:
+                self.message = message
+            if progress is not None:
+                self.progress = max(self.progress, min(float(progress), 1.0))
+
+    def _finish(self, status, result=None, error=None):
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.error = error
+            if status == DONE:
+                self.progress = 1.0
+            self.finished = datetime.now().isoformat()
+            self._finished_at = time.monotonic()
+
+    def to_dict(self, include_result=False):
+        """Zustand als Dict (das Ergebnis nur auf Wunsch und nur bei Erfolg)"""
+        with self._lock:
+            data = {
+                'job_id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'phase': self.phase,
+                'message': self.message,
+                'progress': round(self.progress, 3),
+                'created': self.created,
+                'finished': self.finished
+            }
+            if self.error is not None:
+                data['error'] = self.error
+            if include_result and self.status == DONE:
+                data['result'] = self.result
+            return data
+
+
+class JobManager:
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, ttl=DEFAULT_TTL,
+                 cleanup_interval=DEFAULT_CLEANUP_INTERVAL, max_pending=DEFAULT_MAX_PENDING):
+        """
+        Initialisiere den Job-Manager
+
+        Args:
+            max_workers: Gleichzeitig laufende Jobs; weitere warten in der Schlange
+            ttl: Sekunden nach Abschluss, nach denen ein Job verworfen wird
+            cleanup_interval: Abstand der Aufräumläufe in Sekunden
+            max_pending: Obergrenze wartender und laufender Jobs
+        """
+        self.ttl = ttl
+        self.max_pending = max(1, int(max_pending))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)),
+                                            thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._cleaner = threading.Thread(target=self._cleanup_loop, args=(cleanup_interval,),
+                                         name='job-cleanup', daemon=True)
+        self._cleaner.start()
+
+    def submit(self, kind, func, *args, **kwargs):
+        """
+        Starte einen Job
+
+        Args:
+            kind: Art des Jobs (z.B. 'report')
+            func: Funktion func(job, *args, **kwargs); ihr Rückgabewert wird
+                  das Ergebnis, eine Ausnahme lässt den Job fehlschlagen
+
+        Returns:
+            Der neue Job
+
+        Raises:
+            JobQueueFull: Wenn bereits max_pending Jobs warten oder laufen
+        """
+        job = Job(kind)
+        with self._lock:
+            pending = sum(1 for existing in self._jobs.values() if not existing.completed)
+            if pending >= self.max_pending:
+                raise JobQueueFull("Zu viele laufende Jobs, bitte später erneut versuchen")
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        with job._lock:
+            job.status = RUNNING
+        try:
+            result = func(job, *args, **kwargs)
+        except Exception as e:
+            job._finish(FAILED, error=str(e) or type(e).__name__)
+        else:
+            job._finish(DONE, result=result)
+
+    def get(self, job_id):
+        """Hole einen Job (None, wenn unbekannt oder abgelaufen)"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def expire(self):
+        """Verwerfe abgeschlossene Jobs, deren Lebensdauer abgelaufen ist"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job._finished_at is not None and now - job._finished_at > self.ttl]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def _cleanup_loop(self, interval):
+        while not self._stop.wait(interval):
+            self.expire()
+
+    def shutdown(self, wait=False):
+        self._stop.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._jobs)
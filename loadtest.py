@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Lasttest: synchrone vs. asynchrone Report-Generierung
+Startet einen simulierten Home Assistant (fake_ha) und erzeugt viele Reports
+gleichzeitig - einmal über Worker-Threads mit dem synchronen Client (wie die
+Flask-Anwendung), einmal über eine Event-Loop mit dem asynchronen Client (wie
+async_app). Beide Modi laufen mit derselben Anzahl gleichzeitiger Reports.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_ha import FakeHomeAssistant, DEFAULT_TOKEN
+from ha_async import AsyncHomeAssistantOverview, create_session
+from ha_overview import HomeAssistantOverview
+from session_pool import SessionPool
+
+
+def run_sync(url, reports, concurrency, connections):
+    """Erzeuge reports Reports über concurrency blockierende Threads; gibt Latenzen zurück"""
+    session = SessionPool(max_connections=connections).get(url)
+
+    def one_report():
+        start = time.perf_counter()
+        ha = HomeAssistantOverview(url, DEFAULT_TOKEN, session=session)
+        if not ha.generate_report(concurrent=True, compact=True):
+            raise RuntimeError("Report-Generierung fehlgeschlagen")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(lambda _: one_report(), range(reports)))
+
+
+async def run_async(url, reports, concurrency, connections):
+    """Erzeuge reports Reports mit höchstens concurrency gleichzeitigen Anfragen auf einer Event-Loop"""
+    limit = asyncio.Semaphore(concurrency)
+    async with create_session(connections) as session:
+        async def one_report():
+            async with limit:
+                start = time.perf_counter()
+                ha = AsyncHomeAssistantOverview(url, DEFAULT_TOKEN, session)
+                if not await ha.generate_report_async(compact=True):
+                    raise RuntimeError("Report-Generierung fehlgeschlagen")
+                return time.perf_counter() - start
+
+        return await asyncio.gather(*(one_report() for _ in range(reports)))
+
+
+def summarize(label, latencies, elapsed):
+    """Eine Ergebniszeile: Durchsatz und Latenzen"""
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{label:<28} {len(ordered):>7} {elapsed:>8.2f}s {len(ordered) / elapsed:>10.1f} "
+          f"{statistics.median(ordered) * 1000:>9.0f}ms {p95 * 1000:>9.0f}ms")
+    return len(ordered) / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lasttest synchron vs. asynchron")
+    parser.add_argument('--entities', type=int, default=500,
+                        help="Entitäten des simulierten Servers (Standard: 500)")
+    parser.add_argument('--delay', type=float, default=0.05,
+                        help="Antwortzeit pro Anfrage in Sekunden (Standard: 0.05)")
+    parser.add_argument('--reports', type=int, default=200,
+                        help="Anzahl zu erzeugender Reports je Modus (Standard: 200)")
+    parser.add_argument('--concurrency', type=int, default=50,
+                        help="Gleichzeitige Reports in beiden Modi: Threads synchron, "
+                             "Anfragen auf der Event-Loop asynchron (Standard: 50)")
+    parser.add_argument('--connections', type=int, default=50,
+                        help="Verbindungen pro Instanz in beiden Modi (Standard: 50)")
+    args = parser.parse_args(argv)
+
+    with FakeHomeAssistant(entities=args.entities, delay=args.delay) as fake:
+        print(f"Simulierter Home Assistant: {fake.url} ({args.entities:,} Entitäten, "
+              f"{args.delay * 1000:.0f}ms pro Anfrage)\n")
+        print(f"{'Modus':<28} {'Reports':>7} {'Dauer':>9} {'Reports/s':>10} {'Median':>11} {'p95':>11}")
+        print("-"*80)
+
+        # Konsolenausgaben der Report-Generierung unterdrücken
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            sync_latencies = run_sync(fake.url, args.reports, args.concurrency, args.connections)
+            sync_elapsed = time.perf_counter() - start
+        sync_rate = summarize(f"synchron ({args.concurrency} Threads)", sync_latencies, sync_elapsed)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            async_latencies = asyncio.run(
+                run_async(fake.url, args.reports, args.concurrency, args.connections)
+            )
+            async_elapsed = time.perf_counter() - start
+        async_rate = summarize(f"asynchron ({args.concurrency} gleichzeitig)", async_latencies, async_elapsed)
+
+        print("-"*80)
+        print(f"Durchsatz asynchron: {async_rate / sync_rate:.1f}x "
+              f"({fake.requests:,} Anfragen an den simulierten Server)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Laufzeit-Metriken im Prometheus-Textformat
+Zähler und Histogramme mit Labels, threadsicher und ohne zusätzliche
+Abhängigkeiten; render() liefert den Inhalt für einen /metrics-Endpunkt
+"""
+
+import bisect
+import contextlib
+import threading
+import time
+
+# Content-Type des Prometheus-Textformats
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Standard-Grenzen der Histogramm-Buckets in Sekunden
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name}: Labels {sorted(labels)} statt {sorted(self.labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Erhöhe den Zähler (nur positive Werte)"""
+        if amount < 0:
+            raise ValueError("Zähler können nur steigen")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self, items):
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """Erfasse einen Messwert (z.B. eine Dauer in Sekunden)"""
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            position = bisect.bisect_left(self.buckets, value)
+            if position < len(self.buckets):
+                entry['counts'][position] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Miss die Dauer des with-Blocks"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_samples(self, items):
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry['counts']):
+                cumulative += count
+                labels = _format_labels(self.labels, key, [('le', _format_value(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, key, [('le', '+Inf')])
+            yield f"{self.name}_bucket{labels} {entry['count']}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(entry['sum'])}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {entry['count']}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metrik {metric.name} ist bereits registriert")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        """Registriere einen Zähler"""
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        """Registriere ein Histogramm"""
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        """Alle Metriken im Prometheus-Textformat"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
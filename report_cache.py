@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Report-Cache für die Web-Anwendung
+Hält generierte Reports im Prozess, damit Downloads nicht alles erneut abfragen.
+Mit einem gemeinsamen Cache (shared_cache) übernehmen andere Worker-Prozesse
+die Reports und fertig gerenderten Exporte, statt selbst abzufragen.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Maximale Anzahl gecachter Reports (älteste werden zuerst verdrängt)
+DEFAULT_MAX_ENTRIES = 16
+
+# Lebensdauer eines Reports im Cache in Sekunden
+DEFAULT_TTL = 300
+
+# Exporte bis zu dieser Größe (Bytes) werden im gemeinsamen Cache abgelegt
+MAX_SHARED_EXPORT_SIZE = 64 * 1024 * 1024
+
+# Größe der Blöcke, in denen ein Export aus dem gemeinsamen Cache gestreamt wird
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def token_fingerprint(token):
+    """Kurzer, nicht umkehrbarer Fingerabdruck des Tokens"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+
+
+def cache_key(url, token):
+    """Cache-Schlüssel aus Instanz-URL und Token-Fingerabdruck"""
+    return (url.rstrip('/'), token_fingerprint(token))
+
+
+def export_key(format, sections, **options):
+    """Schlüssel eines gerenderten Exports (Format, Abschnitte und Optionen)"""
+    details = ','.join(f"{name}={options[name]}" for name in sorted(options))
+    return f"{format}:{','.join(sections)}:{details}"
+
+
+class ReportCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, shared=None):
+        """
+        Initialisiere den Cache
+
+        Args:
+            max_entries: Obergrenze der Einträge, darüber wird LRU verdrängt
+            ttl: Sekunden, nach denen ein Report als veraltet gilt
+            shared: Optionaler SharedCache; Reports und Exporte werden
+                    zusätzlich dort abgelegt und bei einem Fehlschlag im
+                    Prozess von dort übernommen (Indizes bleiben im Prozess)
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def _shared_call(self, method, *args, **kwargs):
+        """Rufe den gemeinsamen Cache auf; Fehler dort machen ihn nur wirkungslos"""
+        try:
+            return getattr(self.shared, method)(*args, **kwargs)
+        except sqlite3.Error as e:
+            print(f"⚠ Gemeinsamer Cache nicht verfügbar: {e}")
+            return None
+
+    @staticmethod
+    def _shared_key(key):
+        return '|'.join(key)
+
+    def _expired(self, entry, now):
+        return now - entry['created'] > self.ttl
+
+    def _remove(self, key):
+        """Entferne einen Eintrag (Lock wird gehalten)"""
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._ids.pop(entry['report_id'], None)
+
+    def put(self, url, token, report, indexes=None):
+        """
+        Lege einen Report ab und gib seine Report-ID zurück
+
+        Pro Instanz und Token wird nur der neueste Report gehalten.
+
+        Args:
+            indexes: Optionale, einmal pro Report aufgebaute Indizes (Name -> Objekt)
+        """
+        key = cache_key(url, token)
+        report_id = uuid.uuid4().hex
+        with self._lock:
+            self._store(key, report_id, report, indexes, time.monotonic())
+        if self.shared is not None:
+            self._shared_call('put', 'report', self._shared_key(key),
+                              {'report_id': report_id, 'report': report}, ttl=self.ttl)
+        return report_id
+
+    def _store(self, key, report_id, report, indexes, created):
+        """Lege einen Eintrag ab (Lock wird gehalten)"""
+        self._remove(key)
+        self._entries[key] = {
+            'report_id': report_id,
+            'report': report,
+            'indexes': indexes or {},
+            'created': created
+        }
+        self._ids[report_id] = key
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _load_shared(self, url, token, report_id):
+        """Übernimm einen Report, den ein anderer Worker abgelegt hat (oder None)"""
+        key = cache_key(url, token)
+        found = self._shared_call('get', 'report', self._shared_key(key))
+        if found is None:
+            return None
+        value, remaining = found
+        if report_id is not None and value['report_id'] != report_id:
+            return None
+        # Restliche Lebensdauer wie im anderen Worker
+        created = time.monotonic() - (self.ttl - remaining)
+        with self._lock:
+            self._store(key, value['report_id'], value['report'], None, created)
+        return value['report_id'], value['report']
+
+    def _lookup(self, url, token, report_id):
+        """Finde einen gültigen Eintrag (Lock wird gehalten)"""
+        key = cache_key(url, token)
+        if report_id is not None and self._ids.get(report_id) != key:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry, time.monotonic()):
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, url, token, report_id=None):
+        """
+        Hole einen gültigen Report
+
+        Args:
+            url: Home Assistant URL
+            token: Token, mit dem der Report erzeugt wurde
+            report_id: Optionale Report-ID; ohne ID wird der neueste Report
+                       dieser Instanz geliefert
+
+        Returns:
+            Tupel (report_id, report) oder None, wenn nichts Gültiges vorliegt.
+            Eine Report-ID passt nur zusammen mit der URL und dem Token,
+            mit denen der Report erzeugt wurde.
+        """
+        with self._lock:
+            entry = self._lookup(url, token, report_id)
+            if entry is not None:
+                return entry['report_id'], entry['report']
+        if self.shared is None:
+            return None
+        return self._load_shared(url, token, report_id)
+
+    def get_index(self, url, token, name, report_id=None):
+        """Hole einen zum Report abgelegten Index (oder None)"""
+        with self._lock:
+            entry = self._lookup(url, token, report_id)
+            if entry is None:
+                return None
+            return entry['indexes'].get(name)
+
+    def set_index(self, url, token, name, index, report_id=None):
+        """Lege einen nachträglich aufgebauten Index zum Report ab (z.B. nach Übernahme aus shared)"""
+        if report_id is None:
+            return
+        with self._lock:
+            entry = self._lookup(url, token, report_id)
+            if entry is not None:
+                entry['indexes'][name] = index
+
+    def iter_export(self, report_id, key, render):
+        """
+        Byte-Blöcke eines Exports, aus dem gemeinsamen Cache oder neu gerendert
+
+        Ein neu gerenderter Export wird beim Streamen mitgeschrieben und danach
+        für alle Worker abgelegt (bis MAX_SHARED_EXPORT_SIZE).
+
+        Args:
+            report_id: Report-ID (None für Teil- und gefilterte Reports: kein Cache)
+            key: Schlüssel des Exports (siehe export_key)
+            render: Funktion ohne Argumente, die die Byte-Blöcke liefert
+        """
+        if self.shared is None or report_id is None:
+            yield from render()
+            return
+        shared_key = f"{report_id}:{key}"
+        found = self._shared_call('get', 'export', shared_key)
+        if found is not None:
+            data = found[0]
+            for start in range(0, len(data), EXPORT_CHUNK_SIZE):
+                yield data[start:start + EXPORT_CHUNK_SIZE]
+            return
+        parts = []
+        size = 0
+        for chunk in render():
+            if parts is not None:
+                parts.append(chunk)
+                size += len(chunk)
+                if size > MAX_SHARED_EXPORT_SIZE:
+                    parts = None
+            yield chunk
+        if parts is not None:
+            self._shared_call('put', 'export', shared_key, b''.join(parts), ttl=self.ttl)
+
+    def invalidate(self, url, token):
+        """Verwerfe den Report einer Instanz (auch im gemeinsamen Cache)"""
+        key = cache_key(url, token)
+        with self._lock:
+            self._remove(key)
+        if self.shared is not None:
+            self._shared_call('delete', 'report', self._shared_key(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._ids.clear()
+        if self.shared is not None:
+            self._shared_call('clear', 'report')
+            self._shared_call('clear', 'export')
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
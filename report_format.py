@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Report-Formate
+Hilfsfunktionen, mit denen Renderer und Speicher sowohl das volle als auch das
+kompakte Report-Format lesen können
+"""
+
+
+# Kennzeichnung des kompakten Report-Formats (report['format'])
+COMPACT_FORMAT = 'compact'
+
+# Abschnitte eines Reports (in dieser Reihenfolge) mit ihren Schlüsseln im
+# vollen und im kompakten Format; report['sections'] nennt die enthaltenen
+REPORT_SECTIONS = {
+    'system_info': (('system_info',), ('system_info',)),
+    'statistics': (('statistics',), ('statistics',)),
+    'components': (('components',), ('components',)),
+    'entities_by_domain': (('entities_by_domain',), ('entities_by_domain',)),
+    'entities': (('detailed_entities', 'all_states'), ('domain_index', 'entities')),
+    'services': (('services',), ('services',)),
+    'events': (('events',), ('events',)),
+}
+
+
+def parse_sections(sections):
+    """
+    Prüfe eine Auswahl von Abschnitten
+
+    Args:
+        sections: None (alle), kommagetrennter Text oder Liste von Namen
+                  aus REPORT_SECTIONS
+
+    Returns:
+        Tupel der Abschnitte in der Reihenfolge von REPORT_SECTIONS
+
+    Raises:
+        ValueError: Bei unbekannten Abschnitten oder leerer Auswahl
+    """
+    if sections is None:
+        return tuple(REPORT_SECTIONS)
+    if isinstance(sections, str):
+        sections = sections.split(',')
+    names = {str(name).strip() for name in sections} - {''}
+    unknown = sorted(names - set(REPORT_SECTIONS))
+    if unknown:
+        raise ValueError(f"Unbekannte Abschnitte: {', '.join(unknown)} "
+                         f"(möglich: {', '.join(REPORT_SECTIONS)})")
+    if not names:
+        raise ValueError("Mindestens ein Abschnitt ist erforderlich")
+    return tuple(name for name in REPORT_SECTIONS if name in names)
+
+
+def get_report_sections(report):
+    """Abschnitte eines Reports (Reports ohne 'sections' sind vollständig)"""
+    return tuple(report.get('sections', REPORT_SECTIONS))
+
+
+def is_complete(report):
+    """Prüfe, ob ein Report alle Abschnitte enthält"""
+    return len(get_report_sections(report)) == len(REPORT_SECTIONS)
+
+
+def select_sections(report, sections):
+    """
+    Teil-Report mit den gewählten Abschnitten (z.B. aus einem zwischengespeicherten Report)
+
+    Args:
+        sections: Abschnitte (siehe parse_sections); fehlende Abschnitte des
+                  Reports werden ignoriert
+    """
+    present = get_report_sections(report)
+    selected = [name for name in parse_sections(sections) if name in present]
+    if len(selected) == len(present):
+        return report
+    dropped = {key for name in present if name not in selected
+               for key in REPORT_SECTIONS[name][1 if is_compact(report) else 0]}
+    partial = {key: value for key, value in report.items() if key not in dropped}
+    partial['sections'] = selected
+    return partial
+
+
+def is_compact(report):
+    """Prüfe, ob ein Report im kompakten Format vorliegt"""
+    return report.get('format') == COMPACT_FORMAT
+
+
+def get_report_states(report):
+    """Liefere die Liste aller Entitäten (volles und kompaktes Format)"""
+    if is_compact(report):
+        return report.get('entities', [])
+    return report.get('all_states', [])
+
+
+def iter_domain_entities(report):
+    """Liefere (domain, entities) sortiert nach Domain (volles und kompaktes Format)"""
+    if is_compact(report):
+        entities = report.get('entities', [])
+        for domain, indices in sorted(report.get('domain_index', {}).items()):
+            yield domain, [entities[i] for i in indices]
+    else:
+        yield from sorted(report.get('detailed_entities', {}).items())
+
+
+def to_compact_report(report):
+    """
+    Wandle einen Report in das kompakte Format um
+
+    Im kompakten Format steht jede Entität genau einmal unter 'entities';
+    'domain_index' enthält pro Domain die Positionen in dieser Liste.
+    """
+    if is_compact(report):
+        return report
+    if 'entities' not in get_report_sections(report):
+        compact = dict(report)
+        compact['format'] = COMPACT_FORMAT
+        return compact
+    states = report.get('all_states', [])
+    position = {entity['entity_id']: i for i, entity in enumerate(states)}
+    compact = {key: value for key, value in report.items()
+               if key not in ('detailed_entities', 'all_states')}
+    compact['format'] = COMPACT_FORMAT
+    compact['domain_index'] = {
+        domain: [position[entity['entity_id']] for entity in entities]
+        for domain, entities in sorted(report.get('detailed_entities', {}).items())
+    }
+    compact['entities'] = states
+    return compact
+
+
+def to_full_report(report):
+    """Wandle einen kompakten Report in das volle Format (detailed_entities/all_states) um"""
+    if not is_compact(report):
+        return report
+    sections = get_report_sections(report)
+    full = {key: value for key, value in report.items()
+            if key not in ('format', 'domain_index', 'entities', 'services', 'events')}
+    if 'entities' in sections:
+        full['detailed_entities'] = dict(iter_domain_entities(report))
+    for name in ('services', 'events'):
+        if name in sections:
+            full[name] = report.get(name, [])
+    if 'entities' in sections:
+        full['all_states'] = report.get('entities', [])
+    return full
@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+"""
+Ein Durchlauf, mehrere Export-Formate
+write_report geht den Report genau einmal durch (Kopf, Entitäten je Domain,
+Abschluss) und reicht jeden Teil an alle angeforderten Formate weiter. Jedes
+Format schreibt sofort in seine Datei; kein Export liegt komplett im Speicher.
+iter_report_bundle verpackt alle Formate auf diese Weise in ein zip-Archiv,
+das beim Aufbau gestreamt wird.
+"""
+
+import io
+import json
+import tempfile
+import zipfile
+from datetime import datetime
+
+from entity_model import json_default
+from exporters import (
+    CLAUDE_ENTITIES_HEADING, STREAM_CHUNK_SIZE, _claude_closing_sections, _claude_domain_section,
+    _claude_domain_table, _claude_footer, _claude_header, iter_claude_chunks, join_claude_chunks
+)
+from report_format import iter_domain_entities
+
+# Einrückung des JSON-Exports
+JSON_INDENT = 2
+
+# Dateiendung je Format (an ha_overview_<Zeitstempel> angehängt)
+FORMAT_SUFFIXES = {
+    'json': '.json',
+    'txt': '.txt',
+    'html': '.html',
+    'claude': '_claude.md',
+}
+
+# Formate im zip-Paket (Reihenfolge im Archiv; das erste wird direkt ins Archiv geschrieben)
+BUNDLE_FORMATS = ('json', 'txt', 'html', 'claude')
+
+# Die übrigen Dateien eines zip-Pakets werden bis zu dieser Größe (Zeichen) im
+# Speicher gepuffert, darüber in einer temporären Datei
+BUNDLE_SPOOL_SIZE = 8 * 1024 * 1024
+
+# Kopf der HTML-Datei (Stylesheet)
+HTML_HEAD = """<!DOCTYPE html>
+<html lang="de">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Home Assistant Überblick</title>
+    <style>
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            max-width: 1200px;
+            margin: 0 auto;
+            padding: 20px;
+            background-color: #f5f5f5;
+        }
+        h1, h2, h3 {
+            color: #03a9f4;
+        }
+        .header {
+            background: linear-gradient(135deg, #03a9f4 0%, #0288d1 100%);
+            color: white;
+            padding: 30px;
+            border-radius: 10px;
+            margin-bottom: 20px;
+        }
+        .stats-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+            gap: 15px;
+            margin-bottom: 20px;
+        }
+        .stat-card {
+            background: white;
+            padding: 20px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+            text-align: center;
+        }
+        .stat-card h3 {
+            margin: 0 0 10px 0;
+            font-size: 14px;
+            color: #666;
+        }
+        .stat-card .number {
+            font-size: 32px;
+            font-weight: bold;
+            color: #03a9f4;
+        }
+        .section {
+            background: white;
+            padding: 20px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+            margin-bottom: 20px;
+        }
+        .entity-list {
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
+            gap: 10px;
+        }
+        .entity-card {
+            border: 1px solid #e0e0e0;
+            padding: 15px;
+            border-radius: 5px;
+            background: #fafafa;
+        }
+        .entity-card .id {
+            font-weight: bold;
+            color: #0288d1;
+            margin-bottom: 5px;
+        }
+        .entity-card .state {
+            color: #4caf50;
+            font-weight: bold;
+        }
+        table {
+            width: 100%;
+            border-collapse: collapse;
+        }
+        th, td {
+            padding: 10px;
+            text-align: left;
+            border-bottom: 1px solid #e0e0e0;
+        }
+        th {
+            background-color: #03a9f4;
+            color: white;
+        }
+        .component-tag {
+            display: inline-block;
+            background: #e3f2fd;
+            color: #0288d1;
+            padding: 5px 10px;
+            margin: 5px;
+            border-radius: 15px;
+            font-size: 12px;
+        }
+    </style>
+</head>
+<body>
+"""
+
+
+class ReportSink:
+    """
+    Ziel eines Formats in write_report
+
+    write_report ruft begin(report) einmal auf, dann domain(domain, entities)
+    für jede Domain (sortiert) und zum Schluss end(report).
+    """
+
+    def __init__(self, f):
+        """
+        Args:
+            f: Geöffnete Text-Datei (z.B. aus exporters.open_export)
+        """
+        self.f = f
+
+    def begin(self, report):
+        pass
+
+    def domain(self, domain, entities):
+        pass
+
+    def end(self, report):
+        pass
+
+
+class JsonSink(ReportSink):
+    """
+    JSON-Export (wie json.dump mit indent=2)
+
+    Die Entitäten unter 'detailed_entities' (volles Format) werden Domain für
+    Domain geschrieben, alle übrigen Schlüssel in der Reihenfolge des Reports.
+    """
+
+    def __init__(self, f, indent=JSON_INDENT):
+        super().__init__(f)
+        self.indent = indent
+        self.encoder = json.JSONEncoder(indent=indent, ensure_ascii=False, default=json_default)
+
+    def _encode(self, value, level):
+        """Wert als JSON-Stücke, eingerückt für die Verschachtelungstiefe level"""
+        newline = "\n" + " " * (self.indent * level)
+        for piece in self.encoder.iterencode(value):
+            yield piece.replace("\n", newline)
+
+    def _key(self, key, level, first):
+        self.f.write(("" if first else ",") + "\n" + " " * (self.indent * level)
+                     + self.encoder.encode(key) + ": ")
+
+    def _item(self, key, value):
+        self._key(key, 1, not self._items)
+        self._items += 1
+        for piece in self._encode(value, 1):
+            self.f.write(piece)
+
+    def begin(self, report):
+        self._keys = list(report)
+        self._items = 0
+        self._domains = 0
+        self._streamed = isinstance(report.get('detailed_entities'), dict)
+        split = self._keys.index('detailed_entities') if self._streamed else len(self._keys)
+        self.f.write("{")
+        for key in self._keys[:split]:
+            self._item(key, report[key])
+        if self._streamed:
+            self._key('detailed_entities', 1, not self._items)
+            self._items += 1
+            self.f.write("{")
+        self._rest = self._keys[split + 1:]
+
+    def domain(self, domain, entities):
+        if not self._streamed:
+            return
+        self._key(domain, 2, not self._domains)
+        self._domains += 1
+        for piece in self._encode(entities, 2):
+            self.f.write(piece)
+
+    def end(self, report):
+        if self._streamed:
+            self.f.write("\n" + " " * self.indent + "}" if self._domains else "}")
+        for key in self._rest:
+            self._item(key, report[key])
+        self.f.write("\n}" if self._items else "}")
+
+
+class TextSink(ReportSink):
+    """Ausführlicher Text-Bericht (benötigt einen vollständigen Report)"""
+
+    def begin(self, report):
+        f = self.f
+        f.write("="*80 + "\n")
+        f.write("HOME ASSISTANT - VOLLSTÄNDIGER ÜBERBLICK\n")
+        f.write("="*80 + "\n")
+        f.write(f"Generiert am: {datetime.now().strftime('%d.%m.%Y um %H:%M:%S')}\n")
+        f.write("="*80 + "\n\n")
+        
+        # System Info
+        f.write("SYSTEM INFORMATIONEN\n")
+        f.write("-"*80 + "\n")
+        info = report['system_info']
+        for key, value in info.items():
+            f.write(f"{key:20}: {value}\n")
+        
+        # Statistiken
+        f.write("\n" + "="*80 + "\n")
+        f.write("STATISTIKEN\n")
+        f.write("-"*80 + "\n")
+        stats = report['statistics']
+        for key, value in stats.items():
+            f.write(f"{key:20}: {value}\n")
+        
+        # Komponenten
+        f.write("\n" + "="*80 + "\n")
+        f.write(f"ALLE KOMPONENTEN ({len(report['components'])})\n")
+        f.write("-"*80 + "\n")
+        for component in sorted(report['components']):
+            f.write(f"  • {component}\n")
+        
+        # Entitäten nach Domain
+        f.write("\n" + "="*80 + "\n")
+        f.write("ENTITÄTEN NACH DOMAIN\n")
+        f.write("-"*80 + "\n")
+        for domain, count in sorted(report['entities_by_domain'].items(), key=lambda x: x[1], reverse=True):
+            f.write(f"{domain:.<30} {count:>4}\n")
+        
+        # Detaillierte Entitäten
+        f.write("\n" + "="*80 + "\n")
+        f.write("ALLE ENTITÄTEN (DETAILLIERT)\n")
+        f.write("-"*80 + "\n")
+
+    def domain(self, domain, entities):
+        f = self.f
+        f.write(f"\n### {domain.upper()} ({len(entities)} Entitäten) ###\n")
+        for entity in entities:
+            f.write(f"\n  Entity ID: {entity['entity_id']}\n")
+            f.write(f"  Name:      {entity['attributes'].get('friendly_name', 'N/A')}\n")
+            f.write(f"  Zustand:   {entity['state']}\n")
+            if entity['attributes'].get('device_class'):
+                f.write(f"  Klasse:    {entity['attributes']['device_class']}\n")
+            f.write(f"  Letzte Änderung: {entity['last_changed']}\n")
+
+    def end(self, report):
+        f = self.f
+        # Services
+        f.write("\n" + "="*80 + "\n")
+        f.write("VERFÜGBARE SERVICES\n")
+        f.write("-"*80 + "\n")
+        for domain_services in report['services']:
+            domain = domain_services['domain']
+            f.write(f"\n### {domain.upper()} ###\n")
+            for service_name, service_data in domain_services['services'].items():
+                f.write(f"  • {domain}.{service_name}\n")
+                if service_data.get('description'):
+                    f.write(f"    {service_data['description']}\n")
+        
+        # Events
+        f.write("\n" + "="*80 + "\n")
+        f.write("VERFÜGBARE EVENTS\n")
+        f.write("-"*80 + "\n")
+        for event in report['events']:
+            f.write(f"  • {event['event']}\n")
+
+
+class HtmlSink(ReportSink):
+    """HTML-Bericht (benötigt einen vollständigen Report)"""
+
+    def begin(self, report):
+        f = self.f
+        f.write(HTML_HEAD)
+        f.write(f"""
+    <div class="header">
+        <h1>🏠 Home Assistant Überblick</h1>
+        <p>Generiert am: {datetime.now().strftime('%d.%m.%Y um %H:%M:%S')}</p>
+        <p>Version: {report['system_info']['version']} | Standort: {report['system_info']['location_name']}</p>
+    </div>
+    
+    <div class="stats-grid">
+        <div class="stat-card">
+            <h3>Komponenten</h3>
+            <div class="number">{report['statistics']['total_components']}</div>
+        </div>
+        <div class="stat-card">
+            <h3>Entitäten</h3>
+            <div class="number">{report['statistics']['total_entities']}</div>
+        </div>
+        <div class="stat-card">
+            <h3>Services</h3>
+            <div class="number">{report['statistics']['total_services']}</div>
+        </div>
+        <div class="stat-card">
+            <h3>Domains</h3>
+            <div class="number">{report['statistics']['total_domains']}</div>
+        </div>
+        <div class="stat-card">
+            <h3>Events</h3>
+            <div class="number">{report['statistics']['total_events']}</div>
+        </div>
+    </div>
+    
+    <div class="section">
+        <h2>📦 Installierte Komponenten</h2>
+""")
+        
+        for component in sorted(report['components']):
+            f.write(f'        <span class="component-tag">{component}</span>\n')
+        
+        f.write("""
+    </div>
+    
+    <div class="section">
+        <h2>📊 Entitäten nach Domain</h2>
+        <table>
+            <thead>
+                <tr>
+                    <th>Domain</th>
+                    <th>Anzahl</th>
+                </tr>
+            </thead>
+            <tbody>
+""")
+        
+        for domain, count in sorted(report['entities_by_domain'].items(), key=lambda x: x[1], reverse=True):
+            f.write(f"""
+                <tr>
+                    <td><strong>{domain}</strong></td>
+                    <td>{count}</td>
+                </tr>
+""")
+        
+        f.write("""
+            </tbody>
+        </table>
+    </div>
+    
+    <div class="section">
+        <h2>🔧 Alle Entitäten</h2>
+""")
+
+    def domain(self, domain, entities):
+        f = self.f
+        f.write(f"""
+        <h3>{domain.upper()} ({len(entities)} Entitäten)</h3>
+        <div class="entity-list">
+""")
+        for entity in entities:
+            name = entity['attributes'].get('friendly_name', entity['entity_id'])
+            f.write(f"""
+            <div class="entity-card">
+                <div class="id">{entity['entity_id']}</div>
+                <div>{name}</div>
+                <div class="state">Zustand: {entity['state']}</div>
+            </div>
+""")
+        f.write("        </div>\n")
+
+    def end(self, report):
+        self.f.write("""
+    </div>
+</body>
+</html>
+""")
+
+
+class ClaudeSink(ReportSink):
+    """
+    Claude-Export (Markdown, wie exporters.generate_claude_format)
+
+    Mit max_tokens wird der Export wie bei iter_claude_chunks in Teile
+    aufgeteilt; die Aufteilung braucht die Größe aller Abschnitte und
+    durchläuft den Report deshalb am Ende ein zweites Mal.
+    """
+
+    def __init__(self, f, max_tokens=None, collapse=True):
+        """
+        Args:
+            max_tokens: Export in Teile mit diesem Token-Budget aufteilen
+            collapse: Beim Aufteilen gleichartige Entitäten zusammenfassen
+        """
+        super().__init__(f)
+        self.max_tokens = max_tokens
+        self.collapse = collapse
+
+    def _lines(self, lines):
+        for line in lines:
+            self.f.write(line if self._first else "\n" + line)
+            self._first = False
+
+    def _section(self, section):
+        for lines in section:
+            self._lines(lines)
+
+    def begin(self, report):
+        if self.max_tokens:
+            return
+        self._first = True
+        self._domains = 0
+        self._lines(_claude_header(report))
+        table = _claude_domain_table(report)
+        if table is not None:
+            self._section(table)
+
+    def domain(self, domain, entities):
+        if self.max_tokens:
+            return
+        if not self._domains:
+            self._section(CLAUDE_ENTITIES_HEADING)
+        self._domains += 1
+        self._section(_claude_domain_section(domain, entities))
+
+    def end(self, report):
+        if self.max_tokens:
+            chunks = iter_claude_chunks(report, max_tokens=self.max_tokens, collapse=self.collapse)
+            for piece in join_claude_chunks(chunks):
+                self.f.write(piece)
+            return
+        for section in _claude_closing_sections(report):
+            self._section(section)
+        self._lines(_claude_footer())
+
+
+# Sink-Klasse je Format
+SINKS = {
+    'json': JsonSink,
+    'txt': TextSink,
+    'html': HtmlSink,
+    'claude': ClaudeSink,
+}
+
+
+def make_sink(format, f, max_tokens=None, collapse=True):
+    """Sink für ein Format (max_tokens und collapse nur für 'claude')"""
+    if format == 'claude':
+        return ClaudeSink(f, max_tokens, collapse)
+    return SINKS[format](f)
+
+
+def iter_write_report(report, sinks):
+    """
+    Wie write_report, hält aber nach jedem Schritt an (Kopf, jede Domain, Abschluss)
+
+    So kann der Aufrufer zwischendurch Geschriebenes weiterreichen.
+    """
+    for sink in sinks:
+        sink.begin(report)
+    yield
+    for domain, entities in iter_domain_entities(report):
+        for sink in sinks:
+            sink.domain(domain, entities)
+        yield
+    for sink in sinks:
+        sink.end(report)
+    yield
+
+
+def write_report(report, sinks):
+    """
+    Schreibe einen Report in einem Durchlauf in alle Sinks
+
+    Args:
+        report: Report (volles oder kompaktes Format)
+        sinks: Liste von ReportSink-Objekten
+    """
+    for _ in iter_write_report(report, sinks):
+        pass
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Nicht-suchbarer Schreib-Stream, der geschriebene Bytes bis zum Abholen sammelt"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_report_bundle(report, formats=BUNDLE_FORMATS, name='ha_overview', max_tokens=None,
+                       collapse=True):
+    """
+    zip-Archiv mit mehreren Formaten eines Reports als Byte-Blöcke
+
+    Alle Formate entstehen im selben Durchlauf (iter_write_report). Das erste
+    Format wird direkt ins Archiv geschrieben und gestreamt, während es
+    entsteht; die übrigen werden gepuffert (BUNDLE_SPOOL_SIZE) und danach
+    angehängt. Es werden keine Dateien abgelegt.
+
+    Args:
+        report: Report (volles oder kompaktes Format)
+        formats: Formate aus SINKS (txt und html benötigen einen vollständigen Report)
+        name: Dateiname ohne Endung, z.B. 'ha_overview_20240101_120000'
+        max_tokens, collapse: Für 'claude', siehe ClaudeSink
+
+    Yields:
+        Byte-Blöcke des zip-Archivs
+    """
+    output = _ChunkBuffer()
+    first, rest = formats[0], formats[1:]
+    spools = {format: tempfile.SpooledTemporaryFile(BUNDLE_SPOOL_SIZE, mode='w+', encoding='utf-8')
+              for format in rest}
+    try:
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+            with io.TextIOWrapper(archive.open(f"{name}{FORMAT_SUFFIXES[first]}", 'w'),
+                                  encoding='utf-8') as member:
+                sinks = [make_sink(first, member, max_tokens, collapse)]
+                sinks.extend(make_sink(format, spools[format], max_tokens, collapse) for format in rest)
+                for _ in iter_write_report(report, sinks):
+                    data = output.drain()
+                    if data:
+                        yield data
+
+            for format in rest:
+                spool = spools[format]
+                spool.seek(0)
+                with archive.open(f"{name}{FORMAT_SUFFIXES[format]}", 'w') as member:
+                    for text in iter(lambda: spool.read(STREAM_CHUNK_SIZE), ''):
+                        member.write(text.encode('utf-8'))
+                        data = output.drain()
+                        if data:
+                            yield data
+                spool.close()
+        yield output.drain()
+    finally:
+        for spool in spools.values():
+            spool.close()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Volltext-Suche über Entitäten
+Invertierter Index über entity_id, friendly_name, device_class und ausgewählte
+Attribute mit Präfix- und Tippfehler-Suche (Editierdistanz 1)
+"""
+
+import heapq
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+# Attribute, die zusätzlich zu entity_id und friendly_name durchsucht werden
+SEARCH_ATTRIBUTES = ('device_class', 'unit_of_measurement', 'state_class', 'icon')
+
+# Gewichtung der Felder beim Ranking
+ENTITY_ID_WEIGHT = 3.0
+FRIENDLY_NAME_WEIGHT = 2.0
+ATTRIBUTE_WEIGHT = 1.0
+
+# Abschläge für Präfix- und Tippfehler-Treffer gegenüber exakten Treffern
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.5
+
+# Mindestlänge eines Suchworts für Präfix- bzw. Tippfehler-Suche
+PREFIX_MIN_LENGTH = 2
+FUZZY_MIN_LENGTH = 4
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+# Umlaute werden vereinheitlicht, damit 'küche' auch 'kueche' findet
+_UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+
+
+def tokenize(text):
+    """Zerlege Text in kleingeschriebene Wörter (trennt auch an '.', '_' und ':')"""
+    return _TOKEN_RE.findall(text.lower().translate(_UMLAUTS))
+
+
+def _deletes(term):
+    """Alle Varianten von term mit genau einem gelöschten Zeichen"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one_edit(a, b):
+    """Prüfe, ob a und b höchstens eine Änderung auseinander liegen (inkl. Vertauschung)"""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return (len(diff) == 2 and diff[1] == diff[0] + 1
+                and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]])
+    if la > lb:
+        a, b = b, a
+    # b ist genau ein Zeichen länger
+    for i in range(len(a)):
+        if a[i] != b[i]:
+            return a[i:] == b[i + 1:]
+    return True
+
+
+class SearchIndex:
+    def __init__(self, states, attributes=SEARCH_ATTRIBUTES):
+        """
+        Baue den Index auf
+
+        Args:
+            states: Liste aller Entitäten (Format von /api/states)
+            attributes: Zusätzlich durchsuchte Attribute
+        """
+        self.states = states
+        postings = defaultdict(dict)
+        for position, entity in enumerate(states):
+            attrs = entity.get('attributes') or {}
+            fields = [(entity['entity_id'], ENTITY_ID_WEIGHT),
+                      (attrs.get('friendly_name'), FRIENDLY_NAME_WEIGHT)]
+            fields.extend((attrs.get(name), ATTRIBUTE_WEIGHT) for name in attributes)
+            for text, weight in fields:
+                if not isinstance(text, str):
+                    continue
+                for term in tokenize(text):
+                    if postings[term].get(position, 0) < weight:
+                        postings[term][position] = weight
+
+        # term -> {position: gewicht}
+        self._postings = dict(postings)
+        # Sortiertes Vokabular für die Präfix-Suche
+        self._terms = sorted(self._postings)
+        # Lösch-Varianten -> Terme für die Tippfehler-Suche
+        self._variants = defaultdict(list)
+        for term in self._terms:
+            if len(term) >= FUZZY_MIN_LENGTH - 1:
+                self._variants[term].append(term)
+                for variant in _deletes(term):
+                    self._variants[variant].append(term)
+        self._variants = dict(self._variants)
+
+    def __len__(self):
+        return len(self.states)
+
+    def _expand(self, token, prefix, fuzzy):
+        """Finde passende Terme für ein Suchwort (term -> Faktor)"""
+        matches = {}
+        if token in self._postings:
+            matches[token] = 1.0
+
+        if prefix and len(token) >= PREFIX_MIN_LENGTH:
+            i = bisect_left(self._terms, token)
+            while i < len(self._terms) and self._terms[i].startswith(token):
+                matches.setdefault(self._terms[i], PREFIX_FACTOR)
+                i += 1
+
+        if fuzzy and len(token) >= FUZZY_MIN_LENGTH:
+            for variant in _deletes(token) | {token}:
+                for term in self._variants.get(variant, ()):
+                    if term not in matches and _within_one_edit(token, term):
+                        matches[term] = FUZZY_FACTOR
+        return matches
+
+    def search(self, query, limit=20, prefix=True, fuzzy=True):
+        """
+        Suche Entitäten
+
+        Alle Wörter der Suche müssen passen (exakt, als Präfix oder mit einem Tippfehler).
+
+        Args:
+            query: Suchtext
+            limit: Maximale Anzahl Treffer
+            prefix: Präfix-Suche aktivieren
+            fuzzy: Tippfehler-Suche aktivieren
+
+        Returns:
+            Liste von Dicts mit 'entity_id', 'score' und 'entity', bester Treffer zuerst
+        """
+        expanded = [self._expand(token, prefix, fuzzy) for token in tokenize(query)]
+        if not expanded:
+            return []
+        # Selektivstes Wort zuerst, danach nur noch die verbliebenen Kandidaten prüfen
+        expanded.sort(key=lambda matches: sum(len(self._postings[term]) for term in matches))
+
+        scores = {}
+        for term, factor in expanded[0].items():
+            for position, weight in self._postings[term].items():
+                score = weight * factor
+                if score > scores.get(position, 0):
+                    scores[position] = score
+
+        for matches in expanded[1:]:
+            if not scores:
+                return []
+            postings = [(self._postings[term], factor) for term, factor in matches.items()]
+            narrowed = {}
+            for position, total in scores.items():
+                best = 0
+                for term_postings, factor in postings:
+                    weight = term_postings.get(position)
+                    if weight is not None and weight * factor > best:
+                        best = weight * factor
+                if best:
+                    narrowed[position] = total + best
+            scores = narrowed
+        if not scores:
+            return []
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [{
+            'entity_id': self.states[position]['entity_id'],
+            'score': round(score, 3),
+            'entity': self.states[position]
+        } for position, score in best]
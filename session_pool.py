@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Session-Pool für Home Assistant Verbindungen
+Hält pro Home Assistant Basis-URL eine requests.Session mit Keep-Alive,
+damit TCP- und TLS-Verbindungen zwischen Abfragen wiederverwendet werden
+"""
+
+import contextlib
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Maximale Anzahl gleichzeitiger Verbindungen pro Home Assistant Instanz
+DEFAULT_MAX_CONNECTIONS = 10
+
+# Sessions, die so lange (Sekunden) nicht benutzt wurden, werden geschlossen
+DEFAULT_IDLE_TIMEOUT = 300
+
+
+class SessionPool:
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        """
+        Initialisiere den Pool
+
+        Args:
+            max_connections: Obergrenze offener Verbindungen pro Basis-URL.
+                             Weitere Abfragen warten, bis eine Verbindung frei wird.
+            idle_timeout: Sekunden ohne Nutzung, nach denen eine Session geschlossen wird
+        """
+        self.max_connections = max(1, int(max_connections))
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _create_session(self):
+        """Erstelle eine neue Session mit begrenztem Verbindungspool"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.max_connections,
+            pool_block=True
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def get(self, base_url):
+        """
+        Hole die (warme) Session für eine Basis-URL oder erstelle eine neue
+
+        Die Session gilt danach nicht als benutzt und kann nach idle_timeout
+        geschlossen werden; für Abfragen lease() verwenden.
+        """
+        key = base_url.rstrip('/')
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._entry(key, now)
+            entry[1] = now
+            return entry[0]
+
+    @contextlib.contextmanager
+    def lease(self, base_url):
+        """
+        Session für die Dauer des with-Blocks
+
+        Solange sie benutzt wird, schließt _evict_idle sie nicht; die
+        Leerlaufzeit zählt ab dem Ende der letzten Nutzung.
+        """
+        key = base_url.rstrip('/')
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._entry(key, now)
+            entry[2] += 1
+        try:
+            yield entry[0]
+        finally:
+            with self._lock:
+                entry[2] -= 1
+                entry[1] = time.monotonic()
+
+    def _entry(self, key, now):
+        """Eintrag [Session, zuletzt benutzt, Nutzer] einer Basis-URL (Lock wird gehalten)"""
+        entry = self._sessions.get(key)
+        if entry is None:
+            entry = self._sessions[key] = [self._create_session(), now, 0]
+        return entry
+
+    def _evict_idle(self, now):
+        """Schließe Sessions, die länger als idle_timeout unbenutzt sind (Lock wird gehalten)"""
+        for key, (session, last_used, users) in list(self._sessions.items()):
+            if not users and now - last_used > self.idle_timeout:
+                del self._sessions[key]
+                session.close()
+
+    def evict_idle(self):
+        """Schließe alle inaktiven Sessions"""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+
+    def close_all(self):
+        """Schließe alle Sessions"""
+        with self._lock:
+            for session, _, _ in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+# Prozessweiter Pool, den CLI und Web-Anwendung gemeinsam nutzen
+default_pool = SessionPool()
+
+
+def get_session(base_url):
+    """Hole die geteilte Session für eine Home Assistant Instanz"""
+    return default_pool.get(base_url)
+
+
+def lease_session(base_url):
+    """Geteilte Session einer Home Assistant Instanz für die Dauer eines with-Blocks"""
+    return default_pool.lease(base_url)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Gemeinsamer Cache für mehrere Worker-Prozesse
+Eine SQLite-Datei auf dem Host, die alle Worker (z.B. unter gunicorn) lesen
+und schreiben. Reports, fertig gerenderte Exporte und die Konfiguration,
+die ein Worker erzeugt, stehen damit sofort allen anderen zur Verfügung.
+SQLite übernimmt das Sperren zwischen den Prozessen (WAL-Modus).
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+# Standard-Pfad der Datenbank
+DEFAULT_PATH = 'shared_cache.db'
+
+# Obergrenze für die Summe aller Einträge (Bytes, komprimiert); darüber
+# werden die am längsten nicht gelesenen Einträge verdrängt
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Kompressionsstufe der gespeicherten Werte (1 = schnell, 9 = klein)
+COMPRESS_LEVEL = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+class SharedCache:
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Öffne (bzw. erstelle) den gemeinsamen Cache
+
+        Werte werden mit pickle serialisiert; die Datei darf daher nur für den
+        Benutzer der Web-Anwendung schreibbar sein.
+
+        Args:
+            path: Pfad der SQLite-Datei (alle Worker verwenden denselben Pfad)
+            max_bytes: Obergrenze der gespeicherten Daten in Bytes
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        db = self._connect()
+        with db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        """
+        Verbindung des aktuellen Threads
+
+        Anders als in snapshot_store bleibt die Verbindung offen, da der Cache
+        bei jeder Anfrage gelesen wird. Nach einem fork (gunicorn --preload)
+        öffnet der neue Prozess eine eigene Verbindung.
+        """
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def get(self, namespace, key):
+        """
+        Hole einen gültigen Wert
+
+        Returns:
+            Tupel (wert, restliche Lebensdauer in Sekunden oder None) bzw.
+            None, wenn der Schlüssel fehlt oder abgelaufen ist
+        """
+        db = self._connect()
+        now = time.time()
+        row = db.execute('SELECT value, expires FROM entries WHERE namespace = ? AND key = ?',
+                         (namespace, key)).fetchone()
+        if row is None:
+            return None
+        value, expires = row
+        if expires is not None and expires <= now:
+            self.delete(namespace, key)
+            return None
+        try:
+            value = pickle.loads(zlib.decompress(value))
+        except (zlib.error, pickle.UnpicklingError, AttributeError, ImportError, EOFError):
+            # Beschädigt oder von einer anderen Programmversion geschrieben
+            self.delete(namespace, key)
+            return None
+        db.execute('UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?',
+                   (now, namespace, key))
+        return value, None if expires is None else expires - now
+
+    def put(self, namespace, key, value, ttl=None):
+        """
+        Lege einen Wert ab (ersetzt einen vorhandenen)
+
+        Args:
+            ttl: Lebensdauer in Sekunden (None = unbegrenzt)
+
+        Returns:
+            Größe des gespeicherten Werts in Bytes
+        """
+        data = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL), COMPRESS_LEVEL)
+        now = time.time()
+        db = self._connect()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                       (namespace, key, data, len(data), now,
+                        None if ttl is None else now + ttl, now))
+            self._evict(db, now)
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return len(data)
+
+    def _evict(self, db, now):
+        """Entferne abgelaufene Einträge und verdränge über max_bytes (Transaktion läuft)"""
+        db.execute('DELETE FROM entries WHERE expires IS NOT NULL AND expires <= ?', (now,))
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = db.execute('SELECT namespace, key, size FROM entries ORDER BY accessed').fetchall()
+        # Der gerade geschriebene Eintrag (zuletzt gelesen = jetzt) wird zuletzt verdrängt
+        for namespace, key, size in rows[:-1]:
+            db.execute('DELETE FROM entries WHERE namespace = ? AND key = ?', (namespace, key))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def delete(self, namespace, key):
+        self._connect().execute('DELETE FROM entries WHERE namespace = ? AND key = ?',
+                                (namespace, key))
+
+    def clear(self, namespace=None):
+        """Leere einen Namensraum oder den ganzen Cache"""
+        db = self._connect()
+        if namespace is None:
+            db.execute('DELETE FROM entries')
+        else:
+            db.execute('DELETE FROM entries WHERE namespace = ?', (namespace,))
+
+    def stats(self):
+        """Anzahl und Größe der Einträge je Namensraum"""
+        rows = self._connect().execute(
+            'SELECT namespace, COUNT(*), SUM(size) FROM entries GROUP BY namespace').fetchall()
+        return {namespace: {'entries': count, 'bytes': size} for namespace, count, size in rows}
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Snapshot-Historie für Home Assistant Reports
+Speichert aufeinanderfolgende Reports komprimiert in SQLite und berechnet
+strukturierte Unterschiede zwischen zwei Snapshots
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+from entity_model import json_default
+from report_format import get_report_states, to_compact_report
+
+# Standard-Pfad der Datenbank
+DEFAULT_PATH = 'snapshots.db'
+
+# Aufbewahrung je Instanz: höchstens so viele Snapshots ...
+DEFAULT_MAX_SNAPSHOTS = 20
+
+# ... und keine, die älter als so viele Tage sind (der neueste bleibt immer erhalten)
+DEFAULT_MAX_AGE_DAYS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    instance TEXT NOT NULL,
+    created TEXT NOT NULL,
+    version TEXT,
+    total_entities INTEGER NOT NULL,
+    report BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_instance ON snapshots (instance, id);
+CREATE TABLE IF NOT EXISTS snapshot_entities (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    entity_id TEXT NOT NULL,
+    state TEXT,
+    attributes_hash TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, entity_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshot_items (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, kind, name)
+) WITHOUT ROWID;
+"""
+
+
+def attributes_hash(attributes):
+    """Stabiler Hash der Attribute einer Entität"""
+    encoded = json.dumps(attributes, sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+                         default=json_default)
+    return hashlib.blake2b(encoded.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def service_names(report):
+    """Alle Services eines Reports als 'domain.service'"""
+    return [f"{domain_services['domain']}.{name}"
+            for domain_services in report.get('services', [])
+            for name in domain_services.get('services', {})]
+
+
+class SnapshotStore:
+    def __init__(self, path=DEFAULT_PATH, max_snapshots=DEFAULT_MAX_SNAPSHOTS,
+                 max_age_days=DEFAULT_MAX_AGE_DAYS):
+        """
+        Snapshot-Datenbank (die Datei wird erst beim ersten Zugriff angelegt)
+
+        Args:
+            path: Pfad der SQLite-Datei
+            max_snapshots: Höchstzahl aufbewahrter Snapshots je Instanz (None = unbegrenzt)
+            max_age_days: Ältere Snapshots werden beim Speichern gelöscht (None = unbegrenzt)
+        """
+        self.path = path
+        self.max_snapshots = max_snapshots
+        self.max_age_days = max_age_days
+        self._created = False
+        self._create_lock = threading.Lock()
+
+    def _connect(self):
+        """Neue Verbindung pro Vorgang (thread-sicher für die Web-Anwendung)"""
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA foreign_keys=ON')
+        if not self._created:
+            with self._create_lock:
+                if not self._created:
+                    with db:
+                        db.executescript(_SCHEMA)
+                    self._created = True
+        return db
+
+    def _prune(self, db, instance, keep_id):
+        """Lösche Snapshots einer Instanz jenseits der Aufbewahrung (Transaktion läuft)"""
+        if self.max_snapshots:
+            db.execute(
+                'DELETE FROM snapshots WHERE instance = ? AND id NOT IN '
+                '(SELECT id FROM snapshots WHERE instance = ? ORDER BY id DESC LIMIT ?)',
+                (instance, instance, max(1, int(self.max_snapshots)))
+            )
+        if self.max_age_days:
+            cutoff = (datetime.now() - timedelta(days=self.max_age_days)).isoformat()
+            db.execute('DELETE FROM snapshots WHERE instance = ? AND created < ? AND id != ?',
+                       (instance, cutoff, keep_id))
+
+    def add(self, instance, report):
+        """
+        Speichere einen Report als neuen Snapshot
+
+        Snapshots der Instanz jenseits von max_snapshots und max_age_days
+        werden dabei gelöscht.
+
+        Args:
+            instance: Home Assistant URL, zu der der Report gehört
+            report: Report im vollen oder kompakten Format
+
+        Returns:
+            ID des neuen Snapshots
+        """
+        compact = to_compact_report(report)
+        states = get_report_states(compact)
+        blob = zlib.compress(
+            json.dumps(compact, separators=(',', ':'), ensure_ascii=False,
+                       default=json_default).encode('utf-8'), 6
+        )
+        db = self._connect()
+        try:
+            with db:
+                instance = instance.rstrip('/')
+                cursor = db.execute(
+                    'INSERT INTO snapshots (instance, created, version, total_entities, report) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (instance, report.get('timestamp') or datetime.now().isoformat(),
+                     report.get('system_info', {}).get('version'), len(states), blob)
+                )
+                snapshot_id = cursor.lastrowid
+                db.executemany(
+                    'INSERT OR REPLACE INTO snapshot_entities VALUES (?, ?, ?, ?)',
+                    ((snapshot_id, entity['entity_id'], str(entity.get('state')),
+                      attributes_hash(entity.get('attributes') or {})) for entity in states)
+                )
+                items = [('component', name) for name in report.get('components', [])]
+                items.extend(('service', name) for name in service_names(report))
+                db.executemany(
+                    'INSERT OR IGNORE INTO snapshot_items VALUES (?, ?, ?)',
+                    ((snapshot_id, kind, name) for kind, name in items)
+                )
+                self._prune(db, instance, snapshot_id)
+            return snapshot_id
+        finally:
+            db.close()
+
+    def list_snapshots(self, instance, limit=50):
+        """Liste die neuesten Snapshots einer Instanz (neueste zuerst)"""
+        db = self._connect()
+        try:
+            rows = db.execute(
+                'SELECT id, created, version, total_entities, length(report) AS size '
+                'FROM snapshots WHERE instance = ? ORDER BY id DESC LIMIT ?',
+                (instance.rstrip('/'), limit)
+            ).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            db.close()
+
+    def instance_of(self, snapshot_id):
+        """Instanz-URL eines Snapshots (oder None)"""
+        db = self._connect()
+        try:
+            row = db.execute('SELECT instance FROM snapshots WHERE id = ?', (snapshot_id,)).fetchone()
+            return row['instance'] if row else None
+        finally:
+            db.close()
+
+    def load(self, snapshot_id):
+        """Lade den gespeicherten Report eines Snapshots (kompaktes Format)"""
+        db = self._connect()
+        try:
+            row = db.execute('SELECT report FROM snapshots WHERE id = ?', (snapshot_id,)).fetchone()
+        finally:
+            db.close()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row['report']).decode('utf-8'))
+
+    def delete(self, snapshot_id):
+        db = self._connect()
+        try:
+            with db:
+                db.execute('DELETE FROM snapshots WHERE id = ?', (snapshot_id,))
+        finally:
+            db.close()
+
+    def diff(self, old_id, new_id):
+        """
+        Berechne die Unterschiede zwischen zwei Snapshots
+
+        Verglichen werden nur die gehashten Einträge pro Entität; die
+        komprimierten Reports müssen dafür nicht geladen werden.
+
+        Returns:
+            Dict mit hinzugefügten/entfernten Entitäten, Zustandsänderungen,
+            Attributänderungen sowie neuen/entfernten Komponenten und Services
+        """
+        db = self._connect()
+        try:
+            meta = {row['id']: dict(row) for row in db.execute(
+                'SELECT id, instance, created, version, total_entities FROM snapshots WHERE id IN (?, ?)',
+                (old_id, new_id)
+            )}
+            for snapshot_id in (old_id, new_id):
+                if snapshot_id not in meta:
+                    raise KeyError(f"Snapshot {snapshot_id} nicht gefunden")
+
+            def only_in(a, b):
+                return [row[0] for row in db.execute(
+                    'SELECT a.entity_id FROM snapshot_entities a '
+                    'LEFT JOIN snapshot_entities b ON b.snapshot_id = ? AND b.entity_id = a.entity_id '
+                    'WHERE a.snapshot_id = ? AND b.entity_id IS NULL ORDER BY a.entity_id',
+                    (b, a)
+                )]
+
+            changed = db.execute(
+                'SELECT a.entity_id, a.state AS old_state, b.state AS new_state, '
+                'a.attributes_hash != b.attributes_hash AS attributes_changed '
+                'FROM snapshot_entities a JOIN snapshot_entities b '
+                'ON b.snapshot_id = ? AND b.entity_id = a.entity_id '
+                'WHERE a.snapshot_id = ? AND (a.state IS NOT b.state OR a.attributes_hash != b.attributes_hash) '
+                'ORDER BY a.entity_id',
+                (new_id, old_id)
+            ).fetchall()
+
+            def items(snapshot_id, kind):
+                return {row[0] for row in db.execute(
+                    'SELECT name FROM snapshot_items WHERE snapshot_id = ? AND kind = ?',
+                    (snapshot_id, kind)
+                )}
+
+            old_components, new_components = items(old_id, 'component'), items(new_id, 'component')
+            old_services, new_services = items(old_id, 'service'), items(new_id, 'service')
+            added = only_in(new_id, old_id)
+            removed = only_in(old_id, new_id)
+        finally:
+            db.close()
+
+        state_changes = [{
+            'entity_id': row['entity_id'],
+            'old_state': row['old_state'],
+            'new_state': row['new_state']
+        } for row in changed if row['old_state'] != row['new_state']]
+        attribute_changes = [row['entity_id'] for row in changed if row['attributes_changed']]
+
+        diff = {
+            'from': meta[old_id],
+            'to': meta[new_id],
+            'entities_added': added,
+            'entities_removed': removed,
+            'state_changes': state_changes,
+            'attribute_changes': attribute_changes,
+            'components_added': sorted(new_components - old_components),
+            'components_removed': sorted(old_components - new_components),
+            'services_added': sorted(new_services - old_services),
+            'services_removed': sorted(old_services - new_services)
+        }
+        diff['summary'] = {key: len(value) for key, value in diff.items()
+                           if isinstance(value, list)}
+        return diff
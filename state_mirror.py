@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Live-Spiegel der Home Assistant Entitäten
+Hält über die WebSocket-API (state_changed) eine aktuelle Kopie von /api/states
+im Speicher, damit Reports nicht jedes Mal alle Zustände abfragen müssen
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import websocket
+
+from report_cache import cache_key
+
+# Höchstens so viele Spiegel (je Instanz und Token einer) laufen gleichzeitig;
+# darüber wird der am längsten nicht benutzte beendet
+DEFAULT_MAX_MIRRORS = 8
+
+# Ein Spiegel, den so lange (Sekunden) kein Report benutzt hat, beendet sich
+DEFAULT_IDLE_TIMEOUT = 1800
+
+
+class AuthenticationError(Exception):
+    """Home Assistant hat den Token abgelehnt"""
+
+
+def websocket_url(url):
+    """Leite die WebSocket-URL aus der Home Assistant URL ab"""
+    url = url.rstrip('/')
+    if url.startswith('https://'):
+        url = 'wss://' + url[len('https://'):]
+    elif url.startswith('http://'):
+        url = 'ws://' + url[len('http://'):]
+    return f"{url}/api/websocket"
+
+
+class StateMirror:
+    def __init__(self, url, token, ws_url=None, reconnect_delay=5, timeout=10, idle_timeout=None):
+        """
+        Initialisiere den Spiegel (die Verbindung startet erst mit start())
+
+        Args:
+            url: Home Assistant URL (z.B. http://homeassistant.local:8123)
+            token: Long-Lived Access Token
+            ws_url: Eigene WebSocket-URL, z.B. für einen lokalen Testserver
+            reconnect_delay: Wartezeit in Sekunden vor einem neuen Verbindungsversuch
+            timeout: Timeout für Verbindungsaufbau und Antworten in Sekunden
+            idle_timeout: Sekunden ohne get_states/touch, nach denen sich der
+                          Spiegel beendet (None = läuft bis stop())
+        """
+        self.url = url.rstrip('/')
+        self.token = token
+        self.ws_url = ws_url or websocket_url(self.url)
+        self.reconnect_delay = reconnect_delay
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.last_used = time.monotonic()
+        self.last_error = None
+        self.updates = 0
+        self._states = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._ws = None
+
+    @property
+    def ready(self):
+        """True, sobald der erste vollständige Snapshot geladen ist und die Verbindung steht"""
+        return self._ready.is_set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Starte den Hintergrund-Thread"""
+        if self.running:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"state-mirror {self.url}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Beende die Verbindung und den Hintergrund-Thread"""
+        self._stop.set()
+        self._ready.clear()
+        ws = self._ws
+        if ws is not None:
+            # Blockierendes recv() sofort abbrechen
+            ws.abort()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wait_ready(self, timeout=None):
+        """Warte, bis der Spiegel bereit ist"""
+        return self._ready.wait(timeout)
+
+    def touch(self):
+        """Vermerke eine Nutzung (setzt die Leerlaufzeit zurück)"""
+        self.last_used = time.monotonic()
+
+    def idle(self):
+        """True, wenn der Spiegel länger als idle_timeout nicht benutzt wurde"""
+        return self.idle_timeout is not None and time.monotonic() - self.last_used > self.idle_timeout
+
+    def get_states(self):
+        """Liefere die gespiegelten Zustände im Format von /api/states"""
+        self.touch()
+        with self._lock:
+            return list(self._states.values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._states)
+
+    def _run(self):
+        """Verbindungsschleife mit automatischem Reconnect"""
+        while not self._stop.is_set():
+            if self.idle():
+                print(f"ℹ State-Mirror {self.url}: beendet (seit {self.idle_timeout}s nicht benutzt)")
+                break
+            try:
+                self._connect_and_listen()
+            except AuthenticationError as e:
+                self.last_error = str(e)
+                print(f"✗ State-Mirror {self.url}: {e}")
+                break
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                self.last_error = str(e)
+                print(f"✗ State-Mirror {self.url}: {e} - neuer Versuch in {self.reconnect_delay}s")
+            finally:
+                self._ready.clear()
+                self._ws = None
+            if not self.idle():
+                self._stop.wait(self.reconnect_delay)
+
+    def _receive(self, ws):
+        message = ws.recv()
+        if not message:
+            # Close-Frame von Home Assistant (z.B. Neustart)
+            raise ConnectionError("Verbindung von Home Assistant geschlossen")
+        return json.loads(message)
+
+    def _connect_and_listen(self):
+        ws = websocket.create_connection(self.ws_url, timeout=self.timeout)
+        self._ws = ws
+        try:
+            # Authentifizierung
+            message = self._receive(ws)
+            if message.get('type') == 'auth_required':
+                ws.send(json.dumps({'type': 'auth', 'access_token': self.token}))
+                message = self._receive(ws)
+            if message.get('type') != 'auth_ok':
+                raise AuthenticationError(message.get('message', 'Authentifizierung fehlgeschlagen'))
+
+            # Zuerst abonnieren, dann den Snapshot holen, damit keine Änderung verloren geht
+            ws.send(json.dumps({'id': 1, 'type': 'subscribe_events', 'event_type': 'state_changed'}))
+            ws.send(json.dumps({'id': 2, 'type': 'get_states'}))
+
+            pending = []
+            ws.settimeout(1)
+            while not self._stop.is_set() and not self.idle():
+                try:
+                    message = self._receive(ws)
+                except websocket.WebSocketTimeoutException:
+                    continue
+
+                if message.get('type') == 'event' and message.get('id') == 1:
+                    data = message.get('event', {}).get('data', {})
+                    if self._ready.is_set():
+                        self._apply_change(data)
+                    else:
+                        pending.append(data)
+                elif message.get('type') == 'result' and message.get('id') == 2:
+                    if not message.get('success'):
+                        raise RuntimeError(message.get('error', {}).get('message', 'get_states fehlgeschlagen'))
+                    self._load_snapshot(message.get('result') or [], pending)
+                    pending = []
+                    self._ready.set()
+                elif message.get('type') == 'result' and not message.get('success', True):
+                    raise RuntimeError(message.get('error', {}).get('message', 'Abonnement fehlgeschlagen'))
+        finally:
+            ws.close(timeout=1)
+
+    def _load_snapshot(self, states, pending):
+        """Übernimm einen vollständigen Snapshot und die seitdem gepufferten Änderungen"""
+        with self._lock:
+            self._states = {state['entity_id']: state for state in states}
+        for data in pending:
+            self._apply_change(data)
+
+    def _apply_change(self, data):
+        """Wende ein state_changed Event an (ältere Zustände werden ignoriert)"""
+        entity_id = data.get('entity_id')
+        if not entity_id:
+            return
+        new_state = data.get('new_state')
+        with self._lock:
+            if new_state is None:
+                self._states.pop(entity_id, None)
+            else:
+                current = self._states.get(entity_id)
+                if current and current.get('last_updated', '') > new_state.get('last_updated', ''):
+                    return
+                self._states[entity_id] = new_state
+            self.updates += 1
+
+
+# Laufende Spiegel pro Instanz und Token (zuletzt benutzte am Ende)
+_mirrors = OrderedDict()
+_mirrors_lock = threading.Lock()
+
+
+def get_mirror(url, token, start=True, max_mirrors=DEFAULT_MAX_MIRRORS, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """
+    Hole den geteilten Spiegel einer Instanz (wird bei Bedarf gestartet)
+
+    Ein Spiegel, der beendet wurde (ungültiger Token, Leerlauf), wird ersetzt.
+    Jeder Spiegel hält einen Thread und eine WebSocket-Verbindung; sind mehr
+    als max_mirrors registriert, werden die am längsten nicht benutzten beendet.
+
+    Args:
+        max_mirrors: Obergrenze gleichzeitig registrierter Spiegel
+        idle_timeout: Leerlaufzeit neuer Spiegel in Sekunden (siehe StateMirror)
+    """
+    key = cache_key(url, token)
+    evicted = []
+    with _mirrors_lock:
+        mirror = _mirrors.get(key)
+        if mirror is None or (mirror._thread is not None and not mirror.running):
+            mirror = _mirrors[key] = StateMirror(url, token, idle_timeout=idle_timeout)
+        _mirrors.move_to_end(key)
+        mirror.touch()
+        while len(_mirrors) > max(1, max_mirrors):
+            evicted.append(_mirrors.popitem(last=False)[1])
+        if start:
+            mirror.start()
+    for old in evicted:
+        old.stop(timeout=1)
+    return mirror
+
+
+def stop_all(timeout=None):
+    """Beende alle laufenden Spiegel"""
+    with _mirrors_lock:
+        mirrors = list(_mirrors.values())
+        _mirrors.clear()
+    for mirror in mirrors:
+        mirror.stop(timeout)
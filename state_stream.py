@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Inkrementelles Einlesen von /api/states
+Die Antwort wird Block für Block geparst, sobald sie eintrifft; jede Entität
+wird sofort als kompakter Record abgelegt und dem Domain-Index zugeordnet.
+So liegen nie die komplette Antwort und die geparste Liste gleichzeitig im Speicher.
+"""
+
+import codecs
+import json
+import re
+from collections import defaultdict
+
+from entity_model import Entity
+
+# Größe der gelesenen Blöcke (Bytes)
+STATE_CHUNK_SIZE = 64 * 1024
+
+# Ein einzelnes Element darf höchstens so groß sein (Zeichen); schützt vor
+# unbegrenztem Puffern, wenn die Antwort kein gültiges JSON ist
+MAX_ELEMENT_SIZE = 16 * 1024 * 1024
+
+# collect_states übernimmt und gibt Einträge in Blöcken dieser Größe frei
+COLLECT_BATCH_SIZE = 1000
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+
+
+class JsonArrayParser:
+    """
+    Parser für ein JSON-Array, das stückweise eintrifft
+
+    feed() nimmt Bytes entgegen und liefert alle Elemente, die bereits
+    vollständig vorliegen; close() prüft, dass das Array abgeschlossen ist.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        # Erwartet: '[' -> Element oder ']' -> ',' oder ']' -> Element ...
+        self._expect = 'start'
+
+    def feed(self, data, final=False):
+        """
+        Verarbeite den nächsten Block
+
+        Returns:
+            Liste der in diesem Block abgeschlossenen Elemente
+        """
+        text = self._text.decode(data, final)
+        if self._position:
+            self._buffer = self._buffer[self._position:] + text
+            self._position = 0
+        else:
+            self._buffer += text
+        return self._parse(final)
+
+    def close(self):
+        """Verarbeite den Rest; ValueError, wenn das Array unvollständig ist"""
+        items = self.feed(b'', final=True)
+        rest = self._buffer[_WHITESPACE.match(self._buffer, self._position).end():]
+        if self._expect != 'done' or rest:
+            raise ValueError("Unvollständiges oder ungültiges JSON-Array")
+        return items
+
+    def _parse(self, final):
+        items = []
+        buffer = self._buffer
+        position = self._position
+        while True:
+            position = _WHITESPACE.match(buffer, position).end()
+            if position >= len(buffer):
+                break
+            char = buffer[position]
+            if self._expect == 'start':
+                if char != '[':
+                    raise ValueError("Antwort ist kein JSON-Array")
+                position += 1
+                self._expect = 'first'
+            elif self._expect in ('first', 'value') and not (self._expect == 'first' and char == ']'):
+                try:
+                    item, end = self._decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if final or len(buffer) - position > MAX_ELEMENT_SIZE:
+                        raise
+                    break
+                # Eine Zahl am Pufferende könnte im nächsten Block weitergehen
+                if (not final and isinstance(item, (int, float))
+                        and _NUMBER_TAIL.fullmatch(buffer, end)):
+                    break
+                items.append(item)
+                position = end
+                self._expect = 'separator'
+            elif char == ']' and self._expect in ('first', 'separator'):
+                position += 1
+                self._expect = 'done'
+            elif char == ',' and self._expect == 'separator':
+                position += 1
+                self._expect = 'value'
+            else:
+                raise ValueError(f"Unerwartetes Zeichen {char!r} im JSON-Array")
+        self._position = position
+        return items
+
+
+class StateList(list):
+    """
+    Liste kompakter Entitäten mit Domain-Index, der beim Einfügen entsteht
+
+    Report-Aufbau (index_entities, analyze_entities) verwendet den fertigen
+    Index, statt alle Entitäten ein zweites Mal zu durchlaufen.
+    """
+
+    def __init__(self, entity_filter=None):
+        """
+        Args:
+            entity_filter: Optionale Funktion entity_filter(entity) -> bool; sie
+                           erhält das Dict aus /api/states, Entitäten mit False
+                           werden verworfen, bevor sie gespeichert werden
+        """
+        super().__init__()
+        self.entity_filter = entity_filter
+        self.domain_index = defaultdict(list)
+        self.filtered = 0
+
+    def add_all(self, items):
+        """Nimm Entitäten (Dicts aus /api/states) auf, sofern der Filter sie zulässt"""
+        entity_filter = self.entity_filter
+        domain_index = self.domain_index
+        from_dict = Entity.from_dict
+        append = self.append
+        for data in items:
+            if entity_filter is not None and not entity_filter(data):
+                self.filtered += 1
+                continue
+            entity = from_dict(data)
+            domain_index[entity.domain].append(len(self))
+            append(entity)
+
+    def __reduce__(self):
+        # Als einfache Liste speichern (der Filter ist evtl. nicht serialisierbar)
+        return (list, (list(self),))
+
+
+class StateCounts:
+    """
+    Nur die Anzahl der Entitäten je Domain (für Reports ohne Entitäten-Abschnitt)
+
+    Gleiche Schnittstelle wie StateList beim Einlesen (add_all, filtered), es
+    werden aber keine Records angelegt; len() liefert die Anzahl der Entitäten.
+    """
+
+    def __init__(self, entity_filter=None):
+        self.entity_filter = entity_filter
+        self.domain_counts = defaultdict(int)
+        self.filtered = 0
+        self._total = 0
+
+    def add_all(self, items):
+        """Zähle Entitäten (Dicts aus /api/states), sofern der Filter sie zulässt"""
+        entity_filter = self.entity_filter
+        domain_counts = self.domain_counts
+        for data in items:
+            if entity_filter is not None and not entity_filter(data):
+                self.filtered += 1
+                continue
+            domain_counts[data['entity_id'].split('.', 1)[0]] += 1
+            self._total += 1
+
+    def __len__(self):
+        return self._total
+
+
+def collect_states(states, entity_filter=None, counts_only=False):
+    """
+    Übernimm eine bereits geparste Liste in eine StateList
+
+    Die Einträge der Eingabeliste werden dabei freigegeben, sodass nie beide
+    Darstellungen vollständig im Speicher liegen.
+
+    Args:
+        counts_only: Nur Domains zählen (StateCounts statt StateList)
+    """
+    collected = StateCounts(entity_filter) if counts_only else StateList(entity_filter)
+    for start in range(0, len(states), COLLECT_BATCH_SIZE):
+        batch = states[start:start + COLLECT_BATCH_SIZE]
+        states[start:start + COLLECT_BATCH_SIZE] = [None] * len(batch)
+        collected.add_all(batch)
+    states.clear()
+    return collected
@@ -0,0 +1,28 @@
+"""Gemeinsame Einstellungen der Tests: Module liegen flach im Projektverzeichnis"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Clock:
+    """Steuerbare Uhr; ersetzt das Modul time in einem Modul (monkeypatch.setattr(modul, 'time', clock))"""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def time(self):
+        return self.now
+
+    monotonic = time
+
+
+@pytest.fixture
+def clock():
+    return Clock()
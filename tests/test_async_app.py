@@ -0,0 +1,73 @@
+"""Downloads des asynchronen Servers blockieren die Event-Loop nicht"""
+
+import asyncio
+import io
+import threading
+import time
+import zipfile
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import async_app
+from async_app import create_app
+from fake_ha import FakeHomeAssistant, DEFAULT_TOKEN
+from snapshot_store import SnapshotStore
+
+
+async def download_zip(url):
+    """Lade ein zip-Bundle und miss die längste Pause der Event-Loop währenddessen"""
+    longest = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal longest
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            longest = max(longest, time.perf_counter() - start)
+
+    async with TestClient(TestServer(create_app())) as client:
+        tick = asyncio.create_task(ticker())
+        response = await client.post('/api/download-report',
+                                     json={'url': url, 'token': DEFAULT_TOKEN, 'format': 'zip'})
+        data = await response.read()
+        running = False
+        await tick
+    return response, data, longest
+
+
+def test_zip_download_keeps_event_loop_responsive(monkeypatch, tmp_path):
+    monkeypatch.setattr(async_app, 'snapshot_store', SnapshotStore(str(tmp_path / 'snapshots.db')))
+    with FakeHomeAssistant(entities=5000) as fake:
+        response, data, longest = asyncio.run(download_zip(fake.url))
+
+    assert response.status == 200
+    assert response.content_type == 'application/zip'
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert any(name.endswith('.json') for name in archive.namelist())
+    # Rendern und Komprimieren laufen in Worker-Threads, nicht auf der Event-Loop
+    assert longest < 0.2
+
+
+async def generate_report(url):
+    async with TestClient(TestServer(create_app())) as client:
+        response = await client.post('/api/generate-report', json={'url': url, 'token': DEFAULT_TOKEN})
+        return await response.json()
+
+
+def test_state_mirror_is_fetched_off_the_event_loop(monkeypatch, tmp_path):
+    # get_mirror kann verdrängte Spiegel stoppen und dabei blockieren
+    threads = []
+
+    def get_mirror(url, token, **limits):
+        threads.append(threading.current_thread())
+
+    monkeypatch.setattr(async_app, 'snapshot_store', SnapshotStore(str(tmp_path / 'snapshots.db')))
+    monkeypatch.setattr(async_app, 'USE_STATE_MIRROR', True)
+    monkeypatch.setattr(async_app, 'get_mirror', get_mirror)
+    with FakeHomeAssistant(entities=10) as fake:
+        result = asyncio.run(generate_report(fake.url))
+
+    assert result['success']
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,17 @@
+"""Vergleich eines Benchmark-Laufs mit der Baseline"""
+
+from benchmark import compare
+
+
+def run(total, peak_memory, retained_memory):
+    return {'results': {'1000': {
+        'total': total, 'peak_memory': peak_memory, 'retained_memory': retained_memory,
+        'phases': {'fetch': total}, 'endpoints': {},
+    }}}
+
+
+def test_missing_values_are_skipped():
+    rows = {row['metric']: row for row in compare(run(1.0, 8192, 4096), run(1.5, 8192, None))}
+    assert 'retained_memory' not in rows
+    assert rows['total']['regression']
+    assert not rows['peak_memory']['regression']
@@ -0,0 +1,46 @@
+"""Muster für entity_id: jeder reguläre Ausdruck gilt für sich"""
+
+import pytest
+
+from entity_filter import EntityFilter, parse_filter
+from ha_overview import main
+
+
+def matches(rules, *entity_ids):
+    entity_filter = parse_filter(rules)
+    return [entity_id for entity_id in entity_ids if entity_filter({'entity_id': entity_id})]
+
+
+def test_inline_flags_apply_to_their_pattern_only():
+    rules = {'include_entities': ['re:(?i)LIGHT\\..*', 'sensor.*']}
+    assert matches(rules, 'light.kueche', 'sensor.bad', 'switch.flur') == ['light.kueche', 'sensor.bad']
+
+
+def test_backreferences_in_several_patterns():
+    rules = {'include_entities': 're:(a)\\1,re:(b)\\1'}
+    assert matches(rules, 'aa', 'bb', 'ab') == ['aa', 'bb']
+
+
+def test_same_named_group_in_several_patterns():
+    rules = {'exclude_entities': ['re:(?P<d>light)\\..*', 're:(?P<d>switch)\\..*']}
+    assert matches(rules, 'light.a', 'switch.b', 'sensor.c') == ['sensor.c']
+
+
+def test_globs_and_regex_combined():
+    entity_filter = EntityFilter(include_entities=['sensor.*_temperatur', 're:light\\.(bad|kueche)'])
+    assert entity_filter({'entity_id': 'sensor.bad_temperatur'})
+    assert entity_filter({'entity_id': 'light.kueche'})
+    assert not entity_filter({'entity_id': 'light.flur'})
+
+
+@pytest.mark.parametrize('pattern', ['re:(', 're:*x', 're:(?P<1>x)'])
+def test_invalid_regex_raises_value_error(pattern):
+    with pytest.raises(ValueError, match='Ungültiger regulärer Ausdruck'):
+        EntityFilter(include_entities=[pattern])
+
+
+def test_cli_reports_invalid_pattern(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(['--include', 're:(light', '--url', 'http://localhost:1', '--token', 'x'])
+    assert exit_info.value.code == 2
+    assert 'Ungültiger regulärer Ausdruck' in capsys.readouterr().err
@@ -0,0 +1,40 @@
+"""Kompakte Entitäten: Attribut-Sicht und geteilte Schemata"""
+
+import json
+
+import entity_model
+from entity_model import AttributeView, Entity, json_default
+
+
+def state(entity_id, **attributes):
+    return {'entity_id': entity_id, 'state': 'on', 'attributes': attributes,
+            'last_changed': '2024-01-01T00:00:00', 'last_updated': '2024-01-01T00:00:00',
+            'context': {'id': '1', 'parent_id': None, 'user_id': None}}
+
+
+def test_attributes_are_a_read_only_view():
+    data = state('light.kueche', friendly_name='Küche', brightness=128)
+    attributes = Entity.from_dict(data)['attributes']
+    assert isinstance(attributes, AttributeView)
+    assert attributes == data['attributes']
+    assert attributes.get('friendly_name') == 'Küche'
+    assert attributes.get('device_class', '') == ''
+    assert list(attributes) == ['friendly_name', 'brightness']
+    assert json.dumps(attributes, default=json_default) == json.dumps(data['attributes'])
+    assert Entity.from_dict(data).to_dict() == data
+
+
+def test_same_shape_shares_one_schema():
+    first = Entity.from_dict(state('sensor.a', unit_of_measurement='°C'))
+    second = Entity.from_dict(state('sensor.b', unit_of_measurement='%'))
+    assert first._schema is second._schema
+
+
+def test_schema_caches_are_capped(monkeypatch):
+    monkeypatch.setattr(entity_model, '_schemas', {})
+    monkeypatch.setattr(entity_model, '_standard_schemas', {})
+    monkeypatch.setattr(entity_model, 'MAX_SCHEMAS', 3)
+    entities = [Entity.from_dict(state(f'sensor.s{i}', **{f'attribute_{i}': i})) for i in range(10)]
+    assert len(entity_model._schemas) == 3
+    assert len(entity_model._standard_schemas) == 3
+    assert [entity['attributes'][f'attribute_{i}'] for i, entity in enumerate(entities)] == list(range(10))
@@ -0,0 +1,30 @@
+"""Kompaktes JSON aus iter_json muss byte-gleich zu json.dumps sein"""
+
+import json
+
+import pytest
+
+from exporters import iter_json
+
+
+def compact(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def test_streamed_compact_json_matches_json_dumps():
+    report = {
+        'domains': {f"domain_{i}": [{'entity_id': f"light.{j}", 'attributes': {'ä': j}} for j in range(100)]
+                    for i in range(3)},
+        'values': list(range(500)),
+    }
+    assert b''.join(iter_json(report, indent=None)).decode('utf-8') == compact(report)
+
+
+def test_non_string_keys_are_encoded_like_json_dumps():
+    report = {'outer': {True: 1, False: 2, None: 3, 1.5: 4, 7: 5, 'text"': 6, 'list': list(range(200))}}
+    assert b''.join(iter_json(report, indent=None)).decode('utf-8') == compact(report)
+
+
+def test_unsupported_keys_are_rejected():
+    with pytest.raises(TypeError):
+        b''.join(iter_json({(1, 2): list(range(200))}, indent=None))
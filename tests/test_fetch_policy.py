@@ -0,0 +1,72 @@
+"""Fehlerantworten, Wiederholungen und Circuit Breaker gegen den simulierten Home Assistant"""
+
+import asyncio
+
+import aiohttp
+import pytest
+import requests
+
+from fake_ha import FakeHomeAssistant
+from fetch_policy import FetchPolicy, CircuitOpenError, OPEN
+from ha_async import AsyncHomeAssistantOverview, create_session
+from ha_overview import HomeAssistantOverview
+
+
+@pytest.fixture
+def ha():
+    with FakeHomeAssistant(entities=10) as fake:
+        yield fake
+
+
+def policy(**options):
+    options.setdefault('backoff', 0)
+    return FetchPolicy(**options)
+
+
+def test_error_after_retries_raises_http_error(ha):
+    ha.fail_next = 3
+    overview = HomeAssistantOverview(ha.url, 'test-token', policy=policy(retries=2))
+    with pytest.raises(requests.HTTPError) as error:
+        overview.get_config()
+    assert error.value.response.status_code == 503
+    assert ha.errors == 3
+
+
+def test_retry_recovers(ha):
+    ha.fail_next = 2
+    overview = HomeAssistantOverview(ha.url, 'test-token', policy=policy(retries=2))
+    assert overview.get_config()['location_name'] == 'Testhaus'
+
+
+def test_async_error_after_retries_raises_http_error(ha):
+    async def fetch():
+        async with create_session() as session:
+            overview = AsyncHomeAssistantOverview(ha.url, 'test-token', session, policy=policy(retries=1))
+            return await overview.get_config_async()
+
+    ha.fail_next = 2
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        asyncio.run(fetch())
+    assert error.value.status == 503
+
+
+def test_internal_server_errors_open_the_breaker(ha):
+    ha.error_status = 500
+    ha.fail_next = 3
+    rules = policy(retries=0, failure_threshold=3)
+    overview = HomeAssistantOverview(ha.url, 'test-token', policy=rules)
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            overview.get_config()
+    assert rules.breaker(ha.url).state == OPEN
+    with pytest.raises(CircuitOpenError):
+        overview.get_config()
+    assert ha.errors == 3
+
+
+def test_client_errors_do_not_open_the_breaker(ha):
+    rules = policy(retries=0, failure_threshold=1)
+    overview = HomeAssistantOverview(ha.url, 'falsch', policy=rules)
+    with pytest.raises(requests.HTTPError):
+        overview.get_config()
+    assert rules.breaker(ha.url).to_dict() == {'state': 'closed', 'failures': 0}
@@ -0,0 +1,22 @@
+"""Flotten-Report über mehrere simulierte Instanzen"""
+
+import contextlib
+import io
+
+from fake_ha import FakeHomeAssistant, DEFAULT_TOKEN
+from fleet import FleetCollector
+
+
+def test_failed_connection_check_is_reported_per_instance():
+    with FakeHomeAssistant(entities=20) as fake:
+        instances = [{'name': 'gut', 'url': fake.url, 'token': DEFAULT_TOKEN},
+                     {'name': 'falsch', 'url': fake.url, 'token': 'falsches-token'}]
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = FleetCollector(instances, max_workers=2, timeout=10).generate_report()
+
+    ok, failed = report['instances']
+    assert ok['status'] == 'ok'
+    assert ok['report']['statistics']['total_entities'] == 20
+    assert failed['status'] == 'error'
+    assert failed['error'] == 'Status Code 401'
+    assert report['fleet_statistics']['instances_ok'] == 1
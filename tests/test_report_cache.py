@@ -0,0 +1,70 @@
+"""Report-Cache der Web-Anwendung: Lebensdauer, LRU und Report-IDs"""
+
+import report_cache
+from report_cache import ReportCache
+
+URL = 'http://ha.local:8123'
+
+
+def test_report_id_matches_url_and_token_only():
+    cache = ReportCache()
+    report_id = cache.put(URL + '/', 'token', {'n': 1})
+    assert cache.get(URL, 'token') == (report_id, {'n': 1})
+    assert cache.get(URL, 'token', report_id) == (report_id, {'n': 1})
+    assert cache.get(URL, 'anderes-token', report_id) is None
+    assert cache.get('http://andere.local:8123', 'token', report_id) is None
+    assert cache.get(URL, 'token', 'unbekannt') is None
+
+
+def test_newer_report_replaces_older_id():
+    cache = ReportCache()
+    old_id = cache.put(URL, 'token', {'n': 1})
+    new_id = cache.put(URL, 'token', {'n': 2})
+    assert cache.get(URL, 'token', old_id) is None
+    assert cache.get(URL, 'token') == (new_id, {'n': 2})
+    assert len(cache) == 1
+
+
+def test_reports_expire_after_ttl(monkeypatch, clock):
+    monkeypatch.setattr(report_cache, 'time', clock)
+    cache = ReportCache(ttl=300)
+    report_id = cache.put(URL, 'token', {'n': 1}, indexes={'entities': 'index'})
+    clock.advance(300)
+    assert cache.get(URL, 'token', report_id) == (report_id, {'n': 1})
+    clock.advance(1)
+    assert cache.get(URL, 'token', report_id) is None
+    assert cache.get_index(URL, 'token', 'entities') is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_report_is_evicted():
+    cache = ReportCache(max_entries=2)
+    first = cache.put('http://a', 'token', {'n': 'a'})
+    cache.put('http://b', 'token', {'n': 'b'})
+    assert cache.get('http://a', 'token', first)
+    cache.put('http://c', 'token', {'n': 'c'})
+    assert cache.get('http://b', 'token') is None
+    assert cache.get('http://a', 'token') == (first, {'n': 'a'})
+    assert len(cache) == 2
+
+
+def test_indexes_belong_to_their_report():
+    cache = ReportCache()
+    report_id = cache.put(URL, 'token', {'n': 1}, indexes={'entities': 'alt'})
+    assert cache.get_index(URL, 'token', 'entities', report_id) == 'alt'
+    cache.set_index(URL, 'token', 'search', 'suche', report_id=report_id)
+    assert cache.get_index(URL, 'token', 'search') == 'suche'
+    cache.put(URL, 'token', {'n': 2})
+    assert cache.get_index(URL, 'token', 'entities', report_id) is None
+    assert cache.get_index(URL, 'token', 'entities') is None
+
+
+def test_invalidate_and_clear():
+    cache = ReportCache()
+    cache.put('http://a', 'token', {'n': 'a'})
+    cache.put('http://b', 'token', {'n': 'b'})
+    cache.invalidate('http://a', 'token')
+    assert cache.get('http://a', 'token') is None
+    assert cache.get('http://b', 'token')
+    cache.clear()
+    assert len(cache) == 0
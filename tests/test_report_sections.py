@@ -0,0 +1,59 @@
+"""Auswahl von Report-Abschnitten und die dafür nötigen Endpunkte"""
+
+import contextlib
+import io
+
+import pytest
+
+from fake_ha import FakeHomeAssistant, DEFAULT_TOKEN
+from ha_overview import FETCH_STEPS, SECTION_ENDPOINTS, HomeAssistantOverview, fetch_steps
+from report_format import REPORT_SECTIONS, parse_sections
+
+
+def test_all_sections_by_default():
+    assert parse_sections(None) == tuple(REPORT_SECTIONS)
+
+
+@pytest.mark.parametrize('sections', ['events, entities,entities', ['entities', ' events', '']])
+def test_sections_in_report_order_without_duplicates(sections):
+    assert parse_sections(sections) == ('entities', 'events')
+
+
+def test_unknown_section_raises():
+    with pytest.raises(ValueError, match='Unbekannte Abschnitte: geraete'):
+        parse_sections('entities,geraete')
+
+
+@pytest.mark.parametrize('sections', ['', ' , ', []])
+def test_empty_selection_raises(sections):
+    with pytest.raises(ValueError, match='Mindestens ein Abschnitt'):
+        parse_sections(sections)
+
+
+def test_every_section_needs_an_endpoint():
+    assert set(SECTION_ENDPOINTS) == set(REPORT_SECTIONS)
+
+
+def test_fetch_steps_for_sections():
+    assert fetch_steps() == FETCH_STEPS
+    assert [name for name, _ in fetch_steps('entities')] == ['states']
+    assert [name for name, _ in fetch_steps('system_info,services')] == ['config', 'services']
+    # Statistiken zählen Komponenten, Entitäten, Services und Events
+    assert [name for name, _ in fetch_steps(['statistics'])] == ['components', 'states', 'services', 'events']
+
+
+def test_fetch_steps_rejects_unknown_sections():
+    with pytest.raises(ValueError):
+        fetch_steps('geraete')
+
+
+def test_partial_report_fetches_only_needed_endpoints():
+    with FakeHomeAssistant(entities=30) as fake:
+        overview = HomeAssistantOverview(fake.url, DEFAULT_TOKEN)
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = overview.generate_report(compact=True, sections='entities')
+        # Verbindungstest und /api/states
+        assert fake.requests == 2
+    assert report['sections'] == ['entities']
+    assert len(report['entities']) == 30
+    assert 'services' not in report
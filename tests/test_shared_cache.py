@@ -0,0 +1,124 @@
+"""Gemeinsamer Cache: Lebensdauer, Verdrängung und Zugriff aus mehreren Prozessen"""
+
+import multiprocessing
+import os
+
+import shared_cache
+from report_cache import ReportCache
+from shared_cache import SharedCache
+
+
+def write_entries(path, worker, count):
+    """Läuft im Kind-Prozess: schreibt count Einträge unter eigenem Präfix"""
+    cache = SharedCache(path)
+    for i in range(count):
+        cache.put('report', f'{worker}-{i}', {'worker': worker, 'pid': os.getpid(), 'i': i})
+
+
+def write_with_shared_object(cache):
+    """Läuft in einem per fork gestarteten Prozess mit dem geerbten Cache-Objekt"""
+    cache.put('report', 'fork', os.getpid())
+
+
+def test_put_get_and_replace(tmp_path):
+    cache = SharedCache(str(tmp_path / 'cache.db'))
+    cache.put('report', 'a', {'n': 1})
+    cache.put('report', 'a', {'n': 2})
+    assert cache.get('report', 'a') == ({'n': 2}, None)
+    assert cache.get('export', 'a') is None
+    assert cache.stats()['report']['entries'] == 1
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch, clock):
+    monkeypatch.setattr(shared_cache, 'time', clock)
+    cache = SharedCache(str(tmp_path / 'cache.db'))
+    cache.put('report', 'a', 'wert', ttl=60)
+    clock.advance(59)
+    assert cache.get('report', 'a') == ('wert', 1)
+    clock.advance(1)
+    assert cache.get('report', 'a') is None
+    assert cache.stats() == {}
+
+
+def test_least_recently_read_entries_are_evicted(tmp_path, monkeypatch, clock):
+    monkeypatch.setattr(shared_cache, 'time', clock)
+    # Zufallsdaten lassen sich nicht komprimieren: jeder Eintrag ist gut 1000 Bytes groß
+    cache = SharedCache(str(tmp_path / 'cache.db'), max_bytes=2500)
+    for key in ('a', 'b'):
+        cache.put('export', key, os.urandom(1000))
+        clock.advance(1)
+    assert cache.get('export', 'a') is not None
+    clock.advance(1)
+    cache.put('export', 'c', os.urandom(1000))
+    assert cache.get('export', 'b') is None
+    assert cache.get('export', 'a') is not None
+    assert cache.get('export', 'c') is not None
+
+
+def test_oversized_entry_is_kept_alone(tmp_path, monkeypatch, clock):
+    monkeypatch.setattr(shared_cache, 'time', clock)
+    cache = SharedCache(str(tmp_path / 'cache.db'), max_bytes=500)
+    cache.put('export', 'a', os.urandom(400))
+    clock.advance(1)
+    cache.put('export', 'b', os.urandom(1000))
+    assert cache.get('export', 'a') is None
+    assert cache.get('export', 'b') is not None
+
+
+def test_corrupt_entry_is_dropped(tmp_path):
+    cache = SharedCache(str(tmp_path / 'cache.db'))
+    cache.put('report', 'a', 'wert')
+    cache._connect().execute("UPDATE entries SET value = x'00'")
+    assert cache.get('report', 'a') is None
+    assert cache.stats() == {}
+
+
+def test_two_processes_write_concurrently(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    SharedCache(path)
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=write_entries, args=(path, worker, 50)) for worker in ('w1', 'w2')]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    cache = SharedCache(path)
+    assert cache.stats()['report']['entries'] == 100
+    first, _ = cache.get('report', 'w1-0')
+    second, _ = cache.get('report', 'w2-49')
+    assert first['pid'] != second['pid'] != os.getpid()
+
+
+def test_forked_process_opens_its_own_connection(tmp_path):
+    cache = SharedCache(str(tmp_path / 'cache.db'))
+    cache.put('report', 'parent', os.getpid())
+    child = multiprocessing.get_context('fork').Process(target=write_with_shared_object, args=(cache,))
+    child.start()
+    child.join(60)
+    assert child.exitcode == 0
+    assert cache.get('report', 'fork') == (child.pid, None)
+    assert cache.get('report', 'parent') == (os.getpid(), None)
+
+
+def test_report_cache_workers_share_reports_and_exports(tmp_path):
+    shared = SharedCache(str(tmp_path / 'cache.db'))
+    first, second = ReportCache(shared=shared), ReportCache(shared=shared)
+    report_id = first.put('http://ha.local', 'token', {'n': 1})
+    assert second.get('http://ha.local', 'token', report_id) == (report_id, {'n': 1})
+    assert second.get('http://ha.local', 'anderes-token', report_id) is None
+
+    renders = []
+
+    def render():
+        renders.append(1)
+        yield b'{"n":'
+        yield b'1}'
+
+    assert b''.join(first.iter_export(report_id, 'json', render)) == b'{"n":1}'
+    assert b''.join(second.iter_export(report_id, 'json', render)) == b'{"n":1}'
+    assert len(renders) == 1
+
+    first.invalidate('http://ha.local', 'token')
+    assert ReportCache(shared=shared).get('http://ha.local', 'token') is None
@@ -0,0 +1,108 @@
+"""State-Mirror gegen die WebSocket-API des simulierten Home Assistant (fake_ha)"""
+
+import time
+
+import pytest
+
+import state_mirror
+from fake_ha import FakeHomeAssistant
+from state_mirror import StateMirror, get_mirror, stop_all
+
+
+def wait_for(condition, timeout=5):
+    """Warte, bis condition() wahr ist"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def mirrored(mirror):
+    return {state['entity_id']: state for state in mirror.get_states()}
+
+
+@pytest.fixture
+def ha():
+    with FakeHomeAssistant(entities=40) as fake:
+        yield fake
+
+
+@pytest.fixture
+def mirror(ha):
+    mirror = StateMirror(ha.url, 'test-token', reconnect_delay=0.05, timeout=5).start()
+    yield mirror
+    mirror.stop(timeout=5)
+
+
+def test_auth_failure_stops_without_retry(ha):
+    mirror = StateMirror(ha.url, 'falsch', reconnect_delay=0.05, timeout=5).start()
+    mirror._thread.join(5)
+    assert not mirror.running
+    assert not mirror.ready
+    assert 'Invalid access token' in mirror.last_error
+    assert ha.websocket_connections == 1
+
+
+def test_initial_snapshot(ha, mirror):
+    assert mirror.wait_ready(5)
+    states = mirrored(mirror)
+    assert len(states) == 40
+    expected = {state['entity_id']: state for state in ha._states.values()}
+    assert states == expected
+
+
+def test_state_changed_updates_and_removes(ha, mirror):
+    assert mirror.wait_ready(5)
+    ha.set_state('light.test', 'on', {'friendly_name': 'Test'})
+    assert wait_for(lambda: 'light.test' in mirrored(mirror))
+    assert mirrored(mirror)['light.test']['attributes'] == {'friendly_name': 'Test'}
+
+    ha.set_state('light.test', 'off')
+    assert wait_for(lambda: mirrored(mirror)['light.test']['state'] == 'off')
+
+    ha.remove_state('light.test')
+    assert wait_for(lambda: 'light.test' not in mirrored(mirror))
+    assert mirror.updates == 3
+
+
+def test_older_event_is_ignored(ha, mirror):
+    assert mirror.wait_ready(5)
+    ha.set_state('sensor.neu', '2', last_updated='2030-01-01T00:00:00+00:00')
+    assert wait_for(lambda: 'sensor.neu' in mirrored(mirror))
+    ha.set_state('sensor.neu', '1', last_updated='2020-01-01T00:00:00+00:00')
+    time.sleep(0.2)
+    assert mirrored(mirror)['sensor.neu']['state'] == '2'
+
+
+def test_reconnect_reloads_snapshot(ha, mirror):
+    assert mirror.wait_ready(5)
+    ha.drop_websockets()
+    # Änderung, während keine Verbindung besteht: kommt mit dem neuen Snapshot
+    ha.set_state('switch.offline', 'on')
+    assert wait_for(lambda: ha.websocket_connections == 2)
+    assert mirror.wait_ready(5)
+    assert wait_for(lambda: 'switch.offline' in mirrored(mirror))
+    ha.set_state('switch.online', 'on')
+    assert wait_for(lambda: 'switch.online' in mirrored(mirror))
+
+
+def test_idle_mirror_stops_itself(ha):
+    mirror = StateMirror(ha.url, 'test-token', idle_timeout=0.5, timeout=5).start()
+    assert mirror.wait_ready(5)
+    mirror._thread.join(5)
+    assert not mirror.running
+
+
+def test_registry_is_bounded(ha, monkeypatch):
+    monkeypatch.setattr(state_mirror, '_mirrors', state_mirror.OrderedDict())
+    try:
+        first = get_mirror(ha.url, 'token-1', max_mirrors=2)
+        second = get_mirror(ha.url, 'token-2', max_mirrors=2)
+        assert get_mirror(ha.url, 'token-1', max_mirrors=2) is first
+        third = get_mirror(ha.url, 'token-3', max_mirrors=2)
+        assert list(state_mirror._mirrors.values()) == [first, third]
+        assert wait_for(lambda: not second.running)
+    finally:
+        stop_all(timeout=5)
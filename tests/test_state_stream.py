@@ -0,0 +1,84 @@
+"""Inkrementelles Parsen von /api/states bei beliebigen Blockgrenzen"""
+
+import json
+import random
+
+import pytest
+
+from state_stream import JsonArrayParser
+
+STATES = [
+    {'entity_id': 'sensor.küche_temperatur', 'state': '21.5',
+     'attributes': {'unit_of_measurement': '°C', 'friendly_name': 'Küche "Nord" \\ Süd'}},
+    {'entity_id': 'light.flur', 'state': 'on', 'attributes': {'brightness': 255, 'rgb': [255, 128, 0]}},
+    12345678901234567890,
+    -1.5e-10,
+    'Zeile 1\nZeile 2\té \U0001f600 \\u0041',
+    True, False, None, '', [], {},
+]
+
+
+def parse(chunks):
+    parser = JsonArrayParser()
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    items.extend(parser.close())
+    return items
+
+
+def random_chunks(data, rng):
+    chunks = []
+    position = 0
+    while position < len(data):
+        size = rng.randint(1, 17)
+        chunks.append(data[position:position + size])
+        position += size
+    return chunks
+
+
+def test_random_chunk_boundaries():
+    # Mehrbyte-Zeichen im UTF-8 und \uXXXX-Escapes (auch Surrogatpaare) werden zerschnitten
+    encoded = [json.dumps(STATES, ensure_ascii=False, indent=1).encode('utf-8'),
+               json.dumps(STATES, ensure_ascii=True).encode('utf-8')]
+    for seed in range(300):
+        data = encoded[seed % 2]
+        assert parse(random_chunks(data, random.Random(seed))) == STATES, f"seed {seed}"
+
+
+def test_byte_by_byte_inside_strings_and_escapes():
+    data = json.dumps(STATES, ensure_ascii=False).encode('utf-8')
+    assert parse([data[i:i + 1] for i in range(len(data))]) == STATES
+
+
+def test_number_split_across_chunks():
+    assert parse([b'[1,2', b'3, 4.', b'5e', b'2]']) == [1, 23, 450.0]
+
+
+def test_complete_elements_are_returned_early():
+    parser = JsonArrayParser()
+    assert parser.feed(b'[{"a": 1}, {"b"') == [{'a': 1}]
+    assert parser.feed(b': 2}]') == [{'b': 2}]
+    assert parser.close() == []
+
+
+def test_empty_array():
+    assert parse([b' [ ', b' ] ']) == []
+
+
+@pytest.mark.parametrize('chunks', [
+    [b'[1, 2'],
+    [b'[{"a": "unvollst'],
+    [b'[1, 2,'],
+    [b'[1] 2'],
+    [b''],
+])
+def test_truncated_array_raises(chunks):
+    with pytest.raises(ValueError):
+        parse(chunks)
+
+
+@pytest.mark.parametrize('data', [b'{"a": 1}', b'[1 2]', b'[1,,2]', b'[,1]'])
+def test_invalid_array_raises(data):
+    with pytest.raises(ValueError):
+        parse([data])